@@ -0,0 +1,115 @@
+"""
+Микро-бенчмарк отправки заданий поиска по изображению: сообщений в секунду
+
+Вместо RabbitMQ используется заглушка канала, которая отвечает на каждую
+синхронную операцию (объявление очереди, подтверждение публикации) через
+--rtt миллисекунд и, как брокер, подтверждает публикации независимо друг
+от друга. Сравниваются прежняя отправка (объявление очереди перед каждой
+публикацией), текущая send_data и пакетная send_batch.
+
+    PYTHONPATH=src python benchmarks/img_search_publish.py --messages 5000 --rtt 0.5
+
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from types import SimpleNamespace
+
+import aio_pika
+from aio_pika.pool import Pool
+
+from exhibit.services.img_searcher import ImgSearchAdapter
+
+
+class FakeExchange:
+
+    def __init__(self, broker: "FakeBroker"):
+        self._broker = broker
+
+    async def publish(self, message: aio_pika.Message, routing_key: str, timeout: float = None):
+        await asyncio.sleep(self._broker.rtt)
+        self._broker.queues[routing_key] = self._broker.queues.get(routing_key, 0) + 1
+
+
+class FakeChannel:
+
+    def __init__(self, broker: "FakeBroker"):
+        self._broker = broker
+        self.default_exchange = FakeExchange(broker)
+
+    async def declare_queue(self, name: str, **kwargs):
+        await asyncio.sleep(self._broker.rtt)
+        self._broker.declares += 1
+        self._broker.queues.setdefault(name, 0)
+
+
+class FakeBroker:
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.declares = 0
+        self.queues: dict[str, int] = dict()
+
+    def pool(self) -> Pool:
+        async def get_channel() -> FakeChannel:
+            return FakeChannel(self)
+
+        return Pool(get_channel, max_size=10)
+
+
+async def legacy_send(channel_pool: Pool, queue: str, body: str) -> None:
+    """
+    Реализация до кэширования объявления очереди (для сравнения)
+
+    """
+    async with channel_pool.acquire() as channel:
+        await channel.declare_queue(queue, durable=True, exclusive=False, auto_delete=False)
+        await channel.default_exchange.publish(aio_pika.Message(body=body.encode()), routing_key=queue)
+
+
+async def run(name: str, bodies: list[str], rtt: float, concurrency: int) -> float:
+    broker = FakeBroker(rtt)
+    channel_pool = broker.pool()
+    config = SimpleNamespace(SEARCHER_TASKS_SENDER_ID="tasks", PUBLISH_TIMEOUT=10)
+    isa = ImgSearchAdapter(channel_pool, config)
+
+    async def worker(offset: int):
+        for i in range(offset, len(bodies), concurrency):
+            if name == "legacy":
+                await legacy_send(channel_pool, "tasks", bodies[i])
+            else:
+                await isa.send_data(bodies[i])
+
+    start = time.perf_counter()
+    if name == "send_batch":
+        await isa.send_batch(bodies)
+    else:
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    assert broker.queues["tasks"] == len(bodies)
+    print(f"{name:12} {len(bodies) / elapsed:>10.0f} msg/s   declares: {broker.declares}")
+    return len(bodies) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rtt", type=float, default=0.5, help="задержка ответа брокера (мс)")
+    parser.add_argument("--concurrency", type=int, default=10, help="количество одновременных отправителей")
+    args = parser.parse_args()
+
+    bodies = [json.dumps({"file_id": str(uuid.uuid4()), "command": "search"}) for _ in range(args.messages)]
+    rtt = args.rtt / 1000
+
+    results = {}
+    for name in ("legacy", "send_data", "send_batch"):
+        results[name] = await run(name, bodies, rtt, args.concurrency)
+    print(f"{'speedup':12} {results['send_data'] / results['legacy']:>10.1f}x (send_data), "
+          f"{results['send_batch'] / results['legacy']:.1f}x (send_batch)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
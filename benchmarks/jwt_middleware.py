@@ -0,0 +1,153 @@
+"""
+Микро-бенчмарк JWT middleware: запросов в секунду до/после
+
+Сравниваются прежний BaseHTTPMiddleware (новый JWTManager и повторная
+проверка подписи на каждый запрос) и текущий ASGI middleware с кэшем
+проверенных токенов. Запросы передаются в ASGI-приложение напрямую,
+без сети, поэтому замеряются только накладные расходы middleware.
+
+    PYTHONPATH=src python benchmarks/jwt_middleware.py --requests 20000 --tokens 100
+
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwt as jose_jwt
+from starlette.applications import Starlette
+from starlette.authentication import AuthCredentials
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from exhibit.middleware.jwt import JWTMiddlewareHTTP
+from exhibit.models.auth import AuthenticatedUser, UnauthenticatedUser
+from exhibit.models.schemas import Tokens
+from exhibit.services.auth import JWTManager
+from exhibit.utils.cache import TTLCache
+
+
+class LegacyJWTMiddlewareHTTP(BaseHTTPMiddleware):
+    """
+    Реализация до перехода на ASGI middleware (для сравнения)
+
+    """
+
+    async def dispatch(self, request, call_next):
+        jwt = JWTManager(config=request.app.state.config.JWT)
+        reauth_session_dict = request.app.state.reauth_session_dict
+
+        session_id = request.cookies.get("session_id")
+        current_tokens = Tokens(
+            access_token=request.cookies.get(jwt.COOKIE_ACCESS_KEY),
+            refresh_token=request.cookies.get(jwt.COOKIE_REFRESH_KEY)
+        )
+        is_valid_session = False
+
+        is_valid_access_token = jwt.is_valid_token(current_tokens.access_token)
+        is_valid_refresh_token = jwt.is_valid_token(current_tokens.refresh_token)
+
+        if session_id and current_tokens.refresh_token:
+            bad_ref_token = reauth_session_dict.get(session_id)
+            is_valid_session = (bad_ref_token != current_tokens.refresh_token)
+
+        if is_valid_access_token and is_valid_refresh_token and is_valid_session:
+            payload = jwt.decode_jwt(current_tokens.access_token)
+            request.scope["user"] = AuthenticatedUser(**payload.model_dump())
+            request.scope["auth"] = AuthCredentials(["authenticated"])
+        else:
+            request.scope["user"] = UnauthenticatedUser()
+            request.scope["auth"] = AuthCredentials()
+
+        return await call_next(request)
+
+
+def make_keys() -> tuple[str, str]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+
+def make_cookies(private_pem: str, count: int) -> list[bytes]:
+    exp = int(time.time()) + 3600
+    cookies = []
+    for _ in range(count):
+        payload = {"id": str(uuid.uuid4()), "permissions": [], "state": "ACTIVE", "exp": exp}
+        access = jose_jwt.encode(payload, private_pem, algorithm=JWTManager.algorithm)
+        refresh = jose_jwt.encode({**payload, "exp": exp + 3600}, private_pem, algorithm=JWTManager.algorithm)
+        cookies.append(f"session_id={uuid.uuid4()}; access_token={access}; refresh_token={refresh}".encode())
+    return cookies
+
+
+def make_app(middleware, public_pem: str) -> Starlette:
+    async def endpoint(request):
+        return PlainTextResponse("ok" if request.scope["user"].is_authenticated else "anonymous")
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(middleware)
+    config = SimpleNamespace(JWT=SimpleNamespace(PUBLIC_KEY=public_pem))
+    app.state.config = config
+    app.state.reauth_session_dict = dict()
+    app.state.jwt_manager = JWTManager(config.JWT, cache=TTLCache(maxsize=10000))
+    return app
+
+
+async def run(app: Starlette, cookies: list[bytes], requests: int, concurrency: int) -> float:
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def worker(offset: int):
+        for i in range(offset, requests, concurrency):
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+                "headers": [(b"host", b"bench"), (b"cookie", cookies[i % len(cookies)])],
+                "client": ("127.0.0.1", 1), "server": ("bench", 80), "app": app,
+            }
+            messages = iter(({"type": "http.request", "body": b"", "more_body": False},))
+
+            async def receive():
+                return next(messages, {"type": "http.disconnect"})
+
+            await app(scope, receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    assert statuses.count(200) == requests
+    return requests / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--tokens", type=int, default=100, help="количество разных пользователей")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    private_pem, public_pem = make_keys()
+    cookies = make_cookies(private_pem, args.tokens)
+
+    results = {}
+    for name, middleware in (("legacy", LegacyJWTMiddlewareHTTP), ("asgi+cache", JWTMiddlewareHTTP)):
+        app = make_app(middleware, public_pem)
+        await run(app, cookies, min(args.requests, 200), args.concurrency)  # прогрев
+        results[name] = await run(app, cookies, args.requests, args.concurrency)
+        print(f"{name:12} {results[name]:>10.0f} req/s")
+    print(f"{'speedup':12} {results['asgi+cache'] / results['legacy']:>10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""hot path indexes
+
+Revision ID: 647f503755da
+Revises: a9f350a68b4b
+Create Date: 2026-10-17 15:02:44.190275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '647f503755da'
+down_revision: Union[str, None] = 'a9f350a68b4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Удаление дубликатов перед созданием уникальных ограничений
+    op.execute("""
+        DELETE FROM likes AS a
+        USING likes AS b
+        WHERE a.exhibit_id = b.exhibit_id AND a.owner_id = b.owner_id AND a.id > b.id
+    """)
+    op.execute("""
+        UPDATE exhibits
+        SET likes_count = counts.likes_count
+        FROM (
+            SELECT exhibits.id AS exhibit_id, count(likes.id) AS likes_count
+            FROM exhibits LEFT JOIN likes ON likes.exhibit_id = exhibits.id
+            GROUP BY exhibits.id
+        ) AS counts
+        WHERE exhibits.id = counts.exhibit_id AND exhibits.likes_count != counts.likes_count
+    """)
+    op.execute("""
+        WITH keep AS (
+            SELECT DISTINCT ON (title) id, title FROM tags ORDER BY title, created_at, id
+        )
+        UPDATE exhibit_tags
+        SET tag_id = keep.id
+        FROM tags, keep
+        WHERE exhibit_tags.tag_id = tags.id AND tags.title = keep.title AND tags.id != keep.id
+    """)
+    op.execute("""
+        WITH keep AS (
+            SELECT DISTINCT ON (title) id, title FROM tags ORDER BY title, created_at, id
+        )
+        DELETE FROM tags
+        USING keep
+        WHERE tags.title = keep.title AND tags.id != keep.id
+    """)
+    op.execute("""
+        DELETE FROM exhibit_tags AS a
+        USING exhibit_tags AS b
+        WHERE a.exhibit_id = b.exhibit_id AND a.tag_id = b.tag_id AND a.id > b.id
+    """)
+
+    op.create_unique_constraint('uq_likes_exhibit_id_owner_id', 'likes', ['exhibit_id', 'owner_id'])
+    op.create_unique_constraint('uq_tags_title', 'tags', ['title'])
+    op.create_unique_constraint('uq_exhibit_tags_exhibit_id_tag_id', 'exhibit_tags', ['exhibit_id', 'tag_id'])
+    op.create_unique_constraint(
+        'uq_comment_tree_ancestor_id_descendant_id',
+        'comment_tree',
+        ['ancestor_id', 'descendant_id']
+    )
+
+    op.create_index('ix_comment_tree_exhibit_id', 'comment_tree', ['exhibit_id'], unique=False)
+    op.create_index('ix_comment_tree_descendant_id', 'comment_tree', ['descendant_id'], unique=False)
+    op.create_index('ix_files_exhibit_id_is_uploaded', 'files', ['exhibit_id', 'is_uploaded'], unique=False)
+    op.create_index(
+        'ix_notifications_owner_id_created_at',
+        'notifications',
+        ['owner_id', 'created_at'],
+        unique=False
+    )
+    op.create_index(
+        'ix_exhibits_state_owner_id_created_at',
+        'exhibits',
+        ['state', 'owner_id', 'created_at'],
+        unique=False
+    )
+    op.create_index('ix_exhibits_state_created_at_id', 'exhibits', ['state', 'created_at', 'id'], unique=False)
+    op.create_index('ix_exhibits_state_updated_at_id', 'exhibits', ['state', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_exhibits_state_title_id', 'exhibits', ['state', 'title', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exhibits_state_title_id', table_name='exhibits')
+    op.drop_index('ix_exhibits_state_updated_at_id', table_name='exhibits')
+    op.drop_index('ix_exhibits_state_created_at_id', table_name='exhibits')
+    op.drop_index('ix_exhibits_state_owner_id_created_at', table_name='exhibits')
+    op.drop_index('ix_notifications_owner_id_created_at', table_name='notifications')
+    op.drop_index('ix_files_exhibit_id_is_uploaded', table_name='files')
+    op.drop_index('ix_comment_tree_descendant_id', table_name='comment_tree')
+    op.drop_index('ix_comment_tree_exhibit_id', table_name='comment_tree')
+
+    op.drop_constraint('uq_comment_tree_ancestor_id_descendant_id', 'comment_tree', type_='unique')
+    op.drop_constraint('uq_exhibit_tags_exhibit_id_tag_id', 'exhibit_tags', type_='unique')
+    op.drop_constraint('uq_tags_title', 'tags', type_='unique')
+    op.drop_constraint('uq_likes_exhibit_id_owner_id', 'likes', type_='unique')
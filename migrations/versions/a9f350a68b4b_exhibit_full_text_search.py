@@ -0,0 +1,47 @@
+"""exhibit full text search
+
+Revision ID: a9f350a68b4b
+Revises: ddb1ef7457b9
+Create Date: 2026-10-17 14:21:09.843106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9f350a68b4b'
+down_revision: Union[str, None] = 'ddb1ef7457b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('exhibits', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('russian', title), 'A') || setweight(to_tsvector('russian', content), 'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_exhibits_search_vector', 'exhibits', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_exhibits_title_trgm',
+        'exhibits',
+        ['title'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exhibits_title_trgm', table_name='exhibits', postgresql_using='gin')
+    op.drop_index('ix_exhibits_search_vector', table_name='exhibits', postgresql_using='gin')
+    op.drop_column('exhibits', 'search_vector')
@@ -0,0 +1,46 @@
+"""shared state
+
+Revision ID: ac36acf2be7e
+Revises: 647f503755da
+Create Date: 2026-10-17 21:58:12.406631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ac36acf2be7e'
+down_revision: Union[str, None] = '647f503755da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'shared_state_namespaces',
+        sa.Column('name', sa.VARCHAR(length=64), nullable=False),
+        sa.Column('version', sa.BIGINT(), server_default='0', nullable=False),
+        sa.Column('horizon', sa.BIGINT(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table(
+        'shared_state',
+        sa.Column('namespace', sa.VARCHAR(length=64), nullable=False),
+        sa.Column('key', sa.VARCHAR(length=255), nullable=False),
+        sa.Column('value', postgresql.JSONB(none_as_null=True, astext_type=sa.Text()), nullable=True),
+        sa.Column('version', sa.BIGINT(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('namespace', 'key')
+    )
+    op.create_index('ix_shared_state_namespace_version', 'shared_state', ['namespace', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_shared_state_namespace_version', table_name='shared_state')
+    op.drop_table('shared_state')
+    op.drop_table('shared_state_namespaces')
@@ -0,0 +1,28 @@
+"""multipart uploads
+
+Revision ID: b7d04c2e9a13
+Revises: e83a4f0b6d19
+Create Date: 2026-10-17 23:58:41.207385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d04c2e9a13'
+down_revision: Union[str, None] = 'e83a4f0b6d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('upload_id', sa.VARCHAR(length=1024), nullable=True))
+    op.add_column('files', sa.Column('size', sa.BIGINT(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'size')
+    op.drop_column('files', 'upload_id')
@@ -0,0 +1,27 @@
+"""file variants
+
+Revision ID: c41f7a9e2b68
+Revises: b7d04c2e9a13
+Create Date: 2026-10-18 00:21:37.514920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e2b68'
+down_revision: Union[str, None] = 'b7d04c2e9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'variants')
@@ -0,0 +1,33 @@
+"""exhibit likes_count
+
+Revision ID: ddb1ef7457b9
+Revises: 4916aa50a5d2
+Create Date: 2026-10-17 12:04:37.512318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ddb1ef7457b9'
+down_revision: Union[str, None] = '4916aa50a5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('exhibits', sa.Column('likes_count', sa.BIGINT(), server_default='0', nullable=False))
+    # Backfill
+    op.execute("""
+        UPDATE exhibits
+        SET likes_count = counts.likes_count
+        FROM (SELECT exhibit_id, count(id) AS likes_count FROM likes GROUP BY exhibit_id) AS counts
+        WHERE exhibits.id = counts.exhibit_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('exhibits', 'likes_count')
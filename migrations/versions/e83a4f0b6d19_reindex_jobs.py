@@ -0,0 +1,44 @@
+"""reindex jobs
+
+Revision ID: e83a4f0b6d19
+Revises: 5c1e9b7d2f40
+Create Date: 2026-10-17 23:52:06.931174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e83a4f0b6d19'
+down_revision: Union[str, None] = '5c1e9b7d2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reindex_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('scope', sa.Enum('FILES', 'POSTERS', name='reindexscope'), nullable=False),
+        sa.Column('state', sa.Enum('RUNNING', 'PAUSED', 'FAILED', 'DONE', name='reindexstate'), nullable=False),
+        sa.Column('rate_limit', sa.INTEGER(), nullable=False),
+        sa.Column('cursor', sa.UUID(), nullable=True),
+        sa.Column('total', sa.BIGINT(), nullable=False),
+        sa.Column('processed', sa.BIGINT(), nullable=False),
+        sa.Column('rate', sa.FLOAT(), nullable=True),
+        sa.Column('error', sa.VARCHAR(length=255), nullable=True),
+        sa.Column('owner', sa.UUID(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('reindex_jobs')
+    sa.Enum(name='reindexstate').drop(op.get_bind(), checkfirst=False)
+    sa.Enum(name='reindexscope').drop(op.get_bind(), checkfirst=False)
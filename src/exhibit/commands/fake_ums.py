@@ -0,0 +1,121 @@
+"""
+Локальная замена UMS для проверки синхронизации списка повторной авторизации
+
+Реализует GetListOfReauth, GetReauthChanges и WatchReauthChanges поверх
+журнала изменений в памяти. С --revoke-interval периодически добавляет
+(и со временем удаляет) случайные сессии.
+
+Запуск: python -m exhibit.commands.fake_ums --port 50051 [--revoke-interval 1]
+
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+
+import grpc
+from exhibit.protos.ums_control import ums_control_pb2
+from exhibit.protos.ums_control import ums_control_pb2_grpc
+
+
+class FakeUserManagement(ums_control_pb2_grpc.UserManagementServicer):
+
+    def __init__(self, history_size: int = 1000, heartbeat_interval: float = 10.0):
+        """
+        :param history_size: количество хранимых изменений (более старые клиенты получат полный снимок)
+        :param heartbeat_interval: интервал пустых ответов в потоке (сек)
+        """
+        self.sessions: dict[str, str] = dict()
+        self.version = 0
+        self._history: list[tuple[int, ums_control_pb2.ReauthChange]] = []
+        self._history_size = history_size
+        self._heartbeat_interval = heartbeat_interval
+        self._changed = asyncio.Condition()
+
+    async def set(self, session_id: str, refresh_token: str) -> None:
+        self.sessions[session_id] = refresh_token
+        await self._record(ums_control_pb2.ReauthChange(key=session_id, value=refresh_token))
+
+    async def delete(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        await self._record(ums_control_pb2.ReauthChange(key=session_id, deleted=True))
+
+    async def _record(self, change: ums_control_pb2.ReauthChange) -> None:
+        self.version += 1
+        self._history.append((self.version, change))
+        del self._history[:-self._history_size]
+        async with self._changed:
+            self._changed.notify_all()
+
+    def changes_since(self, since_version: int) -> ums_control_pb2.ChangesReply:
+        oldest = self._history[0][0] if self._history else self.version + 1
+        if since_version == 0 or since_version + 1 < oldest or since_version > self.version:
+            return ums_control_pb2.ChangesReply(
+                version=self.version,
+                full=True,
+                changes=[ums_control_pb2.ReauthChange(key=k, value=v) for k, v in self.sessions.items()]
+            )
+        return ums_control_pb2.ChangesReply(
+            version=self.version,
+            changes=[change for version, change in self._history if version > since_version]
+        )
+
+    async def GetListOfReauth(self, request, context):
+        return ums_control_pb2.ListOfDictReply(
+            dicts=[ums_control_pb2.Dictionary(key=k, value=v) for k, v in self.sessions.items()]
+        )
+
+    async def GetReauthChanges(self, request, context):
+        return self.changes_since(request.since_version)
+
+    async def WatchReauthChanges(self, request, context):
+        reply = self.changes_since(request.since_version)
+        version = reply.version
+        yield reply
+        while True:
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.version > version),
+                        timeout=self._heartbeat_interval
+                    )
+            except asyncio.TimeoutError:
+                yield ums_control_pb2.ChangesReply(version=version)
+                continue
+            reply = self.changes_since(version)
+            version = reply.version
+            yield reply
+
+
+async def serve(port: int, revoke_interval: float = None) -> None:
+    servicer = FakeUserManagement()
+    server = grpc.aio.server()
+    ums_control_pb2_grpc.add_UserManagementServicer_to_server(servicer, server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    logging.info("Fake UMS listening on port %s", port)
+
+    try:
+        if revoke_interval:
+            while True:
+                await asyncio.sleep(revoke_interval)
+                if len(servicer.sessions) >= 100:
+                    await servicer.delete(next(iter(servicer.sessions)))
+                await servicer.set(str(uuid.uuid4()), str(uuid.uuid4()))
+        await server.wait_for_termination()
+    finally:
+        await server.stop(grace=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена UMS (gRPC)")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--revoke-interval", type=float, help="интервал добавления сессий (сек)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.port, args.revoke_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Сверка денормализованных счетчиков лайков экспонатов с таблицей likes
+
+Запуск: python -m exhibit.commands.reconcile_likes [--dry-run]
+
+"""
+import argparse
+import asyncio
+import logging
+
+from exhibit.config import load_config
+from exhibit.db import create_psql_async_session
+from exhibit.services.repository import RepoFactory
+
+
+async def reconcile_likes(dry_run: bool = False) -> int:
+    config = load_config()
+    engine, session_maker = create_psql_async_session(
+        host=config.DB.POSTGRESQL.HOST,
+        port=config.DB.POSTGRESQL.PORT,
+        username=config.DB.POSTGRESQL.USERNAME,
+        password=config.DB.POSTGRESQL.PASSWORD,
+        database=config.DB.POSTGRESQL.DATABASE,
+    )
+    try:
+        async with session_maker() as session:
+            repos = RepoFactory(session)
+            mismatched = await repos.exhibit.reconcile_likes_count(dry_run=dry_run)
+            await repos.uow.commit()
+            return mismatched
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка счетчиков лайков экспонатов")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать расхождения")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mismatched = asyncio.run(reconcile_likes(dry_run=args.dry_run))
+    if args.dry_run:
+        logging.info("Экспонатов с неверным счетчиком лайков: %s", mismatched)
+    else:
+        logging.info("Исправлено счетчиков лайков: %s", mismatched)
+
+
+if __name__ == "__main__":
+    main()
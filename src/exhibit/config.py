@@ -22,6 +22,12 @@ class PostgresConfig:
     PASSWORD: str
     HOST: str
     PORT: int = 5432
+    POOL_SIZE: int = 10
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT: float = 30
+    POOL_RECYCLE: int = 1800
+    POOL_PRE_PING: bool = True
+    STATEMENT_CACHE_SIZE: int = 100
 
 
 @dataclass
@@ -32,6 +38,13 @@ class S3Config:
     REGION: str
     ACCESS_KEY_ID: str
     ACCESS_KEY: str
+    MANIFEST_CACHE_SIZE: int = 10000
+    MANIFEST_CACHE_TTL: float = 300
+    EVENTS_QUEUE: str = None
+    EVENTS_WEBHOOK_TOKEN: str = None
+    UPLOAD_STALE_AFTER: float = 2 * 3600
+    MULTIPART_STALE_AFTER: float = 24 * 3600
+    SWEEP_INTERVAL: float = 3600
 
 
 @dataclass
@@ -61,11 +74,28 @@ class ImgSearcherConfig:
     SEARCHER_TASKS_SENDER_ID: str
     SEARCHER_TASKS_RECEIVER_ID: str
     RABBITMQ: RabbitMQ
+    TASK_TTL: float = 3600
+    TASK_MAX_ENTRIES: int = 10000
+    TASK_TIMEOUT: float = 300
+    PREFETCH: int = 32
+    CONCURRENCY: int = 16
+    PUBLISH_TIMEOUT: float = 10
+    RESULT_CACHE_TTL: float = 30
+    RESULT_CACHE_SIZE: int = 10000
 
 
 @dataclass
 class JWTConfig:
     PUBLIC_KEY: str
+    CACHE_SIZE: int = 10000
+
+
+@dataclass
+class SharedStateConfig:
+    BACKEND: str = "local"  # local | mmap | postgres
+    MMAP_DIRECTORY: str = "/dev/shm"
+    MMAP_SIZE: int = 16 * 1024 * 1024
+    REFRESH_INTERVAL: float = 0.5
 
 
 @dataclass
@@ -84,6 +114,7 @@ class Config:
     BASE: BaseConfig
     IMG_SEARCHER: ImgSearcherConfig
     DB: DbConfig
+    SHARED_STATE: SharedStateConfig
 
 
 def to_bool(value) -> bool:
@@ -120,6 +151,8 @@ def load_config() -> Config:
     if not raw_yaml_config:
         raise ConfigParseError("Consul config is empty")
     config = yaml.safe_load(raw_yaml_config)
+    pool = config['database']['postgresql'].get('pool') or dict()
+    shared_state = config.get('shared_state') or dict()
 
     return Config(
         DEBUG=is_debug,
@@ -136,6 +169,7 @@ def load_config() -> Config:
         ),
         JWT=JWTConfig(
             PUBLIC_KEY=config['jwt']['public_key'],
+            CACHE_SIZE=int(config['jwt'].get('cache_size', JWTConfig.CACHE_SIZE)),
         ),
         DB=DbConfig(
             POSTGRESQL=PostgresConfig(
@@ -143,7 +177,13 @@ def load_config() -> Config:
                 PORT=config['database']['postgresql']['port'],
                 USERNAME=config['database']['postgresql']['username'],
                 PASSWORD=config['database']['postgresql']['password'],
-                DATABASE=config['database']['postgresql']['database']
+                DATABASE=config['database']['postgresql']['database'],
+                POOL_SIZE=int(pool.get('size', PostgresConfig.POOL_SIZE)),
+                MAX_OVERFLOW=int(pool.get('max_overflow', PostgresConfig.MAX_OVERFLOW)),
+                POOL_TIMEOUT=float(pool.get('timeout', PostgresConfig.POOL_TIMEOUT)),
+                POOL_RECYCLE=int(pool.get('recycle', PostgresConfig.POOL_RECYCLE)),
+                POOL_PRE_PING=to_bool(pool.get('pre_ping', PostgresConfig.POOL_PRE_PING)),
+                STATEMENT_CACHE_SIZE=int(pool.get('statement_cache_size', PostgresConfig.STATEMENT_CACHE_SIZE))
             ),
             S3=S3Config(
                 ENDPOINT_URL=config['database']['s3']['endpoint_url'],
@@ -151,7 +191,22 @@ def load_config() -> Config:
                 ACCESS_KEY_ID=config['database']['s3']['access_key'],
                 ACCESS_KEY=config['database']['s3']['secret_key'],
                 BUCKET=config['database']['s3']['bucket'],
-                PUBLIC_ENDPOINT_URL=config['database']['s3']['public_endpoint_url']
+                PUBLIC_ENDPOINT_URL=config['database']['s3']['public_endpoint_url'],
+                MANIFEST_CACHE_SIZE=int(
+                    config['database']['s3'].get('manifest_cache_size', S3Config.MANIFEST_CACHE_SIZE)
+                ),
+                MANIFEST_CACHE_TTL=float(
+                    config['database']['s3'].get('manifest_cache_ttl', S3Config.MANIFEST_CACHE_TTL)
+                ),
+                EVENTS_QUEUE=config['database']['s3'].get('events_queue'),
+                EVENTS_WEBHOOK_TOKEN=config['database']['s3'].get('events_webhook_token'),
+                UPLOAD_STALE_AFTER=float(
+                    config['database']['s3'].get('upload_stale_after', S3Config.UPLOAD_STALE_AFTER)
+                ),
+                MULTIPART_STALE_AFTER=float(
+                    config['database']['s3'].get('multipart_stale_after', S3Config.MULTIPART_STALE_AFTER)
+                ),
+                SWEEP_INTERVAL=float(config['database']['s3'].get('sweep_interval', S3Config.SWEEP_INTERVAL))
             ),
         ),
         IMG_SEARCHER=ImgSearcherConfig(
@@ -163,6 +218,20 @@ def load_config() -> Config:
                 USERNAME=config['img_searcher']['rabbitmq']['username'],
                 PASSWORD=config['img_searcher']['rabbitmq']['password'],
                 VHOST=config['img_searcher']['rabbitmq']['vhost']
-            )
+            ),
+            TASK_TTL=float(config['img_searcher'].get('task_ttl', ImgSearcherConfig.TASK_TTL)),
+            TASK_MAX_ENTRIES=int(config['img_searcher'].get('task_max_entries', ImgSearcherConfig.TASK_MAX_ENTRIES)),
+            TASK_TIMEOUT=float(config['img_searcher'].get('task_timeout', ImgSearcherConfig.TASK_TIMEOUT)),
+            PREFETCH=int(config['img_searcher'].get('prefetch', ImgSearcherConfig.PREFETCH)),
+            CONCURRENCY=int(config['img_searcher'].get('concurrency', ImgSearcherConfig.CONCURRENCY)),
+            PUBLISH_TIMEOUT=float(config['img_searcher'].get('publish_timeout', ImgSearcherConfig.PUBLISH_TIMEOUT)),
+            RESULT_CACHE_TTL=float(config['img_searcher'].get('result_cache_ttl', ImgSearcherConfig.RESULT_CACHE_TTL)),
+            RESULT_CACHE_SIZE=int(config['img_searcher'].get('result_cache_size', ImgSearcherConfig.RESULT_CACHE_SIZE))
+        ),
+        SHARED_STATE=SharedStateConfig(
+            BACKEND=shared_state.get('backend', SharedStateConfig.BACKEND),
+            MMAP_DIRECTORY=shared_state.get('mmap_directory', SharedStateConfig.MMAP_DIRECTORY),
+            MMAP_SIZE=int(shared_state.get('mmap_size', SharedStateConfig.MMAP_SIZE)),
+            REFRESH_INTERVAL=float(shared_state.get('refresh_interval', SharedStateConfig.REFRESH_INTERVAL))
         ),
     )
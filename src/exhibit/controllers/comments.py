@@ -1,12 +1,13 @@
 import uuid
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 
 from exhibit.dependencies.services import get_services
 from exhibit.models import schemas
 from exhibit.services import ServiceFactory
-from exhibit.views.comment import CommentResponse, CommentsResponse
+from exhibit.views.comment import CommentResponse, CommentsResponse, CommentThreadsResponse
 
 router = APIRouter()
 
@@ -29,15 +30,69 @@ async def create_comment(
 
 
 @router.get("", response_model=CommentsResponse, status_code=http_status.HTTP_200_OK)
-async def get_comments(exhibit_id: uuid.UUID, service: ServiceFactory = Depends(get_services)):
+async def get_comments(
+        exhibit_id: uuid.UUID,
+        parent_id: uuid.UUID = None,
+        depth: int = None,
+        limit: int = None,
+        service: ServiceFactory = Depends(get_services)
+):
     """
     Получить список комментариев публикации
 
     Требуемое состояние: -
 
     Требуемые права доступа: GET_PUBLIC_COMMENTS
+
+    depth ограничивает количество уровней вложенности, limit - количество комментариев (не более 5000).
+    Если указан parent_id, то возвращаются только ответы на этот комментарий,
+    что позволяет подгружать большие ветки по частям.
+    """
+    return CommentsResponse(content=await service.comment.get_comments(exhibit_id, parent_id, depth, limit))
+
+
+@router.get("/threads", response_model=CommentThreadsResponse, status_code=http_status.HTTP_200_OK)
+async def get_threads(
+        exhibit_id: uuid.UUID,
+        per_page: int = 10,
+        cursor: str = None,
+        response: Response = None,
+        service: ServiceFactory = Depends(get_services)
+):
+    """
+    Получить корневые комментарии публикации с количеством ответов
+
+    Требуемое состояние: -
+
+    Требуемые права доступа: GET_PUBLIC_COMMENTS
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Ответы на комментарий подгружаются через GET /comment?parent_id=
+    """
+    page_data = await service.comment.get_threads(exhibit_id, per_page, cursor)
+    if page_data.next_cursor:
+        response.headers["X-Next-Cursor"] = page_data.next_cursor
+    return CommentThreadsResponse(content=page_data.items)
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    status_code=http_status.HTTP_200_OK
+)
+async def stream_comments(exhibit_id: uuid.UUID, service: ServiceFactory = Depends(get_services)):
+    """
+    Получить все комментарии публикации потоком NDJSON
+
+    Требуемое состояние: -
+
+    Требуемые права доступа: GET_PUBLIC_COMMENTS
+
+    Каждая строка - комментарий без вложенности (parent_id, level),
+    родитель всегда передается раньше своих ответов.
     """
-    return CommentsResponse(content=await service.comment.get_comments(exhibit_id))
+    return StreamingResponse(await service.comment.stream_comments(exhibit_id), media_type="application/x-ndjson")
 
 
 @router.get("/{comment_id}", response_model=CommentResponse, status_code=http_status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 import uuid
 from typing import Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, Body, Header
 from fastapi import status as http_status
 
 from exhibit.dependencies.services import get_services
@@ -10,6 +10,7 @@ from exhibit.models.state import ExhibitState, RateState
 from exhibit.services import ServiceFactory
 from exhibit.views import ExhibitResponse, ExhibitsResponse
 from exhibit.views.exhibit import ExhibitFilesResponse, FileUploadResponse, ExhibitFileResponse
+from exhibit.views.exhibit import MultipartUploadResponse, UploadPartUrlsResponse
 
 router = APIRouter()
 
@@ -22,6 +23,8 @@ async def get_exhibits(
         query: str = None,
         state: ExhibitState = ExhibitState.PUBLISHED,
         owner_id: uuid.UUID = None,
+        cursor: str = None,
+        response: Response = None,
         services: ServiceFactory = Depends(get_services)
 ):
     """
@@ -33,10 +36,22 @@ async def get_exhibits(
 
     Если указан owner_id, то возвращаются только экспоната этого пользователя,
     причем пользователь с доступом GET_PRIVATE_EXHIBITS может просматривать чужие публикации.
+
+    Если указан query, то выполняется полнотекстовый поиск по заголовку и содержимому:
+    результаты отсортированы по релевантности, а в поле highlight возвращаются фрагменты
+    с совпадениями. highlight - безопасный HTML: содержимое экранировано,
+    совпадения выделены тегом <b>.
+
+    Курсоры соседних страниц возвращаются в заголовках X-Next-Cursor и X-Prev-Cursor (кроме поиска).
+    Если передан cursor, то page игнорируется, а время ответа не зависит от глубины страницы.
+    Курсор действителен только для того же order_by.
     """
-    return ExhibitsResponse(
-        content=await services.exhibit.get_exhibits(page, per_page, order_by, query, state, owner_id)
-    )
+    page_data = await services.exhibit.get_exhibits(page, per_page, order_by, query, state, owner_id, cursor)
+    if page_data.next_cursor:
+        response.headers["X-Next-Cursor"] = page_data.next_cursor
+    if page_data.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page_data.prev_cursor
+    return ExhibitsResponse(content=page_data.items)
 
 
 @router.post("", response_model=ExhibitResponse, status_code=http_status.HTTP_201_CREATED)
@@ -138,6 +153,142 @@ async def get_exhibit_file(
     return ExhibitFileResponse(content=await services.exhibit.get_exhibit_file(exhibit_id, file_id, download))
 
 
+@router.post("/files/events", response_model=None, status_code=http_status.HTTP_204_NO_CONTENT)
+async def ingest_file_events(
+        payload: dict = Body(...),
+        authorization: str | None = Header(None),
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Принять уведомления хранилища о загруженных файлах (webhook S3 / MinIO)
+
+    Загрузка подтверждается без запроса клиента на подтверждение.
+    Требуется заголовок Authorization: Bearer <database.s3.events_webhook_token>
+
+    """
+    await services.upload_events.ingest_webhook(authorization, payload)
+
+
+@router.post(
+    "/files/{exhibit_id}/multipart",
+    response_model=MultipartUploadResponse,
+    status_code=http_status.HTTP_200_OK
+)
+async def start_multipart_upload(
+        exhibit_id: uuid.UUID,
+        data: schemas.MultipartUploadCreate,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Начать загрузку большого файла экспоната частями
+
+    Файл делится на parts_count частей по part_size байт, каждая часть загружается
+    PUT-запросом по своей ссылке (параллельно, в любом порядке). Ответ содержит ссылки
+    на первые 100 частей, остальные запрашиваются через /multipart/parts.
+    После загрузки всех частей нужно вызвать /multipart/complete.
+
+    Требуемое состояние: ACTIVE
+
+    Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
+
+    Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+    """
+    return MultipartUploadResponse(content=await services.exhibit.start_multipart_upload(exhibit_id, data))
+
+
+@router.get(
+    "/files/{exhibit_id}/{file_id}/multipart",
+    response_model=MultipartUploadResponse,
+    status_code=http_status.HTTP_200_OK
+)
+async def get_multipart_upload(
+        exhibit_id: uuid.UUID,
+        file_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Получить состояние загрузки частями для продолжения после обрыва
+
+    Ответ содержит уже загруженные части и ссылки на следующие незагруженные.
+
+    Требуемое состояние: ACTIVE
+
+    Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
+
+    Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+    """
+    return MultipartUploadResponse(content=await services.exhibit.get_multipart_upload(exhibit_id, file_id))
+
+
+@router.post(
+    "/files/{exhibit_id}/{file_id}/multipart/parts",
+    response_model=UploadPartUrlsResponse,
+    status_code=http_status.HTTP_200_OK
+)
+async def sign_multipart_upload_parts(
+        exhibit_id: uuid.UUID,
+        file_id: uuid.UUID,
+        data: schemas.MultipartUploadParts,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Получить ссылки на загрузку частей файла (не более 100 за раз)
+
+    Требуемое состояние: ACTIVE
+
+    Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
+
+    Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+    """
+    return UploadPartUrlsResponse(
+        content=await services.exhibit.sign_multipart_upload_parts(exhibit_id, file_id, data)
+    )
+
+
+@router.post(
+    "/files/{exhibit_id}/{file_id}/multipart/complete",
+    response_model=None,
+    status_code=http_status.HTTP_204_NO_CONTENT
+)
+async def complete_multipart_upload(
+        exhibit_id: uuid.UUID,
+        file_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Завершить загрузку частями и подтвердить файл экспоната
+
+    Требуемое состояние: ACTIVE
+
+    Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
+
+    Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+    """
+    await services.exhibit.complete_multipart_upload(exhibit_id, file_id)
+
+
+@router.delete(
+    "/files/{exhibit_id}/{file_id}/multipart",
+    response_model=None,
+    status_code=http_status.HTTP_204_NO_CONTENT
+)
+async def abort_multipart_upload(
+        exhibit_id: uuid.UUID,
+        file_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Отменить загрузку частями (загруженные части удаляются)
+
+    Требуемое состояние: ACTIVE
+
+    Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
+
+    Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+    """
+    await services.exhibit.abort_multipart_upload(exhibit_id, file_id)
+
+
 @router.post(
     "/files/{exhibit_id}",
     response_model=FileUploadResponse,
@@ -174,6 +325,9 @@ async def confirm_exhibit_file(
     Требуемые права доступа: UPDATE_SELF_EXHIBITS / UPDATE_USER_EXHIBITS
 
     Причем пользователь с доступом UPDATE_USER_EXHIBITS может редактировать чужие публикации.
+
+    Подтверждение идемпотентно: загрузка обычно подтверждается раньше по уведомлению
+    хранилища, поэтому для уже загруженного файла возвращается 204, а не 400.
     """
     await services.exhibit.confirm_exhibit_file_upload(exhibit_id, file_id)
 
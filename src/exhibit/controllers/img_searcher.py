@@ -2,13 +2,15 @@ import uuid
 
 from fastapi import APIRouter, Depends
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 
 from exhibit.dependencies.services import get_services
 from exhibit.models import schemas
+from exhibit.models.state import ReindexScope
 from exhibit.services import ServiceFactory
 from exhibit.views import ExhibitsResponse
 from exhibit.views.exhibit import FileUploadResponse
-from exhibit.views.img_result import ImgSearchResultResponse
+from exhibit.views.img_result import ImgSearchResultResponse, ReindexJobResponse
 
 router = APIRouter()
 
@@ -46,10 +48,86 @@ async def make_search_task(
 @router.get("/task/{file_id}", response_model=ImgSearchResultResponse, status_code=http_status.HTTP_201_CREATED)
 async def get_task_result(
         file_id: uuid.UUID,
+        wait: int = 0,
         services: ServiceFactory = Depends(get_services)
 ):
     """
     Получить результат поиска по изображению
 
+    wait - время ожидания результата в секундах (long-poll, до 60):
+    ответ приходит сразу после завершения задачи, 202 - если время истекло
+
+    """
+    return ImgSearchResultResponse(content=await services.img_searcher.get_task_result(file_id, wait))
+
+
+@router.get(
+    "/task/{file_id}/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+    status_code=http_status.HTTP_200_OK
+)
+async def stream_task_result(
+        file_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Получить результат поиска по изображению через Server-Sent Events
+
+    Событие result содержит ImgResult, событие error - status_code и message.
+    Соединение закрывается после первого из них.
+
+    """
+    return StreamingResponse(
+        await services.img_searcher.stream_task_result(file_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/reindex", response_model=ReindexJobResponse, status_code=http_status.HTTP_202_ACCEPTED)
+async def start_reindex(
+        scope: ReindexScope = ReindexScope.FILES,
+        rate_limit: int = 1000,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Запустить массовую переиндексацию поисковика
+
+    scope - files (все загруженные файлы) или posters (постеры экспонатов),
+    rate_limit - максимальное количество сообщений в секунду.
+    Незавершенное задание той же области (приостановленное, прерванное остановкой
+    процесса или проваленное - FAILED) продолжается с последней контрольной точки.
+
+    Требуемые права доступа: REINDEX_IMG_SEARCHER
+
+    """
+    return ReindexJobResponse(content=await services.img_searcher.start_reindex(scope, rate_limit))
+
+
+@router.get("/reindex/{job_id}", response_model=ReindexJobResponse, status_code=http_status.HTTP_200_OK)
+async def get_reindex(
+        job_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Получить прогресс переиндексации (processed/total, rate, eta_seconds)
+
+    Требуемые права доступа: REINDEX_IMG_SEARCHER
+
+    """
+    return ReindexJobResponse(content=await services.img_searcher.get_reindex(job_id))
+
+
+@router.post("/reindex/{job_id}/pause", response_model=None, status_code=http_status.HTTP_204_NO_CONTENT)
+async def pause_reindex(
+        job_id: uuid.UUID,
+        services: ServiceFactory = Depends(get_services)
+):
+    """
+    Приостановить переиндексацию (продолжается повторным запуском)
+
+    Требуемые права доступа: REINDEX_IMG_SEARCHER
+
     """
-    return ImgSearchResultResponse(content=await services.img_searcher.get_task_result(file_id))
+    await services.img_searcher.pause_reindex(job_id)
@@ -17,6 +17,16 @@ async def version(details: bool = False, services: ServiceFactory = Depends(get_
     return await services.stats.get_stats(details)
 
 
+@router.get("/metrics", response_model=dict, status_code=http_status.HTTP_200_OK)
+async def metrics(services: ServiceFactory = Depends(get_services)):
+    """
+    Получить внутренние метрики приложения
+
+    Требуемые права доступа: GET_METRICS
+    """
+    return await services.stats.get_metrics()
+
+
 @router.get("/ping", response_model=str, status_code=http_status.HTTP_200_OK)
 def ping():
     return "pong"
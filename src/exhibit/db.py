@@ -1,7 +1,48 @@
+import time
 import urllib.parse
 
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from exhibit.utils.metrics import Histogram
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений с метриками ожидания соединения
+
+    Время checkout включает ожидание свободного соединения,
+    открытие нового (overflow) и pre-ping.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_ms = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000))
+        self.timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_ms.observe((time.perf_counter() - start) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeouts": self.timeouts,
+            "wait_ms": self.wait_ms.snapshot(),
+        }
 
 
 def create_psql_async_session(
@@ -11,7 +52,21 @@ def create_psql_async_session(
         port: int,
         database: str,
         echo: bool = False,
+        pool_size: int = 10,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        statement_cache_size: int = 100,
 ) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    """
+    :param pool_size: количество постоянных соединений
+    :param max_overflow: количество дополнительных соединений сверх pool_size
+    :param pool_timeout: время ожидания свободного соединения (сек)
+    :param pool_recycle: время жизни соединения (сек), -1 - без ограничения
+    :param pool_pre_ping: проверять соединение перед выдачей из пула
+    :param statement_cache_size: размер кэша подготовленных выражений asyncpg на соединение (0 - отключен)
+    """
     engine = create_async_engine(
         "postgresql+asyncpg://{username}:{password}@{host}:{port}/{database}".format(
             username=urllib.parse.quote_plus(username),
@@ -21,7 +76,14 @@ def create_psql_async_session(
             database=database
         ),
         echo=echo,
-        future=True
+        future=True,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": statement_cache_size},
     )
     return engine, async_sessionmaker(engine, expire_on_commit=False)
 
@@ -1,7 +1,7 @@
 from fastapi.requests import Request
 from fastapi.websockets import WebSocket
 
-from exhibit.services.repository import RepoFactory
+from exhibit.services.repository import RepoFactory, UnitOfWork
 
 
 async def get_repos(request: Request = None, websocket: WebSocket = None) -> RepoFactory:
@@ -10,4 +10,12 @@ async def get_repos(request: Request = None, websocket: WebSocket = None) -> Rep
     else:
         app = websocket.app
     async with app.state.db_session() as session:
-        yield RepoFactory(session)
+        uow = UnitOfWork(session)
+        try:
+            yield RepoFactory(session, uow)
+            await uow.commit()
+        except Exception:
+            await uow.rollback()
+            raise
+        finally:
+            uow.close()
@@ -19,5 +19,13 @@ async def get_services(
         config=global_scope.config,
         file_storage=global_scope.file_storage,
         isa=global_scope.isa,
-        task_result=global_scope.task_result
+        task_result=global_scope.task_result,
+        view_counter=global_scope.view_counter,
+        outbox=global_scope.outbox,
+        reindexer=global_scope.reindexer,
+        exhibit_cache=global_scope.exhibit_cache,
+        file_manifest_cache=global_scope.file_manifest_cache,
+        upload_events=global_scope.upload_events,
+        storage_purge=global_scope.storage_purge,
+        metrics=global_scope.metrics
     )
@@ -5,15 +5,26 @@ import os
 from typing import Callable
 
 import aio_pika
-from aio_pika.abc import AbstractRobustConnection
+from aio_pika.abc import AbstractRobustConnection, AbstractIncomingMessage
 from aio_pika.pool import Pool
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 
 from exhibit.config import Config, ImgSearcherConfig
 from exhibit.db import create_psql_async_session
-from exhibit.services.auth.scheduler import update_reauth_list
+from exhibit.services.auth import JWTManager
+from exhibit.services.auth.reauth import ReauthSessionList
+from exhibit.services.consumer import SupervisedConsumer
 from exhibit.services.img_searcher import ImgSearchAdapter, update_task_result
+from exhibit.services.outbox import OutboxRelay
+from exhibit.services.purge import StoragePurge
+from exhibit.services.repository import UnitOfWork
+from exhibit.services.reindex import ImgSearchReindexer
+from exhibit.services.shared_state import create_shared_state, SharedTTLCache
+from exhibit.services.task_store import TaskStore
+from exhibit.services.uploads import UploadEvents, UploadSweeper
+from exhibit.services.variants import ImageVariants
+from exhibit.services.view_counter import ViewCounter
+from exhibit.utils.cache import TTLCache
 from exhibit.utils.s3 import S3Storage
 
 
@@ -25,22 +36,91 @@ async def init_db(app: FastAPI, config: Config):
         password=config.DB.POSTGRESQL.PASSWORD,
         database=config.DB.POSTGRESQL.DATABASE,
         echo=config.DEBUG,
+        pool_size=config.DB.POSTGRESQL.POOL_SIZE,
+        max_overflow=config.DB.POSTGRESQL.MAX_OVERFLOW,
+        pool_timeout=config.DB.POSTGRESQL.POOL_TIMEOUT,
+        pool_recycle=config.DB.POSTGRESQL.POOL_RECYCLE,
+        pool_pre_ping=config.DB.POSTGRESQL.POOL_PRE_PING,
+        statement_cache_size=config.DB.POSTGRESQL.STATEMENT_CACHE_SIZE,
     )
+    app.state.db_engine = engine
     app.state.db_session = session
 
 
-async def init_reauth_checker(app: FastAPI, config: Config):
-    scheduler = AsyncIOScheduler()
+async def init_view_counter(app: FastAPI):
+    app.state.view_counter = ViewCounter(app.state.db_session)
+    app.state.view_counter.start()
+
+
+async def init_shared_state(app: FastAPI, config: Config):
+    states = dict()
+    for name in ("reauth_sessions", "task_result", "exhibit_cache", "file_manifest_cache"):
+        states[name] = create_shared_state(
+            name,
+            config.SHARED_STATE.BACKEND,
+            session_maker=app.state.db_session,
+            mmap_directory=config.SHARED_STATE.MMAP_DIRECTORY,
+            mmap_size=config.SHARED_STATE.MMAP_SIZE,
+            refresh_interval=config.SHARED_STATE.REFRESH_INTERVAL
+        )
+        await states[name].start()
+
+    app.state.reauth_session_dict = states["reauth_sessions"]
+    app.state.task_result = TaskStore(
+        states["task_result"],
+        ttl=config.IMG_SEARCHER.TASK_TTL,
+        max_entries=config.IMG_SEARCHER.TASK_MAX_ENTRIES,
+        in_process_timeout=config.IMG_SEARCHER.TASK_TIMEOUT,
+        hydrated_size=config.IMG_SEARCHER.RESULT_CACHE_SIZE,
+        hydrated_ttl=config.IMG_SEARCHER.RESULT_CACHE_TTL
+    )
+    app.state.task_result.start()
+
+    # Кэши процессов, изменения экспонатов и файлов сбрасывают их во всех процессах
+    app.state.exhibit_cache = SharedTTLCache(
+        states["exhibit_cache"],
+        maxsize=config.IMG_SEARCHER.RESULT_CACHE_SIZE,
+        ttl=config.IMG_SEARCHER.RESULT_CACHE_TTL
+    )
+    app.state.file_manifest_cache = SharedTTLCache(
+        states["file_manifest_cache"],
+        maxsize=config.DB.S3.MANIFEST_CACHE_SIZE,
+        ttl=config.DB.S3.MANIFEST_CACHE_TTL
+    )
+
+
+async def init_reauth_checker(app: FastAPI):
     ums_grps_host = os.getenv("UMS_GRPC_HOST")
     ums_grps_port = int(os.getenv("UMS_GRPC_PORT"))
-    scheduler.add_job(
-        update_reauth_list,
-        'interval',
-        seconds=5,
-        args=[app, config, (ums_grps_host, ums_grps_port)]
+
+    app.state.reauth_list = ReauthSessionList(
+        f"{ums_grps_host}:{ums_grps_port}",
+        store=app.state.reauth_session_dict
     )
-    logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
-    scheduler.start()
+
+    # Синхронизацию с UMS выполняет один процесс, остальные ждут освобождения лидерства.
+    # Лидерство проверяется на каждом цикле: потерявший его процесс останавливает синхронизацию,
+    # а завершившаяся задача синхронизации у лидера перезапускается
+    async def lead() -> None:
+        leading = False
+        while True:
+            try:
+                is_leader = await app.state.reauth_session_dict.try_lead()
+            except Exception as e:
+                logging.error(f"Ошибка получения лидерства синхронизации с UMS: {e}")
+                is_leader = False
+
+            if is_leader and not app.state.reauth_list.running:
+                if leading:
+                    logging.error("Синхронизация с UMS остановилась, перезапуск")
+                    await app.state.reauth_list.stop()
+                app.state.reauth_list.start()
+            elif leading and not is_leader:
+                await app.state.reauth_list.stop()
+            leading = is_leader
+            await asyncio.sleep(5)
+
+    app.state.reauth_leader_task = asyncio.get_running_loop().create_task(lead())
 
 
 async def init_img_search_adapter(app: FastAPI, config: ImgSearcherConfig):
@@ -57,31 +137,70 @@ async def init_img_search_adapter(app: FastAPI, config: ImgSearcherConfig):
 
     async def get_channel() -> aio_pika.Channel:
         async with connection_pool.acquire() as connection:
-            return await connection.channel()
+            return await connection.channel(publisher_confirms=True)
 
     channel_pool = Pool(get_channel, max_size=10)
 
-    getattr(app, "state").task_result = dict()
-
-    getattr(app, "state").isa = ImgSearchAdapter(
+    app.state.isa_pools = (connection_pool, channel_pool)
+    app.state.isa = ImgSearchAdapter(
         channel_pool,
         config
     )
 
-    async def consume() -> None:
-        async with channel_pool.acquire() as channel:
-            queue = await channel.declare_queue(
-                config.SEARCHER_TASKS_RECEIVER_ID,
-                durable=True,
-                exclusive=False,
-            )
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    await message.ack()
-                    await update_task_result(message, app)
+    async def handle(message: AbstractIncomingMessage) -> None:
+        await update_task_result(message, app)
+
+    app.state.isa_consumer = SupervisedConsumer(
+        channel_pool,
+        config.SEARCHER_TASKS_RECEIVER_ID,
+        handler=handle,
+        prefetch=config.PREFETCH,
+        concurrency=config.CONCURRENCY
+    )
+    app.state.isa_consumer.start()
+
+
+async def init_outbox_relay(app: FastAPI):
+    async def index_files(payloads: list[dict]) -> None:
+        await app.state.isa.send_batch(json.dumps(payload) for payload in payloads)
+
+    app.state.outbox = OutboxRelay(
+        app.state.db_session,
+        handlers={"img_search": index_files}
+    )
+    app.state.outbox.start()
 
-    async with connection_pool, channel_pool:
-        await consume()
+
+async def init_upload_events(app: FastAPI, config: Config):
+    app.state.upload_events = UploadEvents(
+        app.state.db_session,
+        file_storage=app.state.file_storage,
+        outbox=app.state.outbox,
+        file_manifest_cache=app.state.file_manifest_cache,
+        exhibit_cache=app.state.exhibit_cache
+    )
+
+    # Уведомления хранилища из RabbitMQ (MinIO AMQP target), иначе только webhook
+    app.state.upload_events_consumer = None
+    if config.DB.S3.EVENTS_QUEUE:
+        app.state.upload_events_consumer = SupervisedConsumer(
+            app.state.isa_pools[1],
+            config.DB.S3.EVENTS_QUEUE,
+            handler=app.state.upload_events.handle_message,
+            prefetch=256,
+            concurrency=128
+        )
+        app.state.upload_events_consumer.start()
+
+    app.state.upload_sweeper = UploadSweeper(
+        app.state.db_session,
+        file_storage=app.state.file_storage,
+        upload_events=app.state.upload_events,
+        stale_after=config.DB.S3.UPLOAD_STALE_AFTER,
+        multipart_stale_after=config.DB.S3.MULTIPART_STALE_AFTER,
+        interval=config.DB.S3.SWEEP_INTERVAL
+    )
+    app.state.upload_sweeper.start()
 
 
 async def init_s3_storage(app: FastAPI, config: Config):
@@ -96,18 +215,53 @@ async def init_s3_storage(app: FastAPI, config: Config):
     )
 
 
+def init_metrics(app: FastAPI):
+    # Реестр метрик для /metrics: новый компонент добавляет сюда свою функцию stats
+    app.state.metrics = {
+        "view_counter": app.state.view_counter.stats,
+        "unit_of_work": UnitOfWork.stats,
+        "db_pool": app.state.db_engine.pool.stats,
+        "jwt_cache": app.state.jwt_manager.stats,
+        "reauth_list": app.state.reauth_list.stats,
+        "task_result": app.state.task_result.stats,
+        "img_search_publisher": app.state.isa.stats,
+        "img_search_consumer": app.state.isa_consumer.stats,
+        "outbox": app.state.outbox.stats,
+        "img_search_reindex": app.state.reindexer.stats,
+        "exhibit_cache": app.state.exhibit_cache.stats,
+        "file_manifest_cache": app.state.file_manifest_cache.stats,
+        "upload_events": app.state.upload_events.stats,
+        "upload_sweeper": app.state.upload_sweeper.stats,
+        "image_variants": app.state.image_variants.stats,
+        "storage_purge": app.state.storage_purge.stats,
+    }
+
+
 def create_start_app_handler(app: FastAPI, config: Config) -> Callable:
     async def start_app() -> None:
         logging.debug("Выполнение FastAPI startup event handler.")
         await init_db(app, config)
+        await init_view_counter(app)
         await init_s3_storage(app, config)
 
-        app.state.reauth_session_dict = dict()
-        await init_reauth_checker(app, config)
+        app.state.jwt_manager = JWTManager(config.JWT, cache=TTLCache(maxsize=config.JWT.CACHE_SIZE))
+        await init_shared_state(app, config)
+        await init_reauth_checker(app)
 
-        asyncio.get_running_loop().create_task(
-            init_img_search_adapter(app, config.IMG_SEARCHER)
+        await init_img_search_adapter(app, config.IMG_SEARCHER)
+        await init_outbox_relay(app)
+        app.state.image_variants = ImageVariants(
+            app.state.db_session,
+            file_storage=app.state.file_storage,
+            file_manifest_cache=app.state.file_manifest_cache,
+            exhibit_cache=app.state.exhibit_cache
         )
+        app.state.image_variants.start()
+        app.state.storage_purge = StoragePurge(app.state.db_session, file_storage=app.state.file_storage)
+        app.state.storage_purge.start()
+        app.state.reindexer = ImgSearchReindexer(app.state.db_session, app.state.isa)
+        await init_upload_events(app, config)
+        init_metrics(app)
 
         logging.info("FastAPI Успешно запущен.")
 
@@ -117,5 +271,33 @@ def create_start_app_handler(app: FastAPI, config: Config) -> Callable:
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
         logging.debug("Выполнение FastAPI shutdown event handler.")
+        steps = [app.state.upload_sweeper.stop]
+        if app.state.upload_events_consumer:
+            steps.append(app.state.upload_events_consumer.stop)
+        steps += [
+            app.state.upload_events.stop,
+            app.state.reindexer.stop,
+            app.state.image_variants.stop,
+            app.state.storage_purge.stop,
+            app.state.outbox.stop,
+            app.state.isa_consumer.stop,
+            *(pool.close for pool in reversed(app.state.isa_pools)),
+            app.state.reauth_list.stop,
+            app.state.reauth_session_dict.stop,
+            app.state.task_result.stop,
+            app.state.exhibit_cache.stop,
+            app.state.file_manifest_cache.stop,
+            app.state.view_counter.stop,
+            app.state.file_storage.close,
+            app.state.db_engine.dispose,
+        ]
+        app.state.reauth_leader_task.cancel()
+
+        # Ошибка одного шага (например, сброса счетчика просмотров) не должна пропускать остальные
+        for step in steps:
+            try:
+                await step()
+            except Exception as e:
+                logging.error(f"Ошибка остановки {getattr(step, '__qualname__', step)}: {e}")
 
     return stop_app
@@ -1,33 +1,43 @@
 from starlette.authentication import AuthCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.exceptions import ExceptionMiddleware
-
-from fastapi.requests import Request
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Scope, Receive, Send
 
 from exhibit.models.schemas import Tokens
 from exhibit.models.auth import AuthenticatedUser, UnauthenticatedUser
 from exhibit.services.auth import JWTManager
 
 
-class JWTMiddlewareHTTP(BaseHTTPMiddleware):
+class JWTMiddlewareHTTP:
+    """
+    Аутентификация по JWT из cookies (чистый ASGI middleware)
+
+    Проверенные токены кэшируются в app.state.jwt_manager,
+    поэтому подпись каждого токена проверяется один раз.
+
+    """
 
-    def __init__(self, app: ExceptionMiddleware):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next):
-        jwt = JWTManager(config=request.app.state.config.JWT)
-        reauth_session_dict = request.app.state.reauth_session_dict
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        jwt: JWTManager = connection.app.state.jwt_manager
+        reauth_session_dict = connection.app.state.reauth_session_dict
 
         # States
-        session_id = request.cookies.get("session_id")
+        session_id = connection.cookies.get("session_id")
         current_tokens = Tokens(
-            access_token=request.cookies.get(jwt.COOKIE_ACCESS_KEY),
-            refresh_token=request.cookies.get(jwt.COOKIE_REFRESH_KEY)
+            access_token=connection.cookies.get(jwt.COOKIE_ACCESS_KEY),
+            refresh_token=connection.cookies.get(jwt.COOKIE_REFRESH_KEY)
         )
         is_valid_session = False
 
         # ----- pre_process -----
-        is_valid_access_token = jwt.is_valid_token(current_tokens.access_token)
+        access_payload = jwt.verify(current_tokens.access_token)
         is_valid_refresh_token = jwt.is_valid_token(current_tokens.refresh_token)
 
         if session_id and current_tokens.refresh_token:
@@ -39,19 +49,14 @@ class JWTMiddlewareHTTP(BaseHTTPMiddleware):
             bad_ref_token = reauth_session_dict.get(session_id)
             is_valid_session = (bad_ref_token != current_tokens.refresh_token)
 
-        is_auth = (is_valid_access_token and is_valid_refresh_token and is_valid_session)
+        is_auth = (access_payload is not None and is_valid_refresh_token and is_valid_session)
 
         # Установка данных авторизации
         if is_auth:
-            payload = jwt.decode_jwt(current_tokens.access_token)
-            request.scope["user"] = AuthenticatedUser(**payload.model_dump())
-            request.scope["auth"] = AuthCredentials(["authenticated"])
+            scope["user"] = AuthenticatedUser(**access_payload.model_dump())
+            scope["auth"] = AuthCredentials(["authenticated"])
         else:
-            request.scope["user"] = UnauthenticatedUser()
-            request.scope["auth"] = AuthCredentials()
-
-        response = await call_next(request)
-
-        # ----- post_process -----
+            scope["user"] = UnauthenticatedUser()
+            scope["auth"] = AuthCredentials()
 
-        return response
+        await self.app(scope, receive, send)
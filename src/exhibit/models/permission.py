@@ -28,3 +28,6 @@ class Permission(Enum):
     DELETE_USER_COMMENT = "DELETE_USER_COMMENT"
     UPDATE_USER_COMMENT = "UPDATE_USER_COMMENT"
     GET_DELETED_COMMENTS = "GET_DELETED_COMMENTS"
+
+    REINDEX_IMG_SEARCHER = "REINDEX_IMG_SEARCHER"
+    GET_METRICS = "GET_METRICS"
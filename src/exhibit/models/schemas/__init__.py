@@ -8,22 +8,33 @@ from .error import FieldErrorItem
 
 from .exhibit import Exhibit
 from .exhibit import ExhibitSmall
+from .exhibit import ExhibitPage
 from .exhibit import ExhibitCreate
 from .exhibit import ExhibitUpdate
 from .exhibit import ExhibitTagItem
 from .exhibit import ExhibitFile
 from .exhibit import ExhibitFileItem
+from .exhibit import FileVariant
 from .exhibit import FileCreate
 from .exhibit import FileUpload
+from .exhibit import MultipartUploadCreate
+from .exhibit import MultipartUploadParts
+from .exhibit import MultipartUpload
 
 from .img_result import ImgResult
+from .img_result import ReindexJob
 
 from .tag import Tag
 
 from .comment import Comment
 from .comment import CommentNode
+from .comment import CommentItem
+from .comment import CommentThread
+from .comment import CommentThreadPage
 from .comment import CommentBranch
 from .comment import CommentCreate
 from .comment import CommentUpdate
 
 from .s3 import PreSignedPostUrl
+from .s3 import UploadPartUrl
+from .s3 import UploadPart
@@ -34,6 +34,32 @@ class CommentNode(Comment):
         from_attributes = True
 
 
+class CommentItem(Comment):
+    """
+    Модель комментария без вложенных ответов (для потоковой выдачи)
+
+    """
+    parent_id: uuid.UUID | None
+    level: int
+
+
+class CommentThread(Comment):
+    """
+    Модель корневого комментария с количеством прямых ответов
+
+    """
+    replies_count: int
+
+
+class CommentThreadPage(BaseModel):
+    """
+    Страница корневых комментариев с курсором на следующую страницу
+
+    """
+    items: list[CommentThread]
+    next_cursor: str | None = None
+
+
 class CommentBranch(BaseModel):
     """
     Модель ветки комментария
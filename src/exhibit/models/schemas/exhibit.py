@@ -4,7 +4,7 @@ from datetime import datetime
 from pydantic import BaseModel, field_validator
 
 from exhibit.models.file_type import FileType
-from exhibit.models.schemas.s3 import PreSignedPostUrl
+from exhibit.models.schemas.s3 import PreSignedPostUrl, UploadPart, UploadPartUrl
 from exhibit.models.state import ExhibitState
 
 
@@ -16,11 +16,20 @@ class ExhibitTagItem(BaseModel):
         from_attributes = True
 
 
+class FileVariant(BaseModel):
+    name: str  # thumb - квадратная миниатюра, w<ширина> - копия заданной ширины
+    width: int
+    height: int
+    content_type: str
+    url: str
+
+
 class Exhibit(BaseModel):
     id: uuid.UUID
     title: str
     content: str
     poster: uuid.UUID | None
+    poster_variants: list[FileVariant] = []
     views: int
     likes_count: int
     tags: list[ExhibitTagItem]
@@ -38,11 +47,13 @@ class ExhibitSmall(BaseModel):
     id: uuid.UUID
     title: str
     poster: uuid.UUID | None
+    poster_variants: list[FileVariant] = []
     views: int
     likes_count: int
     tags: list[ExhibitTagItem]
     state: ExhibitState
     owner_id: uuid.UUID
+    highlight: str | None = None  # Фрагменты контента с совпадениями, экранированный HTML (только для поиска)
 
     created_at: datetime
     updated_at: datetime | None
@@ -51,6 +62,16 @@ class ExhibitSmall(BaseModel):
         from_attributes = True
 
 
+class ExhibitPage(BaseModel):
+    """
+    Страница списка экспонатов с курсорами на соседние страницы
+
+    """
+    items: list[ExhibitSmall]
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
 class ExhibitCreate(BaseModel):
     title: str
     content: str
@@ -131,6 +152,7 @@ class ExhibitFileItem(BaseModel):
     filename: str
     content_type: str
     url: str
+    variants: list[FileVariant] = []
 
     created_at: datetime
     updated_at: datetime | None
@@ -144,3 +166,50 @@ class FileCreate(BaseModel):
 class FileUpload(BaseModel):
     file_id: uuid.UUID
     upload_url: PreSignedPostUrl
+
+
+class MultipartUploadCreate(BaseModel):
+    filename: str
+    content_type: FileType
+    size: int
+
+    @field_validator('size')
+    def size_must_be_valid(cls, value):
+        if value < 1:
+            raise ValueError("Размер файла должен быть больше 0")
+        return value
+
+
+class MultipartUploadParts(BaseModel):
+    part_numbers: list[int]
+
+    @field_validator('part_numbers')
+    def part_numbers_must_be_valid(cls, value):
+        if not value:
+            raise ValueError("Не указаны номера частей")
+
+        if len(value) > 100:
+            raise ValueError("Нельзя запросить больше 100 ссылок за раз")
+
+        if any(number < 1 or number > 10000 for number in value):
+            raise ValueError("Номер части должен быть от 1 до 10000")
+        return sorted(set(value))
+
+
+class MultipartUpload(BaseModel):
+    """
+    Состояние multipart-загрузки
+
+    Файл делится на parts_count частей по part_size байт (последняя может быть
+    меньше), каждая часть загружается PUT-запросом по своей ссылке (части можно
+    загружать параллельно). После обрыва загрузка продолжается: uploaded_parts
+    содержит уже принятые хранилищем части, ссылки на остальные запрашиваются заново.
+
+    """
+    file_id: uuid.UUID
+    upload_id: str
+    size: int
+    part_size: int
+    parts_count: int
+    uploaded_parts: list[UploadPart]
+    part_urls: list[UploadPartUrl]
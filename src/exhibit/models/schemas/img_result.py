@@ -1,8 +1,42 @@
-from pydantic import BaseModel
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, computed_field
 
 from exhibit.models.schemas import ExhibitSmall
+from exhibit.models.state import ReindexScope, ReindexState
 
 
 class ImgResult(BaseModel):
     classif: str
     result: list[ExhibitSmall]
+
+
+class ReindexJob(BaseModel):
+    """
+    Задание массовой переиндексации
+
+    rate - скорость отправки (сообщений в секунду) во время выполнения
+
+    """
+    id: uuid.UUID
+    scope: ReindexScope
+    state: ReindexState
+    rate_limit: int
+    total: int
+    processed: int
+    rate: float | None
+    error: str | None
+
+    created_at: datetime
+    updated_at: datetime | None
+
+    @computed_field
+    @property
+    def eta_seconds(self) -> float | None:
+        if self.state != ReindexState.RUNNING or not self.rate:
+            return None
+        return round(max(self.total - self.processed, 0) / self.rate, 1)
+
+    class Config:
+        from_attributes = True
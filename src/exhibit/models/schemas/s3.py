@@ -7,3 +7,14 @@ class PreSignedPostUrl(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+
+class UploadPart(BaseModel):
+    part_number: int
+    etag: str
+    size: int
@@ -27,3 +27,15 @@ class NotificationType(int, Enum):
 class RateState(int, Enum):
     NEUTRAL = 0
     LIKE = 1
+
+
+class ReindexScope(str, Enum):
+    FILES = "files"
+    POSTERS = "posters"
+
+
+class ReindexState(int, Enum):
+    RUNNING = 0
+    PAUSED = 1
+    FAILED = 2
+    DONE = 3
@@ -6,3 +6,6 @@ from .notification import Notification
 from .like import Like
 from .file import File
 from .exhibit import Exhibit, ExhibitTag
+from .shared_state import SharedStateNamespace, SharedStateItem
+from .outbox import OutboxMessage
+from .reindex import ReindexJob
@@ -1,6 +1,7 @@
 import uuid
 
 from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func, ForeignKey, Integer, BigInteger
+from sqlalchemy import Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from exhibit.db import Base
@@ -43,7 +44,12 @@ class CommentTree(Base):
     """
 
     __tablename__ = "comment_tree"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_comment_tree_exhibit_id", "exhibit_id"),
+        Index("ix_comment_tree_descendant_id", "descendant_id"),
+        UniqueConstraint("ancestor_id", "descendant_id", name="uq_comment_tree_ancestor_id_descendant_id"),
+        {'extend_existing': True}
+    )
 
     id = Column(BigInteger(), primary_key=True, autoincrement=True)
     ancestor_id = Column(UUID(as_uuid=True), nullable=False)
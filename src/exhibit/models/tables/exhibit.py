@@ -1,7 +1,9 @@
 import uuid
 
-from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func, ForeignKey, BIGINT
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func, ForeignKey, BIGINT, Computed, Index
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from exhibit.db import Base
 
@@ -13,7 +15,16 @@ class Exhibit(Base):
     The Exhibit model
     """
     __tablename__ = "exhibits"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_exhibits_state_owner_id_created_at", "state", "owner_id", "created_at"),
+        # Keyset пагинация списка экспонатов по (order_by, id)
+        Index("ix_exhibits_state_created_at_id", "state", "created_at", "id"),
+        Index("ix_exhibits_state_updated_at_id", "state", "updated_at", "id"),
+        Index("ix_exhibits_state_title_id", "state", "title", "id"),
+        Index("ix_exhibits_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_exhibits_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(VARCHAR(255), nullable=False)
@@ -21,12 +32,19 @@ class Exhibit(Base):
     content = Column(VARCHAR(32000), nullable=False)
     state = Column(Enum(ExhibitState), default=ExhibitState.DRAFT)
     views = Column(BIGINT(), nullable=False, default=0)
+    likes_count = Column(BIGINT(), nullable=False, default=0, server_default="0")
     owner_id = Column(UUID(as_uuid=True), nullable=False)
     likes = relationship("models.tables.like.Like", back_populates="exhibit")
     tags = relationship('models.tables.tag.Tag', secondary='exhibit_tags', back_populates='exhibits')
     comments_tree = relationship("models.tables.comment.CommentTree", back_populates="exhibit")
     files = relationship("models.tables.file.File", back_populates="exhibit")
 
+    # Полнотекстовый индекс (конфигурация russian обрабатывает и латиницу через english_stem)
+    search_vector = deferred(Column(TSVECTOR(), Computed(
+        "setweight(to_tsvector('russian', title), 'A') || setweight(to_tsvector('russian', content), 'B')",
+        persisted=True
+    )))
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -39,7 +57,10 @@ class ExhibitTag(Base):
     Many-to-many table for Exhibit and Tag
     """
     __tablename__ = "exhibit_tags"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint("exhibit_id", "tag_id", name="uq_exhibit_tags_exhibit_id_tag_id"),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     exhibit_id = Column(UUID(as_uuid=True), ForeignKey("exhibits.id"), nullable=False)
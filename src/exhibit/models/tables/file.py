@@ -1,6 +1,7 @@
 import uuid
 
-from sqlalchemy import Column, UUID, DateTime, func, ForeignKey, VARCHAR, BOOLEAN
+from sqlalchemy import Column, UUID, DateTime, func, ForeignKey, VARCHAR, BOOLEAN, Index, BIGINT
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from exhibit.db import Base
@@ -12,7 +13,10 @@ class File(Base):
 
     """
     __tablename__ = "files"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_files_exhibit_id_is_uploaded", "exhibit_id", "is_uploaded"),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(VARCHAR(255), nullable=False)
@@ -20,6 +24,11 @@ class File(Base):
     exhibit = relationship("models.tables.exhibit.Exhibit", back_populates="files")
     content_type = Column(VARCHAR(255), nullable=False)
     is_uploaded = Column(BOOLEAN(), default=False)
+    # Незавершенная multipart-загрузка: идентификатор в хранилище и заявленный размер файла
+    upload_id = Column(VARCHAR(1024), nullable=True)
+    size = Column(BIGINT(), nullable=True)
+    # Уменьшенные копии изображения: [{"name", "format", "width", "height"}], NULL - еще не созданы
+    variants = Column(JSONB(none_as_null=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, UUID, DateTime, func, ForeignKey
+from sqlalchemy import Column, UUID, DateTime, func, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from exhibit.db import Base
@@ -12,7 +12,10 @@ class Like(Base):
 
     """
     __tablename__ = "likes"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint("exhibit_id", "owner_id", name="uq_likes_exhibit_id_owner_id"),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     owner_id = Column(UUID(as_uuid=True), nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func
+from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func, Index
 
 from exhibit.db import Base
 from exhibit.models.state import NotificationType
@@ -12,7 +12,10 @@ class Notification(Base):
 
     """
     __tablename__ = "notifications"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_notifications_owner_id_created_at", "owner_id", "created_at"),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     type = Column(Enum(NotificationType), default=NotificationType.COMMENT_ANSWER)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, VARCHAR, BigInteger, INTEGER, DateTime, func, Index
+from sqlalchemy.dialects.postgresql import JSONB
+
+from exhibit.db import Base
+
+
+class OutboxMessage(Base):
+    """
+    The OutboxMessage model
+
+    Сообщение для внешней системы, записанное в той же транзакции, что и
+    изменения, которые оно описывает. Доставляется OutboxRelay и удаляется
+    после подтверждения; available_at - время следующей попытки доставки.
+
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_available_at", "available_at"),
+        {'extend_existing': True}
+    )
+
+    id = Column(BigInteger(), primary_key=True, autoincrement=True)
+    topic = Column(VARCHAR(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(INTEGER, nullable=False, server_default="0")
+    last_error = Column(VARCHAR(255), nullable=True)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.id} {self.topic}>'
@@ -0,0 +1,41 @@
+import uuid
+
+from sqlalchemy import Column, UUID, VARCHAR, Enum, DateTime, func, BIGINT, INTEGER, FLOAT
+
+from exhibit.db import Base
+from exhibit.models.state import ReindexScope, ReindexState
+
+
+class ReindexJob(Base):
+    """
+    The ReindexJob model
+
+    Задание массовой переиндексации поисковика по изображению.
+    cursor - ключ последней отправленной записи (продолжение после остановки),
+    owner - идентификатор текущего запуска: продолжать задание может только он,
+    heartbeat_at - время последней контрольной точки (зависший запуск
+    может быть перехвачен после истечения аренды)
+
+    """
+    __tablename__ = "reindex_jobs"
+    __table_args__ = (
+        {'extend_existing': True},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    scope = Column(Enum(ReindexScope), nullable=False)
+    state = Column(Enum(ReindexState), nullable=False, default=ReindexState.RUNNING)
+    rate_limit = Column(INTEGER, nullable=False)
+    cursor = Column(UUID(as_uuid=True), nullable=True)
+    total = Column(BIGINT(), nullable=False, default=0)
+    processed = Column(BIGINT(), nullable=False, default=0)
+    rate = Column(FLOAT, nullable=True)
+    error = Column(VARCHAR(255), nullable=True)
+    owner = Column(UUID(as_uuid=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.id}>'
@@ -0,0 +1,52 @@
+from sqlalchemy import Column, VARCHAR, BIGINT, DateTime, func, Index
+from sqlalchemy.dialects.postgresql import JSONB
+
+from exhibit.db import Base
+
+
+class SharedStateNamespace(Base):
+    """
+    The SharedStateNamespace model
+
+    version - версия последнего изменения пространства,
+    horizon - версия, до которой удаленные записи могли быть вычищены
+    (читатель с более старой версией перечитывает пространство целиком)
+
+    """
+    __tablename__ = "shared_state_namespaces"
+    __table_args__ = (
+        {'extend_existing': True},
+    )
+
+    name = Column(VARCHAR(64), primary_key=True)
+    version = Column(BIGINT, nullable=False, server_default="0")
+    horizon = Column(BIGINT, nullable=False, server_default="0")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.name}>'
+
+
+class SharedStateItem(Base):
+    """
+    The SharedStateItem model
+
+    value = NULL - удаленная запись (хранится до очистки, чтобы читатели увидели удаление)
+
+    """
+    __tablename__ = "shared_state"
+    __table_args__ = (
+        Index("ix_shared_state_namespace_version", "namespace", "version"),
+        {'extend_existing': True}
+    )
+
+    namespace = Column(VARCHAR(64), primary_key=True)
+    key = Column(VARCHAR(255), primary_key=True)
+    value = Column(JSONB(none_as_null=True), nullable=True)
+    version = Column(BIGINT, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.namespace}/{self.key}>'
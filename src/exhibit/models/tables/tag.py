@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, UUID, VARCHAR, DateTime, func
+from sqlalchemy import Column, UUID, VARCHAR, DateTime, func, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from exhibit.db import Base
@@ -12,7 +12,10 @@ class Tag(Base):
 
     """
     __tablename__ = "tags"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint("title", name="uq_tags_title"),
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(VARCHAR(32), nullable=False)
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
-# source: blog_service_control.proto
+# source: ums_control.proto
 """Generated protocol buffer code."""
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import descriptor_pool as _descriptor_pool
@@ -13,13 +13,12 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11ums_control.proto\x12\x05greet\"\x10\n\x0eGetListRequest\"(\n\nDictionary\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"3\n\x0fListOfDictReply\x12 \n\x05\x64icts\x18\x01 \x03(\x0b\x32\x11.greet.Dictionary2R\n\x0eUserManagement\x12@\n\x0fGetListOfReauth\x12\x15.greet.GetListRequest\x1a\x16.greet.ListOfDictReplyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11ums_control.proto\x12\x05greet\"\x10\n\x0eGetListRequest\"(\n\nDictionary\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"3\n\x0fListOfDictReply\x12 \n\x05\x64icts\x18\x01 \x03(\x0b\x32\x11.greet.Dictionary\"\'\n\x0e\x43hangesRequest\x12\x15\n\rsince_version\x18\x01 \x01(\x04\";\n\x0cReauthChange\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\x12\x0f\n\x07\x64\x65leted\x18\x03 \x01(\x08\"S\n\x0c\x43hangesReply\x12\x0f\n\x07version\x18\x01 \x01(\x04\x12\x0c\n\x04\x66ull\x18\x02 \x01(\x08\x12$\n\x07\x63hanges\x18\x03 \x03(\x0b\x32\x13.greet.ReauthChange2\xd6\x01\n\x0eUserManagement\x12@\n\x0fGetListOfReauth\x12\x15.greet.GetListRequest\x1a\x16.greet.ListOfDictReply\x12>\n\x10GetReauthChanges\x12\x15.greet.ChangesRequest\x1a\x13.greet.ChangesReply\x12\x42\n\x12WatchReauthChanges\x12\x15.greet.ChangesRequest\x1a\x13.greet.ChangesReply0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'ums_control_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
-
   DESCRIPTOR._options = None
   _globals['_GETLISTREQUEST']._serialized_start=28
   _globals['_GETLISTREQUEST']._serialized_end=44
@@ -27,6 +26,12 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['_DICTIONARY']._serialized_end=86
   _globals['_LISTOFDICTREPLY']._serialized_start=88
   _globals['_LISTOFDICTREPLY']._serialized_end=139
-  _globals['_USERMANAGEMENT']._serialized_start=141
-  _globals['_USERMANAGEMENT']._serialized_end=223
+  _globals['_CHANGESREQUEST']._serialized_start=141
+  _globals['_CHANGESREQUEST']._serialized_end=180
+  _globals['_REAUTHCHANGE']._serialized_start=182
+  _globals['_REAUTHCHANGE']._serialized_end=241
+  _globals['_CHANGESREPLY']._serialized_start=243
+  _globals['_CHANGESREPLY']._serialized_end=326
+  _globals['_USERMANAGEMENT']._serialized_start=329
+  _globals['_USERMANAGEMENT']._serialized_end=543
 # @@protoc_insertion_point(module_scope)
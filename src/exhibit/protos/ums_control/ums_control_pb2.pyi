@@ -22,3 +22,29 @@ class ListOfDictReply(_message.Message):
     DICTS_FIELD_NUMBER: _ClassVar[int]
     dicts: _containers.RepeatedCompositeFieldContainer[Dictionary]
     def __init__(self, dicts: _Optional[_Iterable[_Union[Dictionary, _Mapping]]] = ...) -> None: ...
+
+class ChangesRequest(_message.Message):
+    __slots__ = ["since_version"]
+    SINCE_VERSION_FIELD_NUMBER: _ClassVar[int]
+    since_version: int
+    def __init__(self, since_version: _Optional[int] = ...) -> None: ...
+
+class ReauthChange(_message.Message):
+    __slots__ = ["key", "value", "deleted"]
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    DELETED_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    value: str
+    deleted: bool
+    def __init__(self, key: _Optional[str] = ..., value: _Optional[str] = ..., deleted: bool = ...) -> None: ...
+
+class ChangesReply(_message.Message):
+    __slots__ = ["version", "full", "changes"]
+    VERSION_FIELD_NUMBER: _ClassVar[int]
+    FULL_FIELD_NUMBER: _ClassVar[int]
+    CHANGES_FIELD_NUMBER: _ClassVar[int]
+    version: int
+    full: bool
+    changes: _containers.RepeatedCompositeFieldContainer[ReauthChange]
+    def __init__(self, version: _Optional[int] = ..., full: bool = ..., changes: _Optional[_Iterable[_Union[ReauthChange, _Mapping]]] = ...) -> None: ...
@@ -20,6 +20,16 @@ class UserManagementStub(object):
                 request_serializer=ums__control__pb2.GetListRequest.SerializeToString,
                 response_deserializer=ums__control__pb2.ListOfDictReply.FromString,
                 )
+        self.GetReauthChanges = channel.unary_unary(
+                '/greet.UserManagement/GetReauthChanges',
+                request_serializer=ums__control__pb2.ChangesRequest.SerializeToString,
+                response_deserializer=ums__control__pb2.ChangesReply.FromString,
+                )
+        self.WatchReauthChanges = channel.unary_stream(
+                '/greet.UserManagement/WatchReauthChanges',
+                request_serializer=ums__control__pb2.ChangesRequest.SerializeToString,
+                response_deserializer=ums__control__pb2.ChangesReply.FromString,
+                )
 
 
 class UserManagementServicer(object):
@@ -33,6 +43,21 @@ class UserManagementServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetReauthChanges(self, request, context):
+        """Unary: changes of the reauth list since the watermark
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchReauthChanges(self, request, context):
+        """Server streaming: changes since the watermark, then every new change.
+        The server sends an empty reply as a heartbeat while there are no changes.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_UserManagementServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -41,6 +66,16 @@ def add_UserManagementServicer_to_server(servicer, server):
                     request_deserializer=ums__control__pb2.GetListRequest.FromString,
                     response_serializer=ums__control__pb2.ListOfDictReply.SerializeToString,
             ),
+            'GetReauthChanges': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetReauthChanges,
+                    request_deserializer=ums__control__pb2.ChangesRequest.FromString,
+                    response_serializer=ums__control__pb2.ChangesReply.SerializeToString,
+            ),
+            'WatchReauthChanges': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchReauthChanges,
+                    request_deserializer=ums__control__pb2.ChangesRequest.FromString,
+                    response_serializer=ums__control__pb2.ChangesReply.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'greet.UserManagement', rpc_method_handlers)
@@ -68,3 +103,37 @@ class UserManagement(object):
             ums__control__pb2.ListOfDictReply.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetReauthChanges(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/greet.UserManagement/GetReauthChanges',
+            ums__control__pb2.ChangesRequest.SerializeToString,
+            ums__control__pb2.ChangesReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def WatchReauthChanges(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/greet.UserManagement/WatchReauthChanges',
+            ums__control__pb2.ChangesRequest.SerializeToString,
+            ums__control__pb2.ChangesReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -1,4 +1,5 @@
 from exhibit.models.auth import BaseUser
+from exhibit.services.shared_state import SharedTTLCache
 from . import auth
 from . import repository
 from .exhibit import ExhibitApplicationService
@@ -7,6 +8,13 @@ from .img_searcher import ImgSearcherApplicationService, ImgSearchAdapter
 from .notification import NotificationApplicationService
 from .permission import PermissionApplicationService
 from .stats import StatsApplicationService
+from .view_counter import ViewCounter
+from .consumer import SupervisedConsumer
+from .outbox import OutboxRelay
+from .uploads import UploadEvents, UploadSweeper, UploadEventsApplicationService
+from .reindex import ImgSearchReindexer
+from .variants import ImageVariants
+from .purge import StoragePurge
 
 
 class ServiceFactory:
@@ -18,7 +26,15 @@ class ServiceFactory:
             config,
             file_storage,
             isa,
-            task_result
+            task_result,
+            view_counter: ViewCounter,
+            outbox: OutboxRelay,
+            reindexer: ImgSearchReindexer,
+            exhibit_cache: SharedTTLCache,
+            file_manifest_cache: SharedTTLCache,
+            upload_events: UploadEvents,
+            storage_purge: StoragePurge,
+            metrics: dict
     ):
         self._repo = repo_factory
         self._current_user = current_user
@@ -26,6 +42,14 @@ class ServiceFactory:
         self._file_storage = file_storage
         self._isa = isa
         self._task_result = task_result
+        self._view_counter = view_counter
+        self._outbox = outbox
+        self._reindexer = reindexer
+        self._exhibit_cache = exhibit_cache
+        self._file_manifest_cache = file_manifest_cache
+        self._upload_events = upload_events
+        self._storage_purge = storage_purge
+        self._metrics = metrics
 
     @property
     def exhibit(self) -> ExhibitApplicationService:
@@ -37,8 +61,14 @@ class ServiceFactory:
             comment_tree_repo=self._repo.comment_tree,
             like_repo=self._repo.like,
             file_repo=self._repo.file,
+            outbox_repo=self._repo.outbox,
             file_storage=self._file_storage,
-            isa=self._isa
+            outbox=self._outbox,
+            storage_purge=self._storage_purge,
+            view_counter=self._view_counter,
+            uow=self._repo.uow,
+            file_manifest_cache=self._file_manifest_cache,
+            exhibit_cache=self._exhibit_cache
         )
 
     @property
@@ -57,7 +87,11 @@ class ServiceFactory:
 
     @property
     def stats(self) -> StatsApplicationService:
-        return StatsApplicationService(config=self._config)
+        return StatsApplicationService(
+            current_user=self._current_user,
+            config=self._config,
+            metrics=self._metrics
+        )
 
     @property
     def permission(self) -> PermissionApplicationService:
@@ -68,7 +102,18 @@ class ServiceFactory:
         return ImgSearcherApplicationService(
             current_user=self._current_user,
             exhibit_repo=self._repo.exhibit,
+            file_repo=self._repo.file,
             file_storage=self._file_storage,
             isa=self._isa,
-            task_result=self._task_result
+            task_result=self._task_result,
+            reindex_job_repo=self._repo.reindex_job,
+            reindexer=self._reindexer,
+            exhibit_cache=self._exhibit_cache
+        )
+
+    @property
+    def upload_events(self) -> UploadEventsApplicationService:
+        return UploadEventsApplicationService(
+            self._upload_events,
+            webhook_token=self._config.DB.S3.EVENTS_WEBHOOK_TOKEN
         )
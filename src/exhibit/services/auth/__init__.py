@@ -1,2 +1,3 @@
 from .filters import permission_filter, state_filter
 from .jwt import JWTManager
+from .reauth import ReauthSessionList
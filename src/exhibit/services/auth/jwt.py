@@ -1,7 +1,10 @@
+import hashlib
+
 from jose import JWTError, jwt
 
 from exhibit.config import JWTConfig
 from exhibit.models.schemas import TokenPayload
+from exhibit.utils.cache import TTLCache
 
 
 class JWTManager:
@@ -12,17 +15,44 @@ class JWTManager:
     COOKIE_ACCESS_KEY = "access_token"
     COOKIE_REFRESH_KEY = "refresh_token"
 
-    def __init__(self, config: JWTConfig):
+    def __init__(self, config: JWTConfig, cache: TTLCache = None):
+        """
+        :param config: конфигурация JWT
+        :param cache: кэш проверенных токенов (ключ - sha256 токена, запись живет до exp)
+        """
         self.public_key = config.PUBLIC_KEY
+        self._cache = cache
 
     def is_valid_token(self, token: str) -> bool:
+        return self.verify(token) is not None
+
+    def verify(self, token: str) -> TokenPayload | None:
+        """
+        Проверяет подпись и срок действия токена
+
+        Подпись каждого токена проверяется один раз, далее payload берется из кэша.
+
+        :param token: токен
+        :return: payload или None, если токен недействителен
+        """
+        if not token:
+            return None
+
+        key = None
+        if self._cache is not None:
+            key = hashlib.sha256(token.encode()).digest()
+            payload = self._cache.get(key)
+            if payload is not None:
+                return payload
+
         try:
-            TokenPayload(**jwt.decode(
-                token, self.public_key, algorithms=[self.algorithm],
-            ))
+            payload = self.decode_jwt(token)
         except (JWTError, ValueError, AttributeError):
-            return False
-        return True
+            return None
+
+        if key is not None:
+            self._cache.set(key, payload, expires_at=payload.exp)
+        return payload
 
     def decode_jwt(self, token: str) -> TokenPayload:
         """
@@ -32,3 +62,6 @@ class JWTManager:
         return TokenPayload(**jwt.decode(
             token, self.public_key, algorithms=[self.algorithm],
         ))
+
+    def stats(self) -> dict:
+        return self._cache.stats() if self._cache is not None else dict()
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+
+import grpc
+from exhibit.protos.ums_control import ums_control_pb2
+from exhibit.protos.ums_control import ums_control_pb2_grpc
+from exhibit.services.shared_state import SharedState
+
+
+class ReauthSessionList:
+    """
+    Синхронизация списка сессий, требующих повторной авторизации, с UMS
+
+    Используется постоянный gRPC канал и поток изменений WatchReauthChanges
+    с водяным знаком версии: после первого полного снимка приходят только
+    изменения. Если UMS не поддерживает поток, выполняется опрос
+    GetReauthChanges, а для старых версий UMS - полный снимок GetListOfReauth.
+
+    Список меняется только после успешного получения данных: полный снимок
+    атомарно заменяет содержимое хранилища, изменения записываются одной
+    операцией. При ошибке остается последний известный список.
+
+    При общем хранилище (несколько worker'ов) синхронизацию выполняет
+    только процесс-лидер, остальные читают хранилище.
+
+    """
+
+    def __init__(
+            self,
+            address: str,
+            store: SharedState,
+            poll_interval: float = 5.0,
+            max_backoff: float = 30.0
+    ):
+        """
+        :param address: адрес UMS (host:port)
+        :param store: хранилище списка (session_id -> refresh token)
+        :param poll_interval: интервал опроса, если поток изменений недоступен (сек)
+        :param max_backoff: максимальная пауза между попытками переподключения (сек)
+        """
+        self._address = address
+        self._store = store
+        self._poll_interval = poll_interval
+        self._max_backoff = max_backoff
+
+        self._version = 0
+        self._mode = "watch"
+        self._channel: grpc.aio.Channel | None = None
+        self._task: asyncio.Task | None = None
+
+        # Метрики
+        self._last_success_at: float | None = None
+        self._last_payload_bytes = 0
+        self._payload_bytes = 0
+        self._full_syncs = 0
+        self._deltas = 0
+        self._errors = 0
+
+    def start(self) -> None:
+        self._channel = grpc.aio.insecure_channel(self._address)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logging.error(f"[ReauthSessionList] Sync task failed: {e!r}")
+            self._task = None
+        if self._channel:
+            await self._channel.close()
+            self._channel = None
+
+    async def _run(self) -> None:
+        stub = ums_control_pb2_grpc.UserManagementStub(self._channel)
+        backoff = min(1.0, self._max_backoff)
+        while True:
+            try:
+                if self._mode == "watch":
+                    await self._watch(stub)
+                elif self._mode == "poll":
+                    await self._apply(await stub.GetReauthChanges(
+                        ums_control_pb2.ChangesRequest(since_version=self._version)
+                    ))
+                else:
+                    await self._apply_snapshot(await stub.GetListOfReauth(ums_control_pb2.GetListRequest()))
+                backoff = min(1.0, self._max_backoff)
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED and self._mode != "snapshot":
+                    self._mode = "poll" if self._mode == "watch" else "snapshot"
+                    logging.warning(f"[ReauthSessionList] UMS does not support method, fallback to {self._mode}")
+                    continue
+
+                self._errors += 1
+                logging.error(f"[ReauthSessionList] Error: {e.code()}: {e.details()}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+                continue
+            except Exception as e:
+                # Ошибка хранилища (общее состояние, переполнение сегмента) не должна
+                # останавливать синхронизацию: остается последний записанный список
+                self._errors += 1
+                logging.exception(f"[ReauthSessionList] Error: {e!r}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+                continue
+
+            # Поток закрыт сервером - переподключение с паузой, опрос - по интервалу
+            await asyncio.sleep(backoff if self._mode == "watch" else self._poll_interval)
+
+    async def _watch(self, stub: ums_control_pb2_grpc.UserManagementStub) -> None:
+        stream = stub.WatchReauthChanges(ums_control_pb2.ChangesRequest(since_version=self._version))
+        try:
+            async for reply in stream:
+                await self._apply(reply)
+        finally:
+            # Поток, прерванный ошибкой применения, не должен оставаться открытым на канале
+            stream.cancel()
+
+    async def _apply(self, reply: ums_control_pb2.ChangesReply) -> None:
+        if reply.full:
+            await self._store.replace({change.key: change.value for change in reply.changes if not change.deleted})
+            self._full_syncs += 1
+        elif reply.changes:
+            # Для каждого ключа действует последнее изменение
+            latest = {change.key: None if change.deleted else change.value for change in reply.changes}
+            await self._store.update(
+                {key: value for key, value in latest.items() if value is not None},
+                deleted=[key for key, value in latest.items() if value is None]
+            )
+            self._deltas += 1
+
+        self._version = reply.version
+        self._track(reply)
+
+    async def _apply_snapshot(self, reply: ums_control_pb2.ListOfDictReply) -> None:
+        await self._store.replace({d.key: d.value for d in reply.dicts})
+        self._full_syncs += 1
+        self._track(reply)
+
+    def _track(self, reply) -> None:
+        self._last_success_at = time.time()
+        self._last_payload_bytes = reply.ByteSize()
+        self._payload_bytes += self._last_payload_bytes
+
+    def stats(self) -> dict:
+        return {
+            "mode": self._mode,
+            "version": self._version,
+            "sessions": len(self._store),
+            "staleness_seconds": (
+                round(time.time() - self._last_success_at, 3) if self._last_success_at is not None else None
+            ),
+            "last_payload_bytes": self._last_payload_bytes,
+            "payload_bytes": self._payload_bytes,
+            "full_syncs": self._full_syncs,
+            "deltas": self._deltas,
+            "errors": self._errors,
+            "store": self._store.stats(),
+        }
@@ -1,5 +1,6 @@
 import uuid
 from datetime import timedelta, datetime
+from typing import AsyncIterator
 
 import pytz
 
@@ -15,6 +16,8 @@ from exhibit.services.auth.filters import permission_filter
 from exhibit.services.repository import CommentRepo, ExhibitRepo
 from exhibit.services.repository import CommentTreeRepo
 from exhibit.services.repository import NotificationRepo
+from exhibit.utils.cursor import encode_cursor, decode_cursor
+from exhibit.utils.stream import release_session
 
 
 class CommentApplicationService:
@@ -118,44 +121,168 @@ class CommentApplicationService:
         return schemas.Comment.model_validate(comment)
 
     @permission_filter(Permission.GET_PUBLIC_COMMENTS)
-    async def get_comments(self, exhibit_id: uuid.UUID) -> list[schemas.CommentNode]:
+    async def get_comments(
+            self,
+            exhibit_id: uuid.UUID,
+            parent_id: uuid.UUID = None,
+            depth: int = None,
+            limit: int = None
+    ) -> list[schemas.CommentNode]:
         """
-        Получить все комментарии экспонату
+        Получить дерево комментариев экспоната
+
+        :param exhibit_id: идентификатор экспоната
+        :param parent_id: загрузить только ответы на этот комментарий (ленивая загрузка поддерева)
+        :param depth: количество загружаемых уровней вложенности (всегда >= 1)
+        :param limit: максимальное количество комментариев (всегда >= 1, но <= comments_limit),
+                      при усечении сохраняются верхние уровни дерева
+        :return:
 
         """
+        if depth is not None and depth < 1:
+            raise exceptions.BadRequest("Неверная глубина дерева комментариев")
+        if limit is not None and limit < 1:
+            raise exceptions.BadRequest("Неверное количество комментариев")
+
+        comments_limit = 5000
+        if limit is not None:
+            limit = min(limit, comments_limit)
+
         exhibit = await self._exhibit_repo.get(id=exhibit_id)
         if exhibit is None:
             raise exceptions.NotFound("Публикация не найдена")
 
-        raw = await self._tree_repo.get_comments(exhibit_id)
+        root_level = 0
+        if parent_id is not None:
+            parent_as_node = await self._tree_repo.get(ancestor_id=parent_id, descendant_id=parent_id)
+            if parent_as_node is None:
+                raise exceptions.NotFound("Родительский комментарий не найден")
+
+            if parent_as_node.exhibit_id != exhibit_id:
+                raise exceptions.BadRequest(f"Комментарий не принадлежит экспонату с id:{exhibit_id}")
 
-        # Подготовка
-        comment_list = []
+            root_level = parent_as_node.level + 1
+
+        raw = await self._tree_repo.get_comments(
+            exhibit_id,
+            parent_id=parent_id,
+            max_level=root_level + depth - 1 if depth else None,
+            limit=limit
+        )
+
+        # Сборка дерева за один проход: строки упорядочены по уровню,
+        # поэтому родитель всегда уже находится в индексе
+        nodes: dict[uuid.UUID, schemas.CommentNode] = dict()
+        comment_tree = []
         for obj, nearest_ancestor_id, level in raw:
-            comment = schemas.Comment.model_validate(obj)
-            if comment.state == CommentState.DELETED:
-                if Permission.GET_DELETED_COMMENTS.value not in self._current_user.permissions:
-                    comment.content = "Комментарий удален"
-                else:
-                    comment.content = f"(Комментарий удален): {comment.content}"
-
-            comment_list.append(schemas.CommentNode(
-                **comment.model_dump(),
+            node = schemas.CommentNode(
+                id=obj.id,
+                content=self._visible_content(obj),
+                owner_id=obj.owner_id,
+                state=obj.state,
+                created_at=obj.created_at,
+                updated_at=obj.updated_at,
                 answers=[],
                 parent_id=nearest_ancestor_id,
                 level=level
-            ))
+            )
+            nodes[node.id] = node
 
-        # Сортировка
-        comment_tree = []
-        for comment in comment_list:
-            if comment.level == 0:
-                comment_tree.append(comment)
-            for descendant in comment_list:
-                if descendant.parent_id == comment.id:
-                    comment.answers.append(descendant)
+            if level == root_level:
+                comment_tree.append(node)
+            elif nearest_ancestor_id in nodes:
+                nodes[nearest_ancestor_id].answers.append(node)
         return comment_tree
 
+    @permission_filter(Permission.GET_PUBLIC_COMMENTS)
+    async def get_threads(
+            self,
+            exhibit_id: uuid.UUID,
+            per_page: int = 10,
+            cursor: str = None
+    ) -> schemas.CommentThreadPage:
+        """
+        Получить корневые комментарии экспоната с количеством ответов
+
+        :param exhibit_id: идентификатор экспоната
+        :param per_page: количество комментариев на странице (всегда >= 1, но <= per_page_limit)
+        :param cursor: курсор следующей страницы
+        :return:
+
+        """
+        if per_page < 1:
+            raise exceptions.BadRequest("Неверное количество элементов на странице")
+        per_page_limit = 100
+        per_page = min(per_page, per_page_limit)
+
+        position = None
+        if cursor:
+            try:
+                payload = decode_cursor(cursor)
+                position = (datetime.fromisoformat(payload["v"]), uuid.UUID(payload["id"]))
+            except (ValueError, TypeError, KeyError):
+                raise exceptions.BadRequest("Неверный курсор")
+
+        exhibit = await self._exhibit_repo.get(id=exhibit_id)
+        if exhibit is None:
+            raise exceptions.NotFound("Публикация не найдена")
+
+        raw = await self._tree_repo.get_threads(exhibit_id, limit=per_page + 1, cursor=position)
+
+        items = [
+            schemas.CommentThread(
+                id=obj.id,
+                content=self._visible_content(obj),
+                owner_id=obj.owner_id,
+                state=obj.state,
+                created_at=obj.created_at,
+                updated_at=obj.updated_at,
+                replies_count=replies_count
+            )
+            for obj, replies_count in raw[:per_page]
+        ]
+
+        next_cursor = None
+        if len(raw) > per_page:
+            next_cursor = encode_cursor({"v": items[-1].created_at.isoformat(), "id": str(items[-1].id)})
+        return schemas.CommentThreadPage(items=items, next_cursor=next_cursor)
+
+    @permission_filter(Permission.GET_PUBLIC_COMMENTS)
+    async def stream_comments(self, exhibit_id: uuid.UUID) -> AsyncIterator[str]:
+        """
+        Получить все комментарии экспоната потоком NDJSON
+
+        Комментарии отдаются без вложенности (parent_id, level) в порядке (level, id)
+        по мере получения строк из БД, поэтому память не зависит от размера ветки.
+
+        """
+        exhibit = await self._exhibit_repo.get(id=exhibit_id)
+        if exhibit is None:
+            raise exceptions.NotFound("Публикация не найдена")
+
+        return release_session(self._stream_comments(exhibit_id), self._tree_repo.session)
+
+    async def _stream_comments(self, exhibit_id: uuid.UUID) -> AsyncIterator[str]:
+        async for obj, nearest_ancestor_id, level in self._tree_repo.stream_comments(exhibit_id):
+            yield schemas.CommentItem(
+                id=obj.id,
+                content=self._visible_content(obj),
+                owner_id=obj.owner_id,
+                state=obj.state,
+                created_at=obj.created_at,
+                updated_at=obj.updated_at,
+                parent_id=nearest_ancestor_id,
+                level=level
+            ).model_dump_json() + "\n"
+
+    def _visible_content(self, comment) -> str:
+        if comment.state != CommentState.DELETED:
+            return comment.content
+
+        if Permission.GET_DELETED_COMMENTS.value in self._current_user.permissions:
+            return f"(Комментарий удален): {comment.content}"
+        return "Комментарий удален"
+
     @state_filter(UserState.ACTIVE)
     async def delete_comment(self, comment_id: uuid.UUID) -> None:
         """
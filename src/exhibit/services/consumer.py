@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+import aio_pika
+from aio_pika.abc import AbstractIncomingMessage
+from aio_pika.pool import Pool
+
+from exhibit.utils.metrics import Histogram
+
+
+class MalformedMessage(ValueError):
+    """
+    Сообщение не может быть обработано ни при каком повторе (отправляется в dead-letter очередь)
+
+    """
+
+
+class SupervisedConsumer:
+    """
+    Потребитель очереди RabbitMQ под наблюдением
+
+    Сообщения обрабатываются параллельно (не более concurrency одновременно,
+    брокер выдает не более prefetch неподтвержденных), подтверждаются после
+    обработки. Некорректные сообщения (MalformedMessage) и повторно упавшие
+    публикуются в очередь "<queue>.dead". При обрыве соединения или ошибке
+    потребление перезапускается с экспоненциальной паузой.
+
+    """
+
+    def __init__(
+            self,
+            channel_pool: Pool,
+            queue_name: str,
+            handler: Callable[[AbstractIncomingMessage], Awaitable[None]],
+            prefetch: int = 32,
+            concurrency: int = 16,
+            max_backoff: float = 30.0
+    ):
+        """
+        :param channel_pool: пул каналов
+        :param queue_name: имя очереди
+        :param handler: обработчик сообщения
+        :param prefetch: количество неподтвержденных сообщений, выдаваемых брокером
+        :param concurrency: максимальное количество одновременно обрабатываемых сообщений
+        :param max_backoff: максимальная пауза перед перезапуском (сек)
+        """
+        self._channel_pool = channel_pool
+        self._queue_name = queue_name
+        self._dead_letter_queue_name = f"{queue_name}.dead"
+        self._handler = handler
+        self._prefetch = prefetch
+        self._concurrency = concurrency
+        self._max_backoff = max_backoff
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._handlers: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+        # Метрики
+        self._received = 0
+        self._processed = 0
+        self._requeued = 0
+        self._dead_lettered = 0
+        self._restarts = 0
+        self._completions: deque[float] = deque()
+        self._lag_ms = Histogram((10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000))
+        self._handle_ms = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
+        self._last_message_at: float | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _supervise(self) -> None:
+        backoff = 1.0
+        while True:
+            started_at = time.monotonic()
+            try:
+                await self._consume()
+                logging.warning(f"[Consumer:{self._queue_name}] Consuming stopped, restarting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"[Consumer:{self._queue_name}] Consuming failed: {e}")
+
+            # Пауза сбрасывается, если потребление проработало достаточно долго
+            if time.monotonic() - started_at > self._max_backoff:
+                backoff = 1.0
+            self._restarts += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._max_backoff)
+
+    async def _consume(self) -> None:
+        async with self._channel_pool.acquire() as channel:
+            await channel.set_qos(prefetch_count=self._prefetch)
+            queue = await channel.declare_queue(
+                self._queue_name,
+                durable=True,
+                exclusive=False,
+            )
+            await channel.declare_queue(
+                self._dead_letter_queue_name,
+                durable=True,
+                exclusive=False,
+            )
+            async with queue.iterator() as queue_iter:
+                async for message in queue_iter:
+                    await self._semaphore.acquire()
+                    task = asyncio.get_running_loop().create_task(self._handle(channel, message))
+                    self._handlers.add(task)
+                    task.add_done_callback(self._handlers.discard)
+
+    async def _handle(self, channel: aio_pika.abc.AbstractChannel, message: AbstractIncomingMessage) -> None:
+        start = time.monotonic()
+        self._received += 1
+        self._last_message_at = time.time()
+        if message.timestamp:
+            timestamp = message.timestamp
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            self._lag_ms.observe(max((datetime.now(timezone.utc) - timestamp).total_seconds() * 1000, 0))
+
+        try:
+            try:
+                await self._handler(message)
+            except MalformedMessage as e:
+                await self._dead_letter(channel, message, f"malformed: {e}")
+            except Exception as e:
+                if not message.redelivered:
+                    logging.warning(f"[Consumer:{self._queue_name}] Handler failed, requeue: {e}")
+                    await message.nack(requeue=True)
+                    self._requeued += 1
+                    return
+                await self._dead_letter(channel, message, f"failed: {e}")
+            else:
+                await message.ack()
+                self._processed += 1
+                self._track_completion()
+        except Exception as e:
+            # Канал закрыт: сообщение будет повторно доставлено брокером
+            logging.error(f"[Consumer:{self._queue_name}] Ack failed: {e}")
+        finally:
+            self._handle_ms.observe((time.monotonic() - start) * 1000)
+            self._semaphore.release()
+
+    async def _dead_letter(
+            self,
+            channel: aio_pika.abc.AbstractChannel,
+            message: AbstractIncomingMessage,
+            reason: str
+    ) -> None:
+        logging.warning(f"[Consumer:{self._queue_name}] Dead-lettering message: {reason}")
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                headers={**(message.headers or dict()), "x-error": reason, "x-original-queue": self._queue_name},
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=self._dead_letter_queue_name
+        )
+        await message.ack()
+        self._dead_lettered += 1
+
+    def _track_completion(self) -> None:
+        now = time.monotonic()
+        self._completions.append(now)
+        self._trim_completions(now)
+
+    def _trim_completions(self, now: float) -> None:
+        while self._completions and self._completions[0] < now - 60:
+            self._completions.popleft()
+
+    def stats(self) -> dict:
+        self._trim_completions(time.monotonic())
+        return {
+            "queue": self._queue_name,
+            "running": self._task is not None and not self._task.done(),
+            "in_flight": len(self._handlers),
+            "received": self._received,
+            "processed": self._processed,
+            "requeued": self._requeued,
+            "dead_lettered": self._dead_lettered,
+            "restarts": self._restarts,
+            "throughput_per_second": round(len(self._completions) / 60, 3),
+            "seconds_since_last_message": (
+                round(time.time() - self._last_message_at, 3) if self._last_message_at is not None else None
+            ),
+            "lag_ms": self._lag_ms.snapshot(),
+            "handle_ms": self._handle_ms.snapshot(),
+        }
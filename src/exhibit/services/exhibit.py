@@ -1,6 +1,8 @@
-import json
 import uuid
-from typing import Literal
+from datetime import datetime
+from typing import Any, Literal
+
+from sqlalchemy.exc import IntegrityError
 
 from exhibit import exceptions
 from exhibit.models import schemas
@@ -13,10 +15,25 @@ from exhibit.services.repository import CommentTreeRepo, LikeRepo, FileRepo
 from exhibit.services.repository import CommentRepo
 from exhibit.services.repository import ExhibitRepo
 from exhibit.services.repository import TagRepo
+from exhibit.services.repository import OutboxRepo
+from exhibit.services.repository import UnitOfWork
+from exhibit.services.outbox import OutboxRelay
+from exhibit.services.purge import StoragePurge
+from exhibit.services.variants import set_poster_variants, variant_items
+from exhibit.services.view_counter import ViewCounter
+from exhibit.services.shared_state import SharedTTLCache
+from exhibit.utils.cursor import encode_cursor, decode_cursor
+from exhibit.utils.formators import tokenize
 from exhibit.utils.s3 import S3Storage
 
 
 class ExhibitApplicationService:
+    # Multipart-загрузка: не более 10000 частей, каждая (кроме последней) не меньше 5 МБ
+    multipart_part_size = 16 * 1024 * 1024  # 16mb
+    multipart_max_parts = 10000
+    multipart_max_size = 50 * 1024 * 1024 * 1024  # 50gb
+    multipart_url_batch = 100
+    multipart_url_expires_in = 60 * 60  # 1 hour
 
     def __init__(
             self,
@@ -27,9 +44,14 @@ class ExhibitApplicationService:
             comment_repo: CommentRepo,
             like_repo: LikeRepo,
             file_repo: FileRepo,
+            outbox_repo: OutboxRepo,
             file_storage: S3Storage,
-            isa
-
+            outbox: OutboxRelay,
+            storage_purge: StoragePurge,
+            view_counter: ViewCounter,
+            uow: UnitOfWork,
+            file_manifest_cache: SharedTTLCache,
+            exhibit_cache: SharedTTLCache
     ):
         self._current_user = current_user
         self._repo = exhibit_repo
@@ -38,8 +60,14 @@ class ExhibitApplicationService:
         self._comment_repo = comment_repo
         self._like_repo = like_repo
         self._file_repo = file_repo
+        self._outbox_repo = outbox_repo
         self._file_storage = file_storage
-        self._isa = isa
+        self._outbox = outbox
+        self._storage_purge = storage_purge
+        self._view_counter = view_counter
+        self._uow = uow
+        self._file_manifest_cache = file_manifest_cache
+        self._exhibit_cache = exhibit_cache
 
     async def get_exhibits(
             self,
@@ -48,17 +76,19 @@ class ExhibitApplicationService:
             order_by: Literal["title", "updated_at", "created_at"] = "created_at",
             query: str = None,
             state: ExhibitState = ExhibitState.PUBLISHED,
-            owner_id: uuid.UUID = None
-    ) -> list[schemas.ExhibitSmall]:
+            owner_id: uuid.UUID = None,
+            cursor: str = None
+    ) -> schemas.ExhibitPage:
         """
         Получить список экспонатов
 
         :param page: номер страницы (всегда >= 1)
         :param per_page: количество экспонатов на странице (всегда >= 1, но <= per_page_limit)
         :param order_by: поле сортировки
-        :param query: поисковый запрос (если необходим)
+        :param query: поисковый запрос (если указан, то сортировка по релевантности, а order_by игнорируется)
         :param state: статус экспоната (по умолчанию только опубликованные)
         :param owner_id: id владельца экспоната (если необходимо получить экспоната только одного пользователя)
+        :param cursor: курсор соседней страницы (если указан, то page игнорируется; не совместим с query)
         :return:
 
         """
@@ -100,26 +130,75 @@ class ExhibitApplicationService:
         per_page = min(per_page, per_page_limit, 2147483646)
         offset = min((page - 1) * per_page, 2147483646)
 
-        # Выполнение запроса
+        position = None
+        backward = False
+        if cursor:
+            if query:
+                raise exceptions.BadRequest("Курсорная пагинация недоступна для поиска")
+            position, backward = self._parse_cursor(cursor, order_by)
+            offset = 0
+
+        # Выполнение запроса (лишний элемент говорит о наличии следующей страницы)
         if query:
+            # Результаты поиска отсортированы по релевантности
             exhibits = await self._repo.search(
-                query=query,
-                fields=["title", "content"],
-                limit=per_page,
+                tokens=tokenize(query),
+                limit=per_page + 1,
                 offset=offset,
-                order_by=order_by,
                 **{"state": state} if state else {},
                 **{"owner_id": owner_id} if owner_id else {}
             )
         else:
             exhibits = await self._repo.get_all(
-                limit=per_page,
+                limit=per_page + 1,
                 offset=offset,
                 order_by=order_by,
+                cursor=position,
+                backward=backward,
                 **{"state": state} if state else {},
                 **{"owner_id": owner_id} if owner_id else {}
             )
-        return [schemas.ExhibitSmall.model_validate(exhibit) for exhibit in exhibits]
+
+        has_more = len(exhibits) > per_page
+        if has_more:
+            exhibits = exhibits[1:] if backward else exhibits[:-1]
+
+        items = [schemas.ExhibitSmall.model_validate(exhibit) for exhibit in exhibits]
+        await set_poster_variants(self._file_repo, self._file_storage, items)
+        if not items or query:
+            return schemas.ExhibitPage(items=items)
+
+        has_next = has_more if not backward else True
+        has_prev = has_more if backward else bool(cursor) or offset > 0
+        return schemas.ExhibitPage(
+            items=items,
+            next_cursor=self._make_cursor(items[-1], order_by) if has_next else None,
+            prev_cursor=self._make_cursor(items[0], order_by, backward=True) if has_prev else None
+        )
+
+    @staticmethod
+    def _make_cursor(exhibit: schemas.ExhibitSmall, order_by: str, backward: bool = False) -> str:
+        value = getattr(exhibit, order_by)
+        return encode_cursor({
+            "o": order_by,
+            "v": value.isoformat() if isinstance(value, datetime) else value,
+            "id": str(exhibit.id),
+            "b": backward
+        })
+
+    @staticmethod
+    def _parse_cursor(cursor: str, order_by: str) -> tuple[tuple[Any, uuid.UUID], bool]:
+        try:
+            payload = decode_cursor(cursor)
+            if payload.get("o") != order_by:
+                raise ValueError("Курсор не соответствует сортировке")
+
+            value = payload.get("v")
+            if value is not None and order_by in ("created_at", "updated_at"):
+                value = datetime.fromisoformat(value)
+            return (value, uuid.UUID(payload["id"])), bool(payload.get("b"))
+        except (ValueError, TypeError, KeyError):
+            raise exceptions.BadRequest("Неверный курсор")
 
     async def get_exhibit(self, exhibit_id: uuid.UUID) -> schemas.Exhibit:
         exhibit = await self._repo.get(id=exhibit_id)
@@ -152,16 +231,14 @@ class ExhibitApplicationService:
         ):
             raise exceptions.AccessDenied("Вы не можете просматривать публичные публикации")
 
-        # Views
+        # Views (записываются в БД пачкой через буфер)
         if exhibit.state == ExhibitState.PUBLISHED and exhibit.owner_id != self._current_user.id:
-            exhibit.views += 1
-            await self._repo.session.commit()
-            await self._repo.session.refresh(exhibit)
+            self._view_counter.add(exhibit.id)
 
-        # Likes
-        exhibit.likes_count = await self._like_repo.count(exhibit_id=exhibit_id)
-
-        return schemas.Exhibit.model_validate(exhibit)
+        result = schemas.Exhibit.model_validate(exhibit)
+        result.views += self._view_counter.pending(exhibit.id)
+        await set_poster_variants(self._file_repo, self._file_storage, [result])
+        return result
 
     @permission_filter(Permission.CREATE_SELF_EXHIBITS)
     @state_filter(UserState.ACTIVE)
@@ -171,14 +248,9 @@ class ExhibitApplicationService:
             owner_id=self._current_user.id
         )
         exhibit = await self._repo.get(id=_.id)
-        exhibit.likes_count = 0
         # Добавление тегов
-        for tag_title in data.tags:
-            tag = await self._tag_repo.get(title=tag_title)
-            if not tag:
-                tag = await self._tag_repo.create(title=tag_title)
-            exhibit.tags.append(tag)
-        await self._repo.session.commit()
+        exhibit.tags.extend(await self._tag_repo.upsert_many(data.tags))
+        await self._uow.flush()
         return schemas.Exhibit.model_validate(exhibit)
 
     @state_filter(UserState.ACTIVE)
@@ -200,15 +272,10 @@ class ExhibitApplicationService:
             raise exceptions.AccessDenied("Вы не можете редактировать свои экспоната")
 
         if data.tags:
-            exhibit.tags = []
-            for tag_title in data.tags:
-                tag = await self._tag_repo.get(title=tag_title)
-                if not tag:
-                    tag = await self._tag_repo.create(title=tag_title)
-                exhibit.tags.append(tag)
-            await self._repo.session.commit()
+            exhibit.tags = await self._tag_repo.upsert_many(data.tags)
 
         await self._repo.update(exhibit_id, **data.model_dump(exclude_unset=True, exclude={"tags"}))
+        self._evict_exhibit(exhibit_id)
 
     @permission_filter(Permission.RATE_EXHIBITS)
     @state_filter(UserState.ACTIVE)
@@ -224,11 +291,22 @@ class ExhibitApplicationService:
         if state == RateState.LIKE:
             if like:
                 raise exceptions.BadRequest("Вы уже поставили лайк")
-            await self._like_repo.create(exhibit_id=exhibit_id, owner_id=self._current_user.id)
+            # Счетчик фиксируется одной транзакцией вместе с лайком,
+            # при параллельном лайке откатывается только savepoint
+            try:
+                async with self._uow.savepoint():
+                    await self._like_repo.create(exhibit_id=exhibit_id, owner_id=self._current_user.id)
+                    await self._repo.change_likes_count(exhibit_id, 1)
+            except IntegrityError:
+                raise exceptions.ConflictError("Вы уже поставили лайк")
         elif state == RateState.NEUTRAL:
             if not like:
                 raise exceptions.BadRequest("Вы еще не оценили статью")
-            await self._like_repo.delete(like.id)
+            # Счетчик уменьшается только если лайк удален этим запросом:
+            # параллельный запрос на снятие лайка удалит 0 строк
+            async with self._uow.savepoint():
+                if await self._like_repo.delete_returning(like.id):
+                    await self._repo.change_likes_count(exhibit_id, -1)
 
     @state_filter(UserState.ACTIVE)
     async def delete_exhibit(self, exhibit_id: uuid.UUID) -> None:
@@ -248,8 +326,17 @@ class ExhibitApplicationService:
         ):
             raise exceptions.AccessDenied("Вы не можете удалять свои экспоната")
 
-        await self._repo.delete(id=exhibit_id)
+        # Сначала записи, ссылающиеся на экспонат, затем сам экспонат
         await self._comment_repo.delete_comments_by_exhibit(exhibit_id)
+        await self._like_repo.delete_by_exhibit(exhibit_id)
+        uploads = await self._file_repo.delete_by_exhibit(exhibit_id)
+        await self._repo.delete(id=exhibit_id)
+        await self._purge_files(
+            f"{exhibit_id}/",
+            uploads={f"{exhibit_id}/{file_id}": upload_id for file_id, upload_id in uploads.items()}
+        )
+        self._uow.on_commit(lambda: self._file_manifest_cache.invalidate(exhibit_id))
+        self._evict_exhibit(exhibit_id)
 
     async def get_exhibit_files(self, exhibit_id: uuid.UUID) -> list[schemas.ExhibitFileItem]:
         exhibit = await self._repo.get(id=exhibit_id)
@@ -282,23 +369,17 @@ class ExhibitApplicationService:
         ):
             raise exceptions.AccessDenied("Вы не можете просматривать файлы публичных публикаций")
 
-        resp = []
-
-        files = await self._file_repo.get_all(exhibit_id=exhibit_id, is_uploaded=True)
+        # Список загруженных файлов меняется только при подтверждении загрузки
+        # и удалении файла, где запись кэша удаляется
+        manifest = self._file_manifest_cache.get(exhibit_id)
+        if manifest is None:
+            manifest = [
+                self._file_item(exhibit_id, *row, rcd="inline")
+                for row in await self._file_repo.get_manifest(exhibit_id)
+            ]
+            self._file_manifest_cache.set(exhibit_id, manifest)
 
-        for file in files:
-            url = self._file_storage.generate_download_public_url(
-                file_path=f"{exhibit.id}/{file.id}",
-                content_type=file.content_type,
-                rcd="inline",
-                filename=file.filename
-            )
-            resp.append(schemas.ExhibitFileItem(
-                url=url,
-                **schemas.ExhibitFile.model_validate(file).model_dump(exclude={"is_uploaded", "exhibit_id"})
-            ))
-
-        return resp
+        return list(manifest)
 
     async def get_exhibit_file(
             self,
@@ -344,16 +425,45 @@ class ExhibitApplicationService:
         if not file.is_uploaded:
             raise exceptions.NotFound("Файл не загружен")
 
-        url = self._file_storage.generate_download_public_url(
-            file_path=f"{exhibit.id}/{file.id}",
-            content_type=file.content_type,
-            rcd="attachment" if download else "inline",
-            filename=file.filename
+        return self._file_item(
+            exhibit.id,
+            file.id,
+            file.filename,
+            file.content_type,
+            file.created_at,
+            file.updated_at,
+            file.variants,
+            rcd="attachment" if download else "inline"
         )
 
-        return schemas.ExhibitFileItem(
-            url=url,
-            **schemas.ExhibitFile.model_validate(file).model_dump(exclude={"is_uploaded", "exhibit_id"})
+    def _file_item(
+            self,
+            exhibit_id: uuid.UUID,
+            file_id: uuid.UUID,
+            filename: str,
+            content_type: str,
+            created_at: datetime,
+            updated_at: datetime | None,
+            variants: list[dict] | None,
+            rcd: Literal["inline", "attachment"]
+    ) -> schemas.ExhibitFileItem:
+        """
+        Проекция строки файла в ExhibitFileItem (без повторной валидации данных из БД)
+
+        """
+        return schemas.ExhibitFileItem.model_construct(
+            id=file_id,
+            filename=filename,
+            content_type=content_type,
+            url=self._file_storage.generate_download_public_url(
+                file_path=f"{exhibit_id}/{file_id}",
+                content_type=content_type,
+                rcd=rcd,
+                filename=filename
+            ),
+            variants=variant_items(self._file_storage, exhibit_id, file_id, variants or []),
+            created_at=created_at,
+            updated_at=updated_at
         )
 
     @state_filter(UserState.ACTIVE)
@@ -436,7 +546,8 @@ class ExhibitApplicationService:
             raise exceptions.BadRequest("Файл не принадлежит экспонату")
 
         if file.is_uploaded:
-            raise exceptions.BadRequest("Файл уже загружен")
+            # Загрузка уже подтверждена по уведомлению хранилища
+            return
 
         info = await self._file_storage.info(file_path=f"{exhibit_id}/{file_id}")
         if not info:
@@ -444,16 +555,244 @@ class ExhibitApplicationService:
 
         await self._file_repo.update(id=file_id, is_uploaded=True)
         await self._repo.update(exhibit_id, poster=file_id)
+        await self._index_file(exhibit_id, file_id)
+        await self._make_variants(exhibit_id, file_id)
+        self._uow.on_commit(lambda: self._file_manifest_cache.invalidate(exhibit_id))
+        self._evict_exhibit(exhibit_id)
 
-        await self._isa.send_data(
-            body=json.dumps({
-                "file_id": str(file_id),
-                "exhibit_id": str(exhibit_id),
-                "command": "add"
-            }))
+    @state_filter(UserState.ACTIVE)
+    async def start_multipart_upload(
+            self,
+            exhibit_id: uuid.UUID,
+            data: schemas.MultipartUploadCreate
+    ) -> schemas.MultipartUpload:
+        """
+        Начинает multipart-загрузку файла экспоната
+
+        :return: состояние загрузки со ссылками на первые части
+        """
+        if data.size > self.multipart_max_size:
+            raise exceptions.BadRequest(
+                f"Размер файла не может превышать {self.multipart_max_size // (1024 * 1024 * 1024)} ГБ"
+            )
+
+        exhibit = await self._get_editable_exhibit(
+            exhibit_id,
+            deleted_message="Вы не можете загружать файлы для экспонатов, которые были удалены",
+            self_message="Вы не можете редактировать свои экспонаты"
+        )
+
+        file = await self._file_repo.create(
+            filename=data.filename,
+            exhibit_id=exhibit.id,
+            content_type=data.content_type.value,
+            size=data.size
+        )
+        upload_id = await self._file_storage.create_multipart_upload(
+            file_path=f"{exhibit.id}/{file.id}",
+            content_type=data.content_type.value
+        )
+        await self._file_repo.update(id=file.id, upload_id=upload_id)
+        file.upload_id = upload_id
+
+        return await self._multipart_upload(file, uploaded_parts=[])
+
+    @state_filter(UserState.ACTIVE)
+    async def get_multipart_upload(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> schemas.MultipartUpload:
+        """
+        Состояние multipart-загрузки для продолжения после обрыва
+
+        :return: загруженные части и ссылки на следующие незагруженные
+        """
+        file = await self._get_multipart_file(exhibit_id, file_id)
+        uploaded_parts = await self._file_storage.list_parts(
+            file_path=f"{exhibit_id}/{file_id}",
+            upload_id=file.upload_id
+        )
+        if uploaded_parts is None:
+            raise exceptions.NotFound("Загрузка не найдена в хранилище")
+
+        # Ссылки подписываются заново: запрос продлевает незавершенную загрузку
+        await self._file_repo.touch(file_id)
+        return await self._multipart_upload(file, uploaded_parts)
+
+    @state_filter(UserState.ACTIVE)
+    async def sign_multipart_upload_parts(
+            self,
+            exhibit_id: uuid.UUID,
+            file_id: uuid.UUID,
+            data: schemas.MultipartUploadParts
+    ) -> list[schemas.UploadPartUrl]:
+        """
+        Ссылки на загрузку указанных частей (не более multipart_url_batch за раз)
+
+        """
+        file = await self._get_multipart_file(exhibit_id, file_id)
+        parts_count = self._parts_count(file.size)
+        if data.part_numbers[-1] > parts_count:
+            raise exceptions.BadRequest(f"Файл состоит из {parts_count} частей")
+
+        await self._file_repo.touch(file_id)
+        urls = await self._file_storage.generate_upload_part_urls(
+            file_path=f"{exhibit_id}/{file_id}",
+            upload_id=file.upload_id,
+            part_numbers=data.part_numbers,
+            expires_in=self.multipart_url_expires_in
+        )
+        return [schemas.UploadPartUrl(part_number=number, url=url) for number, url in urls.items()]
+
+    @state_filter(UserState.ACTIVE)
+    async def complete_multipart_upload(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
+        """
+        Завершает multipart-загрузку и подтверждает файл
+
+        Список частей берется из хранилища, поэтому повторный вызов после
+        потерянного ответа безопасен.
+
+        """
+        exhibit = await self._get_editable_exhibit(
+            exhibit_id,
+            deleted_message="Вы не можете подтверждать файлы для экспонатов, которые были удалены",
+            self_message="Вы не можете подтверждать загрузку файлов"
+        )
+        file = await self._get_exhibit_file_row(exhibit_id, file_id)
+        if file.is_uploaded:
+            return
+
+        if not file.upload_id:
+            raise exceptions.BadRequest("Файл загружается без разделения на части")
+
+        file_path = f"{exhibit_id}/{file_id}"
+        parts = await self._file_storage.list_parts(file_path=file_path, upload_id=file.upload_id)
+        if parts is None:
+            # Загрузка уже завершена (ответ на предыдущий запрос потерян) или отменена
+            if not await self._file_storage.info(file_path=file_path):
+                raise exceptions.NotFound("Загрузка не найдена в хранилище")
+        else:
+            parts_count = self._parts_count(file.size)
+            missing = sorted(set(range(1, parts_count + 1)) - {part["PartNumber"] for part in parts})
+            if missing:
+                raise exceptions.BadRequest(f"Не загружены части: {', '.join(map(str, missing[:20]))}")
+
+            part_size = self._part_size(file.size)
+            parts = [part for part in parts if part["PartNumber"] <= parts_count]
+            invalid = [
+                part["PartNumber"] for part in parts
+                if part["Size"] != min(part_size, file.size - (part["PartNumber"] - 1) * part_size)
+            ]
+            if invalid:
+                raise exceptions.BadRequest(
+                    f"Размер частей не совпадает с ожидаемым: {', '.join(map(str, invalid[:20]))}"
+                )
+
+            await self._file_storage.complete_multipart_upload(
+                file_path=file_path,
+                upload_id=file.upload_id,
+                parts=parts
+            )
+
+        await self._file_repo.update(id=file_id, is_uploaded=True, upload_id=None)
+        await self._repo.update(exhibit.id, poster=file_id)
+        await self._index_file(exhibit_id, file_id)
+        await self._make_variants(exhibit_id, file_id)
+        self._uow.on_commit(lambda: self._file_manifest_cache.invalidate(exhibit_id))
+        self._evict_exhibit(exhibit_id)
+
+    @state_filter(UserState.ACTIVE)
+    async def abort_multipart_upload(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
+        """
+        Отменяет multipart-загрузку: загруженные части удаляются из хранилища
+
+        """
+        file = await self._get_multipart_file(exhibit_id, file_id)
+        await self._file_storage.abort_multipart_upload(file_path=f"{exhibit_id}/{file_id}", upload_id=file.upload_id)
+        await self._file_repo.delete(id=file_id)
+
+    async def _get_editable_exhibit(self, exhibit_id: uuid.UUID, deleted_message: str, self_message: str):
+        exhibit = await self._repo.get(id=exhibit_id)
+        if not exhibit:
+            raise exceptions.NotFound("Экспонат не найден")
+
+        if exhibit.state == ExhibitState.DELETED:
+            raise exceptions.BadRequest(deleted_message)
+
+        if (
+                exhibit.owner_id != self._current_user.id and
+                Permission.UPDATE_USER_EXHIBITS.value not in self._current_user.permissions
+        ):
+            raise exceptions.AccessDenied("Вы не являетесь владельцем экспоната")
+
+        if (
+                exhibit.owner_id == self._current_user.id and
+                Permission.UPDATE_SELF_EXHIBITS.value not in self._current_user.permissions
+        ):
+            raise exceptions.AccessDenied(self_message)
+        return exhibit
+
+    async def _get_exhibit_file_row(self, exhibit_id: uuid.UUID, file_id: uuid.UUID):
+        file = await self._file_repo.get(id=file_id)
+        if not file:
+            raise exceptions.NotFound("Файл не найден")
+
+        if file.exhibit_id != exhibit_id:
+            raise exceptions.BadRequest("Файл не принадлежит экспонату")
+        return file
+
+    async def _get_multipart_file(self, exhibit_id: uuid.UUID, file_id: uuid.UUID):
+        await self._get_editable_exhibit(
+            exhibit_id,
+            deleted_message="Вы не можете загружать файлы для экспонатов, которые были удалены",
+            self_message="Вы не можете редактировать свои экспонаты"
+        )
+        file = await self._get_exhibit_file_row(exhibit_id, file_id)
+        if file.is_uploaded:
+            raise exceptions.BadRequest("Файл уже загружен")
+
+        if not file.upload_id:
+            raise exceptions.BadRequest("Файл загружается без разделения на части")
+        return file
+
+    def _part_size(self, size: int) -> int:
+        # Размер части растет для больших файлов, чтобы уложиться в multipart_max_parts (кратно 1 МБ)
+        mb = 1024 * 1024
+        min_part_size = -(-size // self.multipart_max_parts)
+        return max(self.multipart_part_size, -(-min_part_size // mb) * mb)
+
+    def _parts_count(self, size: int) -> int:
+        return max(1, -(-size // self._part_size(size)))
+
+    async def _multipart_upload(self, file, uploaded_parts: list[dict]) -> schemas.MultipartUpload:
+        parts_count = self._parts_count(file.size)
+        uploaded = {part["PartNumber"] for part in uploaded_parts}
+        missing = [number for number in range(1, parts_count + 1) if number not in uploaded]
+        urls = await self._file_storage.generate_upload_part_urls(
+            file_path=f"{file.exhibit_id}/{file.id}",
+            upload_id=file.upload_id,
+            part_numbers=missing[:self.multipart_url_batch],
+            expires_in=self.multipart_url_expires_in
+        )
+        return schemas.MultipartUpload(
+            file_id=file.id,
+            upload_id=file.upload_id,
+            size=file.size,
+            part_size=self._part_size(file.size),
+            parts_count=parts_count,
+            uploaded_parts=[
+                schemas.UploadPart(part_number=part["PartNumber"], etag=part["ETag"], size=part["Size"])
+                for part in uploaded_parts
+            ],
+            part_urls=[schemas.UploadPartUrl(part_number=number, url=url) for number, url in urls.items()]
+        )
 
     @state_filter(UserState.ACTIVE)
     async def delete_exhibit_file(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
+        """
+        Удалить файл экспоната
+
+        Незавершенная multipart-загрузка тоже удаляется: она отменяется
+        в хранилище вместе с загруженными частями.
+
+        """
         exhibit = await self._repo.get(id=exhibit_id)
         if not exhibit:
             raise exceptions.NotFound("Экспонат не найдена")
@@ -480,14 +819,18 @@ class ExhibitApplicationService:
         if file.exhibit_id != exhibit_id:
             raise exceptions.BadRequest("Файл не принадлежит экспонату")
 
-        if not file.is_uploaded:
+        if not file.is_uploaded and not file.upload_id:
             raise exceptions.BadRequest("Файл не загружен")
 
         if exhibit.poster == file_id:
             await self._repo.update(id=exhibit_id, poster=None)
+            self._evict_exhibit(exhibit_id)
 
-        await self._file_storage.delete(file_path=f"{exhibit_id}/{file_id}")
         await self._file_repo.delete(id=file_id)
+        # Файл и его уменьшенные копии
+        file_path = f"{exhibit_id}/{file_id}"
+        await self._purge_files(file_path, uploads={file_path: file.upload_id} if file.upload_id else None)
+        self._uow.on_commit(lambda: self._file_manifest_cache.invalidate(exhibit_id))
 
     @state_filter(UserState.ACTIVE)
     async def set_exhibit_poster(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
@@ -524,10 +867,42 @@ class ExhibitApplicationService:
             raise exceptions.BadRequest("Этот файл уже является постером экспоната")
 
         await self._repo.update(id=exhibit_id, poster=file_id)
+        await self._index_file(exhibit_id, file_id)
+        self._evict_exhibit(exhibit_id)
+
+    def _evict_exhibit(self, exhibit_id: uuid.UUID) -> None:
+        # Проекция ExhibitSmall в кэше результатов поиска по изображению
+        self._uow.on_commit(lambda: self._exhibit_cache.invalidate(exhibit_id))
+
+    async def _index_file(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
+        """
+        Задание на индексацию файла поисковиком
+
+        Записывается в outbox в транзакции запроса: поисковик читает файл
+        из БД, поэтому задание отправляется только после фиксации изменений.
+
+        """
+        await self._outbox_repo.add("img_search", {
+            "file_id": str(file_id),
+            "exhibit_id": str(exhibit_id),
+            "command": "add"
+        })
+        self._uow.on_commit(self._outbox.notify)
+
+    async def _purge_files(self, prefix: str, uploads: dict[str, str] = None) -> None:
+        """
+        Задание на удаление объектов хранилища по префиксу (см. StoragePurge)
+
+        Записывается в outbox в транзакции запроса: объекты удаляются в фоне
+        только после фиксации удаления записей.
+
+        """
+        await self._outbox_repo.add("s3_purge", {"prefix": prefix, "uploads": uploads or dict()})
+        self._uow.on_commit(self._storage_purge.notify)
+
+    async def _make_variants(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> None:
+        """
+        Задание на создание уменьшенных копий загруженного файла (см. ImageVariants)
 
-        await self._isa.send_data(
-            body=json.dumps({
-                "file_id": str(file_id),
-                "exhibit_id": str(exhibit_id),
-                "command": "add"
-            }))
+        """
+        await self._outbox_repo.add("img_variants", {"file_id": str(file_id), "exhibit_id": str(exhibit_id)})
@@ -1,7 +1,10 @@
+import asyncio
 import json
 import logging
+import time
 import uuid
-from typing import Any
+import weakref
+from typing import AsyncIterator, Iterable
 
 import aio_pika
 
@@ -9,24 +12,45 @@ from exhibit import exceptions
 from exhibit.config import ImgSearcherConfig
 from exhibit.models import schemas
 from exhibit.models.auth import BaseUser
+from exhibit.models.permission import Permission
 from exhibit.models.schemas import ExhibitSmall
-from exhibit.services.repository import ExhibitRepo
+from exhibit.models.state import ReindexScope
+from exhibit.services.consumer import MalformedMessage
+from exhibit.services.auth.filters import permission_filter
+from exhibit.services.reindex import ImgSearchReindexer
+from exhibit.services.repository import ExhibitRepo, FileRepo, ReindexJobRepo
+from exhibit.services.task_store import TaskStore
+from exhibit.services.variants import set_poster_variants
+from exhibit.services.shared_state import SharedStateFull, SharedTTLCache
+from exhibit.utils.metrics import Histogram
 from exhibit.utils.s3 import S3Storage
+from exhibit.utils.stream import release_session
 
 
 class ImgSearcherApplicationService:
+    max_wait = 60
+    sse_heartbeat_interval = 15
+    max_reindex_rate = 10000
 
     def __init__(
             self,
             current_user: BaseUser,
             exhibit_repo: ExhibitRepo,
+            file_repo: FileRepo,
             file_storage: S3Storage,
             isa: "ImgSearchAdapter",
-            task_result: dict[str, Any]
+            task_result: TaskStore,
+            reindex_job_repo: ReindexJobRepo,
+            reindexer: ImgSearchReindexer,
+            exhibit_cache: SharedTTLCache
 
     ):
         self._current_user = current_user
         self._repo = exhibit_repo
+        self._file_repo = file_repo
+        self._reindex_job_repo = reindex_job_repo
+        self._reindexer = reindexer
+        self._exhibit_cache = exhibit_cache
         self._file_storage = file_storage
         self._task_result = task_result
         self._isa = isa
@@ -61,7 +85,11 @@ class ImgSearcherApplicationService:
         if not info:
             raise exceptions.NotFound("Файл не загружен")
 
-        if self._task_result.get(str(file_id)):
+        try:
+            created = await self._task_result.create(str(file_id))
+        except SharedStateFull:
+            raise exceptions.APIError("Очередь задач переполнена, повторите позже", status_code=503)
+        if not created:
             raise exceptions.ConflictError("Задание уже выполнено или выполняется")
 
         body = {
@@ -69,45 +97,172 @@ class ImgSearcherApplicationService:
             "command": "search"
         }
 
-        await self._isa.send_data(
-            json.dumps(body)
-        )
-
-        self._task_result[str(file_id)] = dict(
-            status="in_process",
-            classif="",
-            result=[]
-        )
+        try:
+            await self._isa.send_data(
+                json.dumps(body)
+            )
+        except Exception:
+            await self._task_result.fail(str(file_id), "send_failed")
+            raise
 
     async def get_task_result(
             self,
-            file_id: uuid.UUID
+            file_id: uuid.UUID,
+            wait: int = 0
     ) -> schemas.ImgResult:
+        """
+        Получить результат поиска по изображению
+
+        :param file_id: идентификатор задачи
+        :param wait: время ожидания завершения задачи (long-poll, сек)
+        :return:
+
+        """
+        if not 0 <= wait <= self.max_wait:
+            raise exceptions.BadRequest(f"Время ожидания должно быть от 0 до {self.max_wait} секунд")
 
         data = self._task_result.get(str(file_id))
+        if data is not None and data["status"] == "in_process" and wait:
+            data = await self._task_result.wait(str(file_id), timeout=wait)
+
         if data is None:
             raise exceptions.NotFound("Задачи не существует")
 
         if data["status"] == "in_process":
             raise exceptions.APIError("Задача находится в процессе выполнения", status_code=202)
 
-        if not data["result"]:
-            return schemas.ImgResult(
-                classif=data["classif"],
-                result=[]
-            )
+        if data["status"] == "failed":
+            raise self._task_error(data)
+
+        return await self._hydrate(str(file_id), data)
+
+    async def stream_task_result(self, file_id: uuid.UUID) -> AsyncIterator[str]:
+        """
+        Получить результат поиска по изображению через Server-Sent Events
+
+        Поток отправляет одно событие result (ImgResult) или error
+        после завершения задачи, до этого - комментарии для поддержания соединения.
+
+        """
+        if self._task_result.get(str(file_id)) is None:
+            raise exceptions.NotFound("Задачи не существует")
 
-        result = await self._repo.get_exhibits_by_ids(data["result"])
-        return schemas.ImgResult(
+        return release_session(self._stream_task_result(str(file_id)), self._repo.session)
+
+    async def _stream_task_result(self, task_id: str) -> AsyncIterator[str]:
+        while True:
+            data = await self._task_result.wait(task_id, timeout=self.sse_heartbeat_interval)
+            if data is None:
+                error = exceptions.NotFound("Задачи не существует")
+                break
+            if data["status"] == "done":
+                result = await self._hydrate(task_id, data)
+                yield f"event: result\ndata: {result.model_dump_json()}\n\n"
+                return
+            if data["status"] == "failed":
+                error = self._task_error(data)
+                break
+            yield ": ping\n\n"
+
+        yield f"event: error\ndata: {json.dumps({'status_code': error.status_code, 'message': error.message})}\n\n"
+
+    @permission_filter(Permission.REINDEX_IMG_SEARCHER)
+    async def start_reindex(self, scope: ReindexScope, rate_limit: int) -> schemas.ReindexJob:
+        """
+        Запустить массовую переиндексацию или продолжить незавершенную
+
+        :param scope: files - все загруженные файлы, posters - постеры экспонатов
+        :param rate_limit: максимальное количество сообщений в секунду
+        :return:
+
+        """
+        if not 1 <= rate_limit <= self.max_reindex_rate:
+            raise exceptions.BadRequest(f"Скорость должна быть от 1 до {self.max_reindex_rate} сообщений в секунду")
+
+        job_id = await self._reindexer.start(scope, rate_limit)
+        if job_id is None:
+            raise exceptions.ConflictError("Переиндексация уже выполняется")
+
+        return schemas.ReindexJob.model_validate(await self._reindex_job_repo.get(id=job_id))
+
+    @permission_filter(Permission.REINDEX_IMG_SEARCHER)
+    async def get_reindex(self, job_id: uuid.UUID) -> schemas.ReindexJob:
+        job = await self._reindex_job_repo.get(id=job_id)
+        if not job:
+            raise exceptions.NotFound("Задание не найдено")
+
+        return schemas.ReindexJob.model_validate(job)
+
+    @permission_filter(Permission.REINDEX_IMG_SEARCHER)
+    async def pause_reindex(self, job_id: uuid.UUID) -> None:
+        job = await self._reindex_job_repo.get(id=job_id)
+        if not job:
+            raise exceptions.NotFound("Задание не найдено")
+
+        if not await self._reindex_job_repo.pause(job_id):
+            raise exceptions.BadRequest("Задание не выполняется")
+
+    @staticmethod
+    def _task_error(data: dict) -> exceptions.APIError:
+        if data["error"] == "timeout":
+            return exceptions.APIError("Превышено время выполнения задачи", status_code=504)
+        return exceptions.APIError("Не удалось выполнить задачу", status_code=502)
+
+    async def _hydrate(self, task_id: str, data: dict) -> schemas.ImgResult:
+        """
+        Результат задачи с данными экспонатов в порядке ранжирования поисковика
+
+        Подготовленный результат сохраняется в кэше задач процесса на время
+        жизни кэша ExhibitSmall; позже результат собирается заново из этого
+        кэша (очищается при изменении экспоната).
+
+        """
+        hydrated = self._task_result.get_hydrated(task_id)
+        if hydrated is not None:
+            return hydrated
+
+        ids = list(dict.fromkeys(uuid.UUID(_) for _ in data["result"]))
+        exhibits = {exhibit_id: self._exhibit_cache.get(exhibit_id) for exhibit_id in ids}
+        missing = [exhibit_id for exhibit_id, exhibit in exhibits.items() if exhibit is None]
+        if missing:
+            loaded = [ExhibitSmall.model_validate(exhibit) for exhibit in await self._repo.get_exhibits_by_ids(missing)]
+            await set_poster_variants(self._file_repo, self._file_storage, loaded)
+            for exhibit in loaded:
+                exhibits[exhibit.id] = exhibit
+                self._exhibit_cache.set(exhibit.id, exhibit)
+
+        result = schemas.ImgResult(
             classif=data["classif"],
-            result=[ExhibitSmall.model_validate(exhibit) for exhibit in result]
+            # Удаленные после поиска экспонаты пропускаются
+            result=[exhibit for exhibit in exhibits.values() if exhibit is not None]
         )
+        self._task_result.set_hydrated(task_id, result)
+        return result
 
 
 class ImgSearchAdapter:
+    """
+    Отправка заданий сервису поиска по изображению
+
+    Каналы работают в режиме подтверждений (publisher confirms): отправка
+    завершается только после подтверждения брокером, отказ брокера
+    (DeliveryError) или таймаут пробрасываются вызывающему. Очередь
+    объявляется один раз для каждого канала пула.
+
+    """
+    batch_size = 100
+
     def __init__(self, channel_pool: aio_pika.pool.Pool, config: ImgSearcherConfig):
         self._channel_pool = channel_pool
         self._config = config
+        self._declared: weakref.WeakSet = weakref.WeakSet()
+
+        # Метрики
+        self._published = 0
+        self._batches = 0
+        self._failures = 0
+        self._declares = 0
+        self._confirm_ms = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
 
     async def send_data(
             self,
@@ -115,42 +270,112 @@ class ImgSearchAdapter:
 
     ):
         async with self._channel_pool.acquire() as channel:
-            await channel.declare_queue(
-                self._config.SEARCHER_TASKS_SENDER_ID,
-                durable=True,
-                exclusive=False,
-                auto_delete=False
-            )
+            await self._prepare(channel)
+            await self._publish(channel, [body])
 
-            await channel.default_exchange.publish(
-                aio_pika.Message(body=body.encode()),
-                routing_key=self._config.SEARCHER_TASKS_SENDER_ID
-            )
+    async def send_batch(self, bodies: Iterable[str]) -> int:
+        """
+        Отправка множества заданий (массовая переиндексация)
+
+        Сообщения отправляются пачками по batch_size без ожидания
+        подтверждения каждого: брокер подтверждает пачку целиком.
+
+        :param bodies: тела сообщений
+        :return: количество подтвержденных сообщений
+        """
+        sent = 0
+        async with self._channel_pool.acquire() as channel:
+            await self._prepare(channel)
+            batch = []
+            for body in bodies:
+                batch.append(body)
+                if len(batch) >= self.batch_size:
+                    sent += await self._publish(channel, batch)
+                    batch = []
+            if batch:
+                sent += await self._publish(channel, batch)
+        return sent
+
+    async def _prepare(self, channel: aio_pika.abc.AbstractChannel) -> None:
+        if channel in self._declared:
+            return
+
+        await channel.declare_queue(
+            self._config.SEARCHER_TASKS_SENDER_ID,
+            durable=True,
+            exclusive=False,
+            auto_delete=False
+        )
+        self._declared.add(channel)
+        self._declares += 1
+
+    async def _publish(self, channel: aio_pika.abc.AbstractChannel, bodies: list[str]) -> int:
+        start = time.monotonic()
+        try:
+            await asyncio.gather(*(
+                channel.default_exchange.publish(
+                    aio_pika.Message(
+                        body=body.encode(),
+                        content_type="application/json",
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key=self._config.SEARCHER_TASKS_SENDER_ID,
+                    timeout=self._config.PUBLISH_TIMEOUT
+                )
+                for body in bodies
+            ))
+        except Exception:
+            self._failures += 1
+            # Канал мог быть пересоздан: очередь будет объявлена заново
+            self._declared.discard(channel)
+            raise
+
+        self._confirm_ms.observe((time.monotonic() - start) * 1000)
+        self._published += len(bodies)
+        self._batches += 1
+        return len(bodies)
+
+    def stats(self) -> dict:
+        return {
+            "published": self._published,
+            "batches": self._batches,
+            "failures": self._failures,
+            "declares": self._declares,
+            "confirm_ms": self._confirm_ms.snapshot(),
+        }
 
 
 async def update_task_result(
         message: aio_pika.IncomingMessage,
         app
 ):
+    """
+    Обработчик результата поиска из очереди
+
+    :raise MalformedMessage: некорректное сообщение (отправляется в dead-letter очередь)
+    """
     message_body = message.body.decode()
     logging.debug(f"[RMQ ImgSearch] Received message")
 
-    result = json.loads(message_body)
+    try:
+        result = json.loads(message_body)
+    except json.JSONDecodeError as e:
+        raise MalformedMessage(f"Invalid JSON: {e}")
 
     file_id = result.get("file_id")
     if not file_id:
-        logging.warning("[RMQ ImgSearch] Task id not found in result")
-        return
+        raise MalformedMessage("Task id not found in result")
 
     content = result.get("result")
     if content is None:
-        logging.warning("[RMQ ImgSearch] Result list not found in result")
-        return
+        raise MalformedMessage("Result list not found in result")
+
+    try:
+        content = [str(uuid.UUID(_)) for _ in content]
+    except (ValueError, TypeError, AttributeError) as e:
+        raise MalformedMessage(f"Invalid exhibit id in result: {e}")
 
     classif = result.get("classif") or " "
 
-    app.state.task_result[file_id] = dict(
-        status="done",
-        classif=classif,
-        result=[uuid.UUID(_) for _ in content]
-    )
+    # Результат хранится в общем состоянии, поэтому виден всем worker'ам
+    await app.state.task_result.complete(file_id, classif, content)
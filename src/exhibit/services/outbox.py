@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit.services.repository import OutboxRepo
+from exhibit.utils.metrics import Histogram
+
+OutboxHandler = Callable[[list[dict[str, Any]]], Awaitable[Any]]
+
+
+class OutboxRelay:
+    """
+    Доставка сообщений из outbox
+
+    Сообщения записываются сервисами в транзакции запроса (OutboxRepo.add)
+    и доставляются в фоне пачками: пачка выбирается с блокировкой строк
+    (FOR UPDATE SKIP LOCKED), передается обработчику своей темы и удаляется
+    в той же транзакции после успешной доставки. Неудачная доставка
+    откладывается с экспоненциальной паузой, поэтому сообщение доставляется
+    хотя бы один раз (возможны повторы - обработчики должны быть идемпотентны).
+    Relay выбирает только темы своих обработчиков, поэтому медленные темы
+    доставляются отдельным relay и не задерживают остальные.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            handlers: dict[str, OutboxHandler],
+            batch_size: int = 100,
+            poll_interval: float = 5.0,
+            max_retry_delay: int = 300
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param handlers: обработчики по темам (получают список payload)
+        :param batch_size: размер пачки
+        :param poll_interval: интервал проверки outbox без уведомлений (сек)
+        :param max_retry_delay: максимальная пауза перед повторной доставкой (сек)
+        """
+        self._session_maker = session_maker
+        self._handlers = handlers
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_retry_delay = max_retry_delay
+
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        # Метрики
+        self._delivered = 0
+        self._failed = 0
+        self._batches = 0
+        self._errors = 0
+        self._lag_ms = Histogram((10, 50, 100, 250, 500, 1000, 5000, 10000, 60000, 300000))
+
+    def notify(self) -> None:
+        """
+        Сообщает о новых сообщениях (после фиксации транзакции)
+
+        """
+        self._wakeup.set()
+
+    async def relay(self) -> int:
+        """
+        Доставляет одну пачку сообщений
+
+        :return: количество выбранных сообщений
+        """
+        async with self._lock:
+            async with self._session_maker() as session:
+                repo = OutboxRepo(session)
+                messages = await repo.claim(self._batch_size, list(self._handlers))
+                if not messages:
+                    await session.rollback()
+                    return 0
+
+                by_topic: dict[str, list] = dict()
+                for message in messages:
+                    by_topic.setdefault(message.topic, []).append(message)
+
+                delivered = []
+                for topic, items in by_topic.items():
+                    ids = [message.id for message in items]
+                    try:
+                        await self._handlers[topic]([message.payload for message in items])
+                    except Exception as e:
+                        logging.warning(f"[OutboxRelay] Delivery of {len(ids)} '{topic}' messages failed: {e}")
+                        await repo.retry_later(ids, f"{type(e).__name__}: {e}", self._max_retry_delay)
+                        self._failed += len(ids)
+                        continue
+
+                    delivered.extend(ids)
+                    now = datetime.now(timezone.utc)
+                    for message in items:
+                        self._lag_ms.observe((now - message.created_at).total_seconds() * 1000)
+
+                await repo.delete_many(delivered)
+                await session.commit()
+
+        self._delivered += len(delivered)
+        self._batches += 1
+        return len(messages)
+
+    async def drain(self) -> int:
+        """
+        Доставляет сообщения, пока есть полные пачки
+
+        :return: количество выбранных сообщений
+        """
+        total = 0
+        while True:
+            count = await self.relay()
+            total += count
+            if count < self._batch_size:
+                return total
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.drain()
+            except Exception as e:
+                self._errors += 1
+                logging.error(f"[OutboxRelay] Relay failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "delivered": self._delivered,
+            "failed": self._failed,
+            "batches": self._batches,
+            "errors": self._errors,
+            "lag_ms": self._lag_ms.snapshot(),
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit.services.outbox import OutboxRelay
+from exhibit.utils.metrics import Histogram
+from exhibit.utils.s3 import S3Storage
+
+
+class PurgeIncomplete(Exception):
+    """
+    Часть объектов не удалена после всех повторов (задание будет повторено outbox)
+
+    """
+
+
+class StoragePurge:
+    """
+    Фоновое удаление объектов хранилища по префиксу
+
+    Задания записываются в outbox (тема "s3_purge") в транзакции удаления
+    экспоната или файла, поэтому объекты удаляются только после фиксации
+    удаления записей, а запрос не ждет хранилище. Объекты перечисляются
+    постранично и удаляются запросами delete_objects по batch_size ключей,
+    не более concurrency запросов одновременно; неудаленные ключи повторяются
+    с экспоненциальной паузой. Незавершенные multipart-загрузки отменяются.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            file_storage: S3Storage,
+            batch_size: int = 1000,
+            concurrency: int = 4,
+            retries: int = 3,
+            retry_delay: float = 0.5,
+            poll_interval: float = 2.0
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param file_storage: хранилище файлов
+        :param batch_size: количество ключей в запросе delete_objects (не более 1000)
+        :param concurrency: максимальное количество одновременных запросов удаления
+        :param retries: количество повторов неудачного запроса
+        :param retry_delay: пауза перед первым повтором (сек)
+        :param poll_interval: интервал проверки заданий (сек)
+        """
+        self._file_storage = file_storage
+        self._batch_size = min(batch_size, 1000)
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._relay = OutboxRelay(
+            session_maker,
+            handlers={"s3_purge": self.handle},
+            batch_size=16,
+            poll_interval=poll_interval
+        )
+
+        # Метрики
+        self._purges = 0
+        self._deleted = 0
+        self._requests = 0
+        self._retried = 0
+        self._aborted_uploads = 0
+        self._failed = 0
+        self._purge_ms = Histogram((10, 50, 100, 250, 500, 1000, 5000, 10000, 60000))
+
+    def notify(self) -> None:
+        """
+        Сообщает о новых заданиях (после фиксации транзакции)
+
+        """
+        self._relay.notify()
+
+    def start(self) -> None:
+        self._relay.start()
+
+    async def stop(self) -> None:
+        await self._relay.stop()
+
+    async def handle(self, payloads: list[dict[str, Any]]) -> None:
+        """
+        Обработчик outbox: пачка повторяется целиком, удаление идемпотентно
+
+        """
+        results = await asyncio.gather(
+            *(self.purge(payload["prefix"], payload.get("uploads") or dict()) for payload in payloads),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        self._failed += len(errors)
+        if errors:
+            raise errors[0]
+
+    async def purge(self, prefix: str, uploads: dict[str, str] = None) -> int:
+        """
+        Удаляет все объекты с префиксом
+
+        :param prefix: префикс пути ("<exhibit_id>/" или "<exhibit_id>/<file_id>")
+        :param uploads: незавершенные multipart-загрузки {путь файла: upload_id}
+        :return: количество удаленных объектов
+        """
+        if not prefix:
+            raise ValueError("Empty purge prefix")
+
+        start = time.monotonic()
+        for file_path, upload_id in (uploads or dict()).items():
+            await self._with_retry(self._file_storage.abort_multipart_upload, file_path, upload_id)
+            self._aborted_uploads += 1
+
+        tasks = []
+        batch = []
+        try:
+            async for path, _ in self._file_storage.list_objects(prefix):
+                batch.append(path)
+                if len(batch) >= self._batch_size:
+                    tasks.append(await self._spawn_delete(batch))
+                    batch = []
+            if batch:
+                tasks.append(await self._spawn_delete(batch))
+        finally:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+        deleted = sum(results)
+        self._purges += 1
+        self._deleted += deleted
+        self._purge_ms.observe((time.monotonic() - start) * 1000)
+        return deleted
+
+    async def _spawn_delete(self, paths: list[str]) -> asyncio.Task:
+        # Перечисление ждет, пока освободится место, поэтому в памяти не больше concurrency пачек
+        await self._semaphore.acquire()
+        task = asyncio.get_running_loop().create_task(self._delete_batch(paths))
+        task.add_done_callback(lambda _: self._semaphore.release())
+        return task
+
+    async def _delete_batch(self, paths: list[str]) -> int:
+        remaining = paths
+        for attempt in range(self._retries + 1):
+            if attempt:
+                self._retried += 1
+                await asyncio.sleep(self._retry_delay * 2 ** (attempt - 1))
+            self._requests += 1
+            try:
+                remaining = await self._file_storage.delete_many(remaining)
+            except (ClientError, BotoCoreError) as e:
+                logging.warning(f"[StoragePurge] delete_objects failed ({len(remaining)} keys): {e}")
+                continue
+            if not remaining:
+                return len(paths)
+
+        raise PurgeIncomplete(f"{len(remaining)} of {len(paths)} objects not deleted")
+
+    async def _with_retry(self, func, *args) -> None:
+        for attempt in range(self._retries + 1):
+            try:
+                return await func(*args)
+            except (ClientError, BotoCoreError):
+                if attempt == self._retries:
+                    raise
+                self._retried += 1
+                await asyncio.sleep(self._retry_delay * 2 ** attempt)
+
+    def stats(self) -> dict:
+        return {
+            "purges": self._purges,
+            "deleted": self._deleted,
+            "requests": self._requests,
+            "retried": self._retried,
+            "aborted_uploads": self._aborted_uploads,
+            "failed": self._failed,
+            "purge_ms": self._purge_ms.snapshot(),
+            "relay": self._relay.stats(),
+        }
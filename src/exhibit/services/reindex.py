@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit.models.state import ReindexScope, ReindexState
+from exhibit.services.repository import RepoFactory
+
+
+class ImgSearchReindexer:
+    """
+    Массовая переиндексация поисковика по изображению
+
+    Записи (загруженные файлы или постеры экспонатов) читаются пачками по
+    возрастанию id (keyset) и отправляются командами add через
+    ImgSearchAdapter.send_batch не быстрее rate_limit сообщений в секунду.
+    После каждой пачки в reindex_jobs сохраняется контрольная точка (cursor),
+    поэтому приостановленное, упавшее или прерванное остановкой процесса
+    задание продолжается с последней подтвержденной пачки (сообщения
+    последней неподтвержденной пачки могут быть отправлены повторно).
+    Проваленное задание (FAILED) тоже продолжается следующим запуском.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            isa,
+            batch_size: int = 500,
+            lease: float = 60
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param isa: ImgSearchAdapter
+        :param batch_size: максимальный размер пачки
+        :param lease: время, после которого задание без контрольных точек может быть перехвачено (сек)
+        """
+        self._session_maker = session_maker
+        self._isa = isa
+        self._batch_size = batch_size
+        self._lease = lease
+        self._tasks: dict[uuid.UUID, asyncio.Task] = dict()
+
+        # Метрики
+        self._published = 0
+        self._batches = 0
+        self._failed_jobs = 0
+
+    async def start(self, scope: ReindexScope, rate_limit: int) -> uuid.UUID | None:
+        """
+        Запускает задание или продолжает незавершенное задание той же области
+
+        :param scope: область переиндексации
+        :param rate_limit: максимальное количество сообщений в секунду
+        :return: идентификатор задания или None, если задание выполняется другим запуском
+        """
+        owner = uuid.uuid4()
+        async with self._session_maker() as session:
+            repos = RepoFactory(session)
+            # Количество пересчитывается и при продолжении: файлы могли добавиться или удалиться
+            total = await self._count(repos, scope)
+            job = await repos.reindex_job.get_unfinished(scope)
+            if job is None:
+                job = await repos.reindex_job.create(
+                    scope=scope,
+                    state=ReindexState.PAUSED,
+                    rate_limit=rate_limit,
+                    total=total
+                )
+            job_id = job.id
+            if not await repos.reindex_job.acquire(job_id, owner, self._lease, rate_limit=rate_limit, total=total):
+                await repos.uow.rollback()
+                return None
+            await repos.uow.commit()
+
+        task = asyncio.get_running_loop().create_task(self._run(job_id, owner))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._forget(job_id, task))
+        return job_id
+
+    def _forget(self, job_id: uuid.UUID, task: asyncio.Task) -> None:
+        # Задание могло быть перезапущено в этом процессе: удаляется только завершившийся запуск
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+
+    @asynccontextmanager
+    async def _repos(self) -> AsyncIterator[RepoFactory]:
+        # Сессия на один шаг: между пачками (и во время ожидания лимита скорости) соединение не занято
+        async with self._session_maker() as session:
+            yield RepoFactory(session)
+
+    async def _run(self, job_id: uuid.UUID, owner: uuid.UUID) -> None:
+        async with self._repos() as repos:
+            job = await repos.reindex_job.get(id=job_id)
+            scope, cursor, processed, rate_limit = job.scope, job.cursor, job.processed, job.rate_limit
+
+        chunk_size = max(1, min(self._batch_size, rate_limit))
+        sent = 0
+        start = time.monotonic()
+        try:
+            while True:
+                async with self._repos() as repos:
+                    chunk = await self._fetch(repos, scope, cursor, chunk_size)
+                    if not chunk:
+                        await repos.reindex_job.checkpoint(job_id, owner, state=ReindexState.DONE, rate=None)
+                        await repos.uow.commit()
+                        logging.info(f"[Reindex] Job {job_id} done: {processed} messages")
+                        return
+
+                await self._isa.send_batch(
+                    json.dumps({"file_id": str(file_id), "exhibit_id": str(exhibit_id), "command": "add"})
+                    for _, file_id, exhibit_id in chunk
+                )
+                self._published += len(chunk)
+                self._batches += 1
+
+                cursor = chunk[-1][0]
+                processed += len(chunk)
+                sent += len(chunk)
+                rate = sent / max(time.monotonic() - start, 1e-6)
+                async with self._repos() as repos:
+                    if not await repos.reindex_job.checkpoint(
+                            job_id, owner, cursor=cursor, processed=processed, rate=rate
+                    ):
+                        await repos.uow.rollback()
+                        logging.info(f"[Reindex] Job {job_id} paused or taken over")
+                        return
+                    await repos.uow.commit()
+
+                # Ограничение скорости: следующая пачка не раньше, чем позволяет rate_limit
+                delay = sent / rate_limit - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Остановка процесса: задание продолжится после истечения аренды
+            raise
+        except Exception as e:
+            self._failed_jobs += 1
+            logging.error(f"[Reindex] Job {job_id} failed: {e}")
+            async with self._repos() as repos:
+                await repos.reindex_job.checkpoint(
+                    job_id, owner, state=ReindexState.FAILED, rate=None, error=f"{type(e).__name__}: {e}"[:255]
+                )
+                await repos.uow.commit()
+
+    @staticmethod
+    async def _count(repos: RepoFactory, scope: ReindexScope) -> int:
+        if scope == ReindexScope.POSTERS:
+            return await repos.exhibit.count_posters()
+        return await repos.file.count_uploaded()
+
+    @staticmethod
+    async def _fetch(
+            repos: RepoFactory,
+            scope: ReindexScope,
+            cursor: uuid.UUID | None,
+            limit: int
+    ) -> Sequence[tuple[uuid.UUID, uuid.UUID, uuid.UUID]]:
+        if scope == ReindexScope.POSTERS:
+            return await repos.exhibit.get_posters_after(cursor, limit)
+        return await repos.file.get_uploaded_after(cursor, limit)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running_jobs": len(self._tasks),
+            "published": self._published,
+            "batches": self._batches,
+            "failed_jobs": self._failed_jobs,
+        }
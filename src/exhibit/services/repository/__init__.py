@@ -4,11 +4,19 @@ from .like import LikeRepo
 from .notification import NotificationRepo
 from .tag import TagRepo
 from .file import FileRepo
+from .outbox import OutboxRepo
+from .reindex import ReindexJobRepo
+from .uow import UnitOfWork
 
 
 class RepoFactory:
-    def __init__(self, session):
+    def __init__(self, session, uow: UnitOfWork = None):
         self._session = session
+        self._uow = uow or UnitOfWork(session)
+
+    @property
+    def uow(self) -> UnitOfWork:
+        return self._uow
 
     @property
     def notification(self) -> NotificationRepo:
@@ -37,3 +45,11 @@ class RepoFactory:
     @property
     def file(self) -> FileRepo:
         return FileRepo(self._session)
+
+    @property
+    def outbox(self) -> OutboxRepo:
+        return OutboxRepo(self._session)
+
+    @property
+    def reindex_job(self) -> ReindexJobRepo:
+        return ReindexJobRepo(self._session)
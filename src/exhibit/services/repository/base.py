@@ -15,14 +15,14 @@ class BaseRepository(Generic[T]):
 
     async def create(self, **kwargs) -> T:
         """
-        Создает запись в БД
+        Создает запись в БД (без фиксации транзакции, см. UnitOfWork)
 
         :param kwargs:
         :return:
         """
         model = self.table(**kwargs)
         self._session.add(model)
-        await self._session.commit()
+        await self._session.flush()
         return model
 
     async def get(self, **kwargs) -> Optional[T]:
@@ -64,7 +64,6 @@ class BaseRepository(Generic[T]):
         """
         if kwargs:
             await self._session.execute(update(self.table).where(self.table.id == id).values(**kwargs))
-            await self._session.commit()
 
     async def delete(self, id: uuid.UUID) -> None:
         """
@@ -74,7 +73,6 @@ class BaseRepository(Generic[T]):
         :return:
         """
         await self._session.execute(delete(self.table).where(self.table.id == id))
-        await self._session.commit()
 
     async def count(self, **kwargs) -> int:
         """
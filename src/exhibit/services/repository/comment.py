@@ -1,6 +1,9 @@
 import uuid
+from datetime import datetime
+from typing import AsyncIterator
 
-from sqlalchemy import select, bindparam, text, UUID, Integer, delete
+from sqlalchemy import select, bindparam, text, UUID, Integer, delete, func, tuple_, Row
+from sqlalchemy.orm import aliased
 
 from exhibit.models import tables
 from exhibit.services.repository.base import BaseRepository
@@ -31,7 +34,6 @@ class CommentRepo(BaseRepository[tables.Comment]):
 
         await self.session.execute(delete_query)
         await self.session.execute(delete_branch_query)
-        await self.session.commit()
 
 
 class CommentTreeRepo(BaseRepository[tables.CommentTree]):
@@ -63,37 +65,25 @@ class CommentTreeRepo(BaseRepository[tables.CommentTree]):
             bindparam('exhibit_id', type_=UUID),
             bindparam('parent_level', type_=Integer),
         ).columns()
-        result = await self.session.execute(sql_raw, params)
-        await self.session.commit()
-        return result
-
-    async def get_comments(self, exhibit_id: uuid.UUID):
-        # sql_raw = """
-        #             SELECT
-        #                 tableData.id,
-        #                 tableData.content,
-        #                 tableData.owner_id,
-        #                 tableUser.first_name,
-        #                 tableUser.last_name,
-        #                 tableUser.username,
-        #                 tableTree.nearest_ancestor_id,
-        #                 tableTree.exhibit_id,
-        #                 tableData.state,
-        #                 tableData.create_time,
-        #                 tableData.update_time
-        #             FROM comment AS tableData
-        #             JOIN "user" AS tableUser
-        #                 ON tableUser.id = tableData.owner_id
-        #             JOIN comment_tree AS tableTree
-        #                 ON tableData.id = tableTree.descendant_id
-        #             WHERE tableTree.exhibit_id = $1
-        #                 AND tableTree.ancestor_id = tableData.id
-        #             ORDER BY tableData.id ASC
-        #         """
-        # smt = select(tables.Comment, tables.CommentTree).select_from(
-        #     tables.Comment.join(tables.CommentTree)
-        # ).where(tables.CommentTree.exhibit_id == exhibit_id)
+        return await self.session.execute(sql_raw, params)
 
+    async def get_comments(
+            self,
+            exhibit_id: uuid.UUID,
+            parent_id: uuid.UUID = None,
+            max_level: int = None,
+            limit: int = None
+    ):
+        """
+        Получает комментарии экспоната в порядке (level, id),
+        поэтому родитель всегда идет раньше своих ответов
+
+        :param exhibit_id:
+        :param parent_id: только поддерево этого комментария (без него самого)
+        :param max_level: максимальный уровень вложенности
+        :param limit: максимальное количество комментариев
+        :return: [(comment, nearest_ancestor_id, level), ...]
+        """
         query = (
             select(
                 tables.Comment,
@@ -102,8 +92,90 @@ class CommentTreeRepo(BaseRepository[tables.CommentTree]):
             )
             .join(self.table, tables.Comment.id == self.table.descendant_id)
             .where(self.table.exhibit_id == exhibit_id)
+            .order_by(self.table.level.asc(), tables.Comment.id.asc())
+        )
+
+        # Уровень и ближайший предок одинаковы во всех строках потомка,
+        # поэтому для поддерева достаточно строк с ancestor_id = parent_id
+        if parent_id:
+            query = query.where(self.table.ancestor_id == parent_id).where(self.table.descendant_id != parent_id)
+        else:
+            query = query.where(self.table.ancestor_id == tables.Comment.id)
+
+        if max_level is not None:
+            query = query.where(self.table.level <= max_level)
+
+        if limit:
+            query = query.limit(limit)
+
+        result = await self.session.execute(query)
+        return result.fetchall()
+
+    async def get_threads(
+            self,
+            exhibit_id: uuid.UUID,
+            limit: int = 10,
+            cursor: tuple[datetime, uuid.UUID] = None
+    ):
+        """
+        Получает корневые комментарии экспоната с количеством прямых ответов
+        (keyset пагинация по (created_at, id))
+
+        :param exhibit_id:
+        :param limit:
+        :param cursor: (created_at, id) последнего полученного комментария
+        :return: [(comment, replies_count), ...]
+        """
+        replies = aliased(self.table)
+        replies_count = (
+            select(func.count(replies.id))
+            .where(replies.ancestor_id == tables.Comment.id)
+            .where(replies.nearest_ancestor_id == tables.Comment.id)
+            .where(replies.descendant_id != replies.ancestor_id)
+            .scalar_subquery()
+        )
+
+        query = (
+            select(tables.Comment, replies_count)
+            .join(self.table, tables.Comment.id == self.table.descendant_id)
+            .where(self.table.exhibit_id == exhibit_id)
             .where(self.table.ancestor_id == tables.Comment.id)
-            .order_by(tables.Comment.id.asc())
+            .where(self.table.level == 0)
+            .order_by(tables.Comment.created_at.asc(), tables.Comment.id.asc())
+            .limit(limit)
         )
+        if cursor:
+            query = query.where(tuple_(tables.Comment.created_at, tables.Comment.id) > tuple_(
+                *cursor, types=[tables.Comment.created_at.type, tables.Comment.id.type]
+            ))
+
         result = await self.session.execute(query)
         return result.fetchall()
+
+    async def stream_comments(self, exhibit_id: uuid.UUID, partition_size: int = 500) -> AsyncIterator[Row]:
+        """
+        Построчно отдает комментарии экспоната в порядке (level, id)
+        через серверный курсор, не загружая всю ветку в память
+
+        :param exhibit_id:
+        :param partition_size: количество строк, получаемых из курсора за раз
+        :return: (comment, nearest_ancestor_id, level)
+        """
+        query = (
+            select(
+                tables.Comment,
+                self.table.nearest_ancestor_id,
+                self.table.level,
+            )
+            .join(self.table, tables.Comment.id == self.table.descendant_id)
+            .where(self.table.exhibit_id == exhibit_id)
+            .where(self.table.ancestor_id == tables.Comment.id)
+            .order_by(self.table.level.asc(), tables.Comment.id.asc())
+            .execution_options(yield_per=partition_size)
+        )
+        result = await self.session.stream(query)
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
@@ -1,10 +1,12 @@
 import uuid
-from typing import Sequence
+from typing import Any, Sequence
 
-from sqlalchemy import select, text, func, or_, and_
-from sqlalchemy.orm import subqueryload
+from sqlalchemy import select, update, delete, values, column, literal, func, or_, and_, tuple_, UUID, BIGINT
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import subqueryload, selectinload
 
 from exhibit.models import tables
+from exhibit.models.state import ExhibitState
 from .base import BaseRepository
 from ...models.tables import Like, Exhibit
 
@@ -12,6 +14,16 @@ from ...models.tables import Like, Exhibit
 class ExhibitRepo(BaseRepository[tables.Exhibit]):
     table = tables.Exhibit
 
+    async def delete(self, id: uuid.UUID) -> None:
+        """
+        Удаляет экспонат вместе с привязкой тегов (комментарии, лайки и файлы удаляются раньше)
+
+        :param id:
+        :return:
+        """
+        await self._session.execute(delete(tables.ExhibitTag).where(tables.ExhibitTag.exhibit_id == id))
+        await super().delete(id)
+
     async def add_tag(self, exhibit_id: uuid.UUID, tag_id: uuid.UUID) -> None:
         obj = await self.table.get(id=exhibit_id)
         obj.tags.add(tables.Tag.get(id=tag_id))
@@ -19,32 +31,85 @@ class ExhibitRepo(BaseRepository[tables.Exhibit]):
 
     async def search(
             self,
-            query: str,
-            fields: list[str],
+            tokens: list[str],
             limit: int = 100,
             offset: int = 0,
-            order_by: str = "created_at",
             **kwargs
     ) -> list[tables.Exhibit]:
-        return await self.__get_range(
-            query=query,
-            fields=fields,
-            limit=limit,
-            offset=offset,
-            order_by=order_by,
-            **kwargs
+        """
+        Полнотекстовый поиск экспонатов
+
+        Совпадения ищутся по tsvector (заголовок и контент, GIN индекс) с префиксным
+        сопоставлением каждого токена, а также по триграммной похожести заголовка.
+        Результат отсортирован по релевантности (ts_rank + similarity),
+        каждому экспонату проставляется highlight - фрагменты контента с совпадениями.
+        Контент экранируется (HTML) до ts_headline, поэтому highlight - безопасный HTML,
+        единственная разметка в нем - теги <b> совпадений.
+
+        :param tokens: нормализованные токены запроса (utils.formators.tokenize)
+        :param limit:
+        :param offset:
+        :param kwargs: filter by
+        :return:
+        """
+        if not tokens:
+            return []
+
+        config = literal("russian", REGCONFIG)
+        phrase = " ".join(tokens)
+        ts_query = func.to_tsquery(config, " & ".join(f"{token}:*" for token in tokens))
+        rank = (
+                func.ts_rank(self.table.search_vector, ts_query) +
+                func.similarity(self.table.title, phrase)
+        ).label("rank")
+        highlight = func.ts_headline(
+            config,
+            self.__html_escape(self.table.content),
+            ts_query,
+            "StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5"
+        ).label("highlight")
+
+        # selectinload, чтобы не выполнять запрос с ранжированием повторно
+        stmt = (
+            select(self.table, highlight)
+            .options(selectinload(self.table.tags))
+            .where(or_(
+                self.table.search_vector.op("@@")(ts_query),
+                self.table.title.op("%")(phrase)
+            ))
+            .where(and_(*[getattr(self.table, field) == value for field, value in kwargs.items()]))
+            .order_by(rank.desc(), self.table.id.asc())
+            .limit(limit)
+            .offset(offset)
         )
 
+        exhibits = []
+        for exhibit, exhibit_highlight in await self._session.execute(stmt):
+            exhibit.highlight = exhibit_highlight
+            exhibits.append(exhibit)
+        return exhibits
+
+    @staticmethod
+    def __html_escape(value):
+        # & - первым, чтобы не экранировать повторно результаты остальных замен
+        for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")):
+            value = func.replace(value, char, entity)
+        return value
+
     async def get_all(
             self, limit: int = 100,
             offset: int = 0,
             order_by: str = "id",
+            cursor: tuple[Any, uuid.UUID] = None,
+            backward: bool = False,
             **kwargs
     ) -> list[tables.Exhibit]:
         return await self.__get_range(
             limit=limit,
             offset=offset,
             order_by=order_by,
+            cursor=cursor,
+            backward=backward,
             **kwargs
         )
 
@@ -55,84 +120,183 @@ class ExhibitRepo(BaseRepository[tables.Exhibit]):
     async def __get_range(
             self,
             *,
-            query: str = None,
-            fields: list[str] = None,
             limit: int = 100,
             offset: int = 0,
             order_by: str = "id",
+            cursor: tuple[Any, uuid.UUID] = None,
+            backward: bool = False,
             **kwargs
     ) -> list[tables.Exhibit]:
-        # Лайки
-        subquery = (
-            select(
-                Like.exhibit_id,
-                func.count(Like.id).label('likes_count')
-            )
-            .group_by(Like.exhibit_id)
-            .subquery()
-        )
+        """
+        Получает диапазон экспонатов
+
+        Если передан cursor (значение поля order_by и id последнего полученного экспоната),
+        то используется keyset пагинация и offset игнорируется: выборка начинается сразу
+        после позиции курсора (или перед ней, если backward=True), поэтому стоимость
+        запроса не зависит от глубины страницы.
+
+        Порядок всегда (order_by, id) по возрастанию, результат с backward=True
+        возвращается в том же порядке.
+
+        """
+        order_column = getattr(self.table, order_by)
 
         # Основной запрос
         stmt = (
-            select(
-                self.table,
-                subquery.c.likes_count
-            )
-            .outerjoin(subquery, self.table.id == subquery.c.exhibit_id)
+            select(self.table)
             .options(subqueryload(self.table.tags))
-            .order_by(text(order_by))
             .limit(limit)
-            .offset(offset)
         )
 
+        if cursor:
+            stmt = stmt.where(self.__keyset_filter(order_column, *cursor, backward=backward))
+        else:
+            stmt = stmt.offset(offset)
+
+        if backward:
+            stmt = stmt.order_by(order_column.desc(), self.table.id.desc())
+        else:
+            stmt = stmt.order_by(order_column.asc(), self.table.id.asc())
+
         # Фильтры kwargs
         stmt = stmt.where(
             and_(*[getattr(self.table, field) == value for field, value in kwargs.items()])
         )
 
-        # Поиск
-        if query and fields:
-            stmt = stmt.where(
-                or_(*[getattr(self.table, field).ilike(f"%{query}%") for field in fields])
-            )
+        exhibits = list((await self._session.execute(stmt)).scalars().all())
+        if backward:
+            exhibits.reverse()
+        return exhibits
+
+    def __keyset_filter(self, column, value: Any, last_id: uuid.UUID, *, backward: bool = False):
+        position = tuple_(column, self.table.id)
+        cursor = tuple_(value, last_id, types=[column.type, self.table.id.type])
+        # Колонки с server_default (created_at) на практике не содержат NULL
+        if not column.nullable or column.server_default is not None:
+            return position < cursor if backward else position > cursor
 
-        result = await self._session.execute(stmt)
-        exhibits_with_likes = []
-        for row in result:
-            exhibit = row[0]
-            likes_count = row[1]
-            exhibit.likes_count = likes_count if likes_count else 0
-            exhibits_with_likes.append(exhibit)
+        # PostgreSQL при сортировке по возрастанию располагает NULL в конце
+        if not backward:
+            if value is None:
+                return and_(column.is_(None), self.table.id > last_id)
+            return or_(position > cursor, column.is_(None))
 
-        return exhibits_with_likes
+        if value is None:
+            return or_(column.is_not(None), and_(column.is_(None), self.table.id < last_id))
+        return position < cursor
 
     async def get_exhibits_by_ids(self, ids: list[uuid.UUID]) -> Sequence[Exhibit]:
+        """
+        Экспонаты по списку id (порядок не гарантируется)
 
-        # Лайки
-        subquery = (
-            select(
-                Like.exhibit_id,
-                func.count(Like.id).label('likes_count')
-            )
-            .group_by(Like.exhibit_id)
-            .subquery()
-        )
+        Теги загружаются одним запросом по id выбранных экспонатов (selectinload),
+        без повторного выполнения основного запроса.
 
+        """
+        if not ids:
+            return []
         stmt = (
-            select(
-                self.table,
-                subquery.c.likes_count
-            )
-            .outerjoin(subquery, self.table.id == subquery.c.exhibit_id)
-            .options(subqueryload(self.table.tags))
+            select(self.table)
+            .options(selectinload(self.table.tags))
             .where(self.table.id.in_(ids))
         )
+        return (await self._session.execute(stmt)).scalars().all()
+
+    async def change_likes_count(self, exhibit_id: uuid.UUID, delta: int) -> None:
+        """
+        Изменяет счетчик лайков экспоната (без фиксации транзакции)
+
+        Вызывается в той же транзакции, что и создание/удаление лайка,
+        поэтому счетчик всегда согласован с таблицей likes.
+
+        :param exhibit_id:
+        :param delta: +1 / -1
+        :return:
+        """
+        await self._session.execute(
+            update(self.table)
+            .where(self.table.id == exhibit_id)
+            # updated_at не должен меняться от лайков
+            .values(likes_count=self.table.likes_count + delta, updated_at=self.table.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def add_views(self, increments: dict[uuid.UUID, int]) -> None:
+        """
+        Увеличивает счетчики просмотров пачкой одним запросом
+        UPDATE ... FROM (VALUES ...) (без фиксации транзакции)
+
+        :param increments: {exhibit_id: количество новых просмотров}
+        :return:
+        """
+        if not increments:
+            return
+
+        data = values(
+            column("exhibit_id", UUID(as_uuid=True)),
+            column("delta", BIGINT()),
+            name="increments"
+        ).data(list(increments.items()))
+
+        await self._session.execute(
+            update(self.table)
+            .where(self.table.id == data.c.exhibit_id)
+            # updated_at не должен меняться от просмотров
+            .values(views=self.table.views + data.c.delta, updated_at=self.table.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def reconcile_likes_count(self, dry_run: bool = False) -> int:
+        """
+        Сверяет счетчики лайков с таблицей likes и исправляет расхождения
 
-        exhibits_with_likes = []
-        for row in await self._session.execute(stmt):
-            exhibit = row[0]
-            likes_count = row[1]
-            exhibit.likes_count = likes_count if likes_count else 0
-            exhibits_with_likes.append(exhibit)
+        :param dry_run: только посчитать расхождения, не исправляя их
+        :return: количество экспонатов с неверным счетчиком
+        """
+        actual = (
+            select(self.table.id.label("exhibit_id"), func.count(Like.id).label("likes_count"))
+            .outerjoin(Like, Like.exhibit_id == self.table.id)
+            .group_by(self.table.id)
+            .subquery()
+        )
+        mismatch = and_(
+            self.table.id == actual.c.exhibit_id,
+            self.table.likes_count != actual.c.likes_count
+        )
+
+        if dry_run:
+            return (await self._session.execute(select(func.count()).select_from(self.table).where(mismatch))).scalar()
+
+        result = await self._session.execute(
+            update(self.table)
+            .where(mismatch)
+            .values(likes_count=actual.c.likes_count, updated_at=self.table.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def get_posters_after(
+            self,
+            cursor: uuid.UUID | None,
+            limit: int
+    ) -> Sequence[tuple[uuid.UUID, uuid.UUID, uuid.UUID]]:
+        """
+        Постеры не удаленных экспонатов по возрастанию id экспоната (keyset)
+
+        :param cursor: id последнего полученного экспоната
+        :param limit: размер пачки
+        :return: [(ключ, file_id, exhibit_id)]
+        """
+        stmt = (
+            select(self.table.id, self.table.poster, self.table.id)
+            .where(self.table.poster.is_not(None), self.table.state != ExhibitState.DELETED)
+            .order_by(self.table.id)
+            .limit(limit)
+        )
+        if cursor is not None:
+            stmt = stmt.where(self.table.id > cursor)
+        return (await self._session.execute(stmt)).tuples().all()
 
-        return exhibits_with_likes
+    async def count_posters(self) -> int:
+        stmt = select(func.count()).where(self.table.poster.is_not(None), self.table.state != ExhibitState.DELETED)
+        return (await self._session.execute(stmt)).scalar()
@@ -1,6 +1,183 @@
+import uuid
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import select, update, delete, func, tuple_, and_, or_
+
 from exhibit.models import tables
+from exhibit.models.state import ExhibitState
 from exhibit.services.repository.base import BaseRepository
 
 
 class FileRepo(BaseRepository[tables.File]):
     table = tables.File
+
+    def __indexable(self):
+        return (
+            self.table.is_uploaded.is_(True),
+            tables.Exhibit.id == self.table.exhibit_id,
+            tables.Exhibit.state != ExhibitState.DELETED
+        )
+
+    async def get_uploaded_after(
+            self,
+            cursor: uuid.UUID | None,
+            limit: int
+    ) -> Sequence[tuple[uuid.UUID, uuid.UUID, uuid.UUID]]:
+        """
+        Загруженные файлы не удаленных экспонатов по возрастанию id (keyset)
+
+        :param cursor: id последнего полученного файла
+        :param limit: размер пачки
+        :return: [(ключ, file_id, exhibit_id)]
+        """
+        stmt = (
+            select(self.table.id, self.table.id, self.table.exhibit_id)
+            .where(*self.__indexable())
+            .order_by(self.table.id)
+            .limit(limit)
+        )
+        if cursor is not None:
+            stmt = stmt.where(self.table.id > cursor)
+        return (await self._session.execute(stmt)).tuples().all()
+
+    async def count_uploaded(self) -> int:
+        stmt = select(func.count()).select_from(self.table).where(*self.__indexable())
+        return (await self._session.execute(stmt)).scalar()
+
+    async def get_manifest(self, exhibit_id: uuid.UUID) -> Sequence[tuple]:
+        """
+        Загруженные файлы экспоната (только поля, нужные для ответа)
+
+        :param exhibit_id:
+        :return: [(id, filename, content_type, created_at, updated_at, variants)]
+        """
+        stmt = (
+            select(
+                self.table.id,
+                self.table.filename,
+                self.table.content_type,
+                self.table.created_at,
+                self.table.updated_at,
+                self.table.variants
+            )
+            .where(self.table.exhibit_id == exhibit_id, self.table.is_uploaded.is_(True))
+            .order_by(self.table.id)
+        )
+        return (await self._session.execute(stmt)).tuples().all()
+
+    async def get_variants(self, ids: list[uuid.UUID]) -> dict[uuid.UUID, list[dict]]:
+        """
+        Уменьшенные копии файлов (для постеров в списках)
+
+        :return: {file_id: variants} только для файлов с копиями
+        """
+        if not ids:
+            return dict()
+        result = await self._session.execute(
+            select(self.table.id, self.table.variants)
+            .where(self.table.id.in_(ids), self.table.variants.is_not(None))
+        )
+        return {file_id: variants for file_id, variants in result.tuples().all()}
+
+    async def set_variants(self, file_id: uuid.UUID, variants: list[dict]) -> None:
+        await self._session.execute(
+            update(self.table)
+            .where(self.table.id == file_id, self.table.is_uploaded.is_(True))
+            .values(variants=variants)
+        )
+
+    async def touch(self, file_id: uuid.UUID) -> None:
+        """
+        Обновляет updated_at (активность незавершенной multipart-загрузки)
+
+        """
+        await self._session.execute(update(self.table).where(self.table.id == file_id).values(updated_at=func.now()))
+
+    async def confirm_uploaded(
+            self,
+            files: list[tuple[uuid.UUID, uuid.UUID]]
+    ) -> Sequence[tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Отмечает файлы загруженными одним запросом (без фиксации транзакции)
+
+        Пропускаются уже подтвержденные файлы и файлы удаленных экспонатов.
+
+        :param files: [(file_id, exhibit_id)]
+        :return: [(file_id, exhibit_id)] подтвержденных файлов
+        """
+        if not files:
+            return []
+        result = await self._session.execute(
+            update(self.table)
+            .where(
+                tuple_(self.table.id, self.table.exhibit_id).in_(files),
+                self.table.is_uploaded.is_not(True),
+                tables.Exhibit.id == self.table.exhibit_id,
+                tables.Exhibit.state != ExhibitState.DELETED
+            )
+            .values(is_uploaded=True, upload_id=None)
+            .returning(self.table.id, self.table.exhibit_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.tuples().all()
+
+    async def get_unconfirmed_before(
+            self,
+            created_before: datetime,
+            multipart_active_before: datetime,
+            limit: int
+    ) -> Sequence[tuple[uuid.UUID, uuid.UUID, str | None]]:
+        """
+        Неподтвержденные файлы, созданные раньше указанного времени
+
+        Multipart-загрузки считаются незавершенными по времени последней активности.
+
+        :return: [(file_id, exhibit_id, upload_id)]
+        """
+        stmt = (
+            select(self.table.id, self.table.exhibit_id, self.table.upload_id)
+            .where(
+                self.table.is_uploaded.is_not(True),
+                or_(
+                    and_(self.table.upload_id.is_(None), self.table.created_at < created_before),
+                    and_(
+                        self.table.upload_id.is_not(None),
+                        func.coalesce(self.table.updated_at, self.table.created_at) < multipart_active_before
+                    )
+                )
+            )
+            .order_by(self.table.created_at)
+            .limit(limit)
+        )
+        return (await self._session.execute(stmt)).tuples().all()
+
+    async def delete_unconfirmed(self, ids: list[uuid.UUID]) -> int:
+        if not ids:
+            return 0
+        result = await self._session.execute(
+            delete(self.table)
+            .where(self.table.id.in_(ids), self.table.is_uploaded.is_not(True))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def delete_by_exhibit(self, exhibit_id: uuid.UUID) -> dict[uuid.UUID, str]:
+        """
+        Удаляет файлы экспоната
+
+        :return: {file_id: upload_id} незавершенных multipart-загрузок
+        """
+        result = await self._session.execute(
+            delete(self.table)
+            .where(self.table.exhibit_id == exhibit_id)
+            .returning(self.table.id, self.table.upload_id)
+            .execution_options(synchronize_session=False)
+        )
+        return {file_id: upload_id for file_id, upload_id in result.tuples().all() if upload_id}
+
+    async def get_existing_ids(self, ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        if not ids:
+            return set()
+        result = await self._session.execute(select(self.table.id).where(self.table.id.in_(ids)))
+        return set(result.scalars().all())
@@ -1,6 +1,25 @@
+import uuid
+
+from sqlalchemy import delete
+
 from exhibit.models import tables
 from exhibit.services.repository.base import BaseRepository
 
 
 class LikeRepo(BaseRepository[tables.Like]):
     table = tables.Like
+
+    async def delete_by_exhibit(self, exhibit_id: uuid.UUID) -> None:
+        await self._session.execute(delete(self.table).where(self.table.exhibit_id == exhibit_id))
+
+    async def delete_returning(self, id: uuid.UUID) -> bool:
+        """
+        Удаляет лайк, DELETE ... RETURNING
+
+        :param id:
+        :return: True, если запись удалена этим запросом
+        """
+        result = await self._session.execute(
+            delete(self.table).where(self.table.id == id).returning(self.table.id)
+        )
+        return result.scalar_one_or_none() is not None
@@ -0,0 +1,64 @@
+from typing import Any, Sequence
+
+from sqlalchemy import select, delete, update, func
+
+from exhibit.models import tables
+from exhibit.services.repository.base import BaseRepository
+
+
+class OutboxRepo(BaseRepository[tables.OutboxMessage]):
+    table = tables.OutboxMessage
+
+    async def add(self, topic: str, payload: dict[str, Any]) -> None:
+        """
+        Добавляет сообщение в outbox (в текущей транзакции)
+
+        :param topic: тема (определяет способ доставки)
+        :param payload: тело сообщения
+        """
+        self._session.add(self.table(topic=topic, payload=payload))
+
+    async def claim(self, limit: int, topics: list[str]) -> Sequence[tables.OutboxMessage]:
+        """
+        Выбирает готовые к доставке сообщения и блокирует их до конца транзакции
+
+        Заблокированные другим процессом сообщения пропускаются (SKIP LOCKED),
+        поэтому несколько relay'ев разбирают outbox без пересечений.
+
+        :param limit: максимальное количество сообщений
+        :param topics: темы, которые доставляет relay
+        :return:
+        """
+        result = await self._session.execute(
+            select(self.table)
+            .where(self.table.available_at <= func.now(), self.table.topic.in_(topics))
+            .order_by(self.table.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
+
+    async def delete_many(self, ids: list[int]) -> None:
+        if ids:
+            await self._session.execute(delete(self.table).where(self.table.id.in_(ids)))
+
+    async def retry_later(self, ids: list[int], error: str, max_delay: int) -> None:
+        """
+        Откладывает доставку сообщений с экспоненциальной паузой
+
+        :param ids: идентификаторы сообщений
+        :param error: причина неудачи
+        :param max_delay: максимальная пауза (сек)
+        """
+        if not ids:
+            return
+        delay = func.least(func.power(2, self.table.attempts), max_delay)
+        await self._session.execute(
+            update(self.table)
+            .where(self.table.id.in_(ids))
+            .values(
+                attempts=self.table.attempts + 1,
+                last_error=error[:255],
+                available_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, delay)
+            )
+        )
@@ -0,0 +1,75 @@
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, func, or_
+
+from exhibit.models import tables
+from exhibit.models.state import ReindexScope, ReindexState
+from exhibit.services.repository.base import BaseRepository
+
+
+class ReindexJobRepo(BaseRepository[tables.ReindexJob]):
+    table = tables.ReindexJob
+
+    async def get_unfinished(self, scope: ReindexScope) -> Optional[tables.ReindexJob]:
+        """
+        Последнее незавершенное задание (для продолжения)
+
+        """
+        stmt = (
+            select(self.table)
+            .where(self.table.scope == scope, self.table.state != ReindexState.DONE)
+            .order_by(self.table.created_at.desc())
+            .limit(1)
+        )
+        return (await self._session.execute(stmt)).scalars().first()
+
+    async def acquire(self, job_id: uuid.UUID, owner: uuid.UUID, lease: float, **kwargs) -> bool:
+        """
+        Захватывает задание для выполнения
+
+        Задание, которое выполняется другим запуском, можно захватить
+        только после истечения аренды (нет контрольных точек дольше lease).
+
+        :param job_id: идентификатор задания
+        :param owner: идентификатор запуска
+        :param lease: время аренды (сек)
+        :param kwargs: дополнительно изменяемые поля
+        :return: True, если задание захвачено
+        """
+        result = await self._session.execute(
+            update(self.table)
+            .where(
+                self.table.id == job_id,
+                self.table.state != ReindexState.DONE,
+                or_(
+                    self.table.state != ReindexState.RUNNING,
+                    self.table.heartbeat_at.is_(None),
+                    self.table.heartbeat_at < func.now() - timedelta(seconds=lease)
+                )
+            )
+            .values(state=ReindexState.RUNNING, owner=owner, error=None, heartbeat_at=func.now(), **kwargs)
+        )
+        return result.rowcount == 1
+
+    async def checkpoint(self, job_id: uuid.UUID, owner: uuid.UUID, **kwargs) -> bool:
+        """
+        Сохраняет прогресс задания
+
+        :return: False, если задание приостановлено или захвачено другим запуском
+        """
+        result = await self._session.execute(
+            update(self.table)
+            .where(self.table.id == job_id, self.table.owner == owner, self.table.state == ReindexState.RUNNING)
+            .values(heartbeat_at=func.now(), **kwargs)
+        )
+        return result.rowcount == 1
+
+    async def pause(self, job_id: uuid.UUID) -> bool:
+        result = await self._session.execute(
+            update(self.table)
+            .where(self.table.id == job_id, self.table.state == ReindexState.RUNNING)
+            .values(state=ReindexState.PAUSED, rate=None)
+        )
+        return result.rowcount == 1
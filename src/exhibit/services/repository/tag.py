@@ -1,6 +1,36 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
 from exhibit.models import tables
 from exhibit.services.repository.base import BaseRepository
 
 
 class TagRepo(BaseRepository[tables.Tag]):
     table = tables.Tag
+
+    async def upsert_many(self, titles: list[str]) -> list[tables.Tag]:
+        """
+        Возвращает теги по названиям, создавая отсутствующие
+
+        Выполняется за два запроса независимо от количества тегов:
+        INSERT ... ON CONFLICT DO NOTHING RETURNING для новых тегов
+        и выборка уже существующих (опирается на uq_tags_title)
+
+        :param titles: названия тегов
+        :return: теги в порядке titles (без повторов)
+        """
+        titles = list(dict.fromkeys(titles))
+        if not titles:
+            return []
+
+        query = insert(self.table).values([{"title": title} for title in titles]).on_conflict_do_nothing(
+            index_elements=[self.table.title]
+        ).returning(self.table)
+        tags = {tag.title: tag for tag in (await self._session.scalars(query)).all()}
+
+        existing_titles = [title for title in titles if title not in tags]
+        if existing_titles:
+            query = select(self.table).where(self.table.title.in_(existing_titles))
+            tags.update({tag.title: tag for tag in (await self._session.scalars(query)).all()})
+
+        return [tags[title] for title in titles]
@@ -0,0 +1,100 @@
+import inspect
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+
+
+class UnitOfWork:
+    """
+    Граница транзакции одного запроса
+
+    Репозитории только добавляют изменения в сессию (flush при необходимости),
+    а фиксация выполняется один раз в конце запроса (см. dependencies.get_repos).
+    Для частичного отката внутри запроса используется savepoint.
+
+    """
+
+    # Счетчики по всем единицам работы процесса
+    _units = 0
+    _commits = 0
+    _rollbacks = 0
+    _savepoints = 0
+    _commits_per_unit: dict[int, int] = dict()
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        self._unit_commits = 0
+        self._on_commit: list[Callable[[], None | Awaitable[None]]] = []
+        UnitOfWork._units += 1
+
+    async def commit(self) -> None:
+        """
+        Фиксирует транзакцию, если она была начата
+
+        """
+        if not self._session.in_transaction():
+            return
+        await self._session.commit()
+        self._unit_commits += 1
+        UnitOfWork._commits += 1
+
+        callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+
+    def on_commit(self, callback: Callable[[], None | Awaitable[None]]) -> None:
+        """
+        Регистрирует функцию, вызываемую после успешной фиксации транзакции
+        (при откате не вызывается, корутина ожидается)
+
+        """
+        self._on_commit.append(callback)
+
+    async def rollback(self) -> None:
+        if not self._session.in_transaction():
+            return
+        await self._session.rollback()
+        self._on_commit.clear()
+        UnitOfWork._rollbacks += 1
+
+    async def flush(self) -> None:
+        """
+        Отправляет накопленные изменения в БД без фиксации
+        (для получения сгенерированных значений и проверки ограничений)
+
+        """
+        await self._session.flush()
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[AsyncSessionTransaction]:
+        """
+        Вложенная транзакция (SAVEPOINT)
+
+        При исключении внутри блока откатываются только его изменения,
+        исключение пробрасывается дальше.
+
+        """
+        UnitOfWork._savepoints += 1
+        async with self._session.begin_nested() as transaction:
+            yield transaction
+
+    def close(self) -> None:
+        commits = self._unit_commits
+        UnitOfWork._commits_per_unit[commits] = UnitOfWork._commits_per_unit.get(commits, 0) + 1
+
+    @property
+    def session(self) -> AsyncSession:
+        return self._session
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "units": cls._units,
+            "commits": cls._commits,
+            "rollbacks": cls._rollbacks,
+            "savepoints": cls._savepoints,
+            "commits_per_unit": dict(sorted(cls._commits_per_unit.items())),
+        }
@@ -0,0 +1,736 @@
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable, Iterable
+
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection, async_sessionmaker
+
+from exhibit.models.tables import SharedStateNamespace, SharedStateItem
+from exhibit.utils.cache import TTLCache
+
+
+class SharedStateFull(ValueError):
+    """
+    Содержимое не помещается в хранилище (изменение не применено)
+
+    """
+
+
+class SharedState(ABC):
+    """
+    Словарь, общий для всех процессов сервиса
+
+    Чтение (get) всегда выполняется из локальной копии процесса и не требует
+    ввода-вывода, запись (update/replace) сохраняется в общее хранилище и сразу
+    применяется к локальной копии. Значения должны сериализоваться в JSON.
+
+    Запись от имени одного процесса (например, синхронизация с UMS) выполняет
+    лидер - процесс, получивший блокировку через try_lead.
+
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._data: dict[str, Any] = dict()
+        self._version = 0
+        self._leader = False
+
+        # Счетчики
+        self._writes = 0
+        self._reloads = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self) -> Iterable[tuple[str, Any]]:
+        return self._data.items()
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.update({key: value})
+
+    async def delete(self, key: str) -> None:
+        await self.update(deleted=[key])
+
+    @abstractmethod
+    async def update(self, values: dict[str, Any] = None, deleted: Iterable[str] = ()) -> None:
+        """
+        Атомарно изменяет записи
+
+        :param values: новые значения
+        :param deleted: удаляемые ключи
+        """
+
+    @abstractmethod
+    async def replace(self, values: dict[str, Any]) -> None:
+        """
+        Атомарно заменяет содержимое целиком
+
+        """
+
+    @abstractmethod
+    async def compare_and_set(self, key: str, expected: Any, value: Any) -> bool:
+        """
+        Атомарно записывает значение, если текущее значение ключа равно ожидаемому
+
+        :param key: ключ
+        :param expected: ожидаемое значение (None - ключ отсутствует)
+        :param value: новое значение
+        :return: False, если значение изменено другим писателем
+        """
+
+    async def try_lead(self) -> bool:
+        """
+        Пытается стать лидером (единственным писателем) для пространства
+
+        """
+        self._leader = True
+        return True
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.__class__.__name__,
+            "version": self._version,
+            "size": len(self._data),
+            "leader": self._leader,
+            "writes": self._writes,
+            "reloads": self._reloads,
+        }
+
+
+class LocalSharedState(SharedState):
+    """
+    Состояние в памяти процесса (один worker)
+
+    """
+
+    async def update(self, values: dict[str, Any] = None, deleted: Iterable[str] = ()) -> None:
+        for key in deleted:
+            self._data.pop(key, None)
+        self._data.update(values or dict())
+        self._version += 1
+        self._writes += 1
+
+    async def replace(self, values: dict[str, Any]) -> None:
+        self._data = dict(values)
+        self._version += 1
+        self._writes += 1
+
+    async def compare_and_set(self, key: str, expected: Any, value: Any) -> bool:
+        if self._data.get(key) != expected:
+            return False
+        await self.update({key: value})
+        return True
+
+
+class MmapSharedState(SharedState):
+    """
+    Состояние в разделяемой памяти (несколько worker'ов на одном хосте)
+
+    Сегмент - файл (по умолчанию в /dev/shm) вида [seq: u64][compacted: u64][length: u32][журнал],
+    журнал - JSON записи изменений по строке на запись. Запись (update) дописывает
+    в журнал только изменение, при переполнении сегмента (и в replace) журнал
+    сжимается до одного снимка; compacted - seq последнего сжатия.
+
+    Писатели сериализуются через flock (вне event loop), seq нечетный во время
+    записи (seqlock), поэтому читатели не берут блокировку: get сравнивает seq
+    с локальной копией и применяет только новые записи журнала.
+
+    После сжатия журналу должно оставаться не меньше log_reserve сегмента, иначе
+    изменение, добавляющее значения, отклоняется с SharedStateFull (удаление
+    проходит всегда) - так сжатие выполняется не чаще, чем раз на log_reserve
+    сегмента записей. Запись и сжатие выполняются вне event loop.
+
+    Если seq остается нечетным дольше read_spins попыток, читатель проверяет
+    блокировку: свободная блокировка означает, что писатель завершился во время
+    записи, и сегмент восстанавливается (незавершенная запись журнала отбрасывается,
+    прерванное сжатие повторяется из локальной копии). Пока блокировка занята,
+    get возвращает последнюю прочитанную копию.
+
+    """
+    _header = struct.Struct("<QQI")
+    read_spins = 100
+    log_reserve = 0.25
+
+    def __init__(self, name: str, directory: str = "/dev/shm", size: int = 16 * 1024 * 1024):
+        super().__init__(name)
+        self._path = os.path.join(directory, f"exhibit-{name}.log")
+        self._size = size
+        self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._offset = 0
+        self._lock = asyncio.Lock()
+        self._leader_fd: int | None = None
+
+        # Счетчики
+        self._compactions = 0
+        self._stale_reads = 0
+        self._recoveries = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self._seq() != self._version:
+            self._reload()
+        return self._data.get(key, default)
+
+    def __len__(self) -> int:
+        if self._seq() != self._version:
+            self._reload()
+        return len(self._data)
+
+    def items(self) -> Iterable[tuple[str, Any]]:
+        if self._seq() != self._version:
+            self._reload()
+        return self._data.items()
+
+    def _seq(self) -> int:
+        return self._header.unpack_from(self._mmap, 0)[0]
+
+    def _reload(self) -> None:
+        for _ in range(self.read_spins):
+            if self._read():
+                return
+            time.sleep(0)
+
+        if self._recover():
+            self._read()
+        else:
+            self._stale_reads += 1
+
+    def _read(self) -> bool:
+        """
+        Применяет к локальной копии новые записи журнала
+
+        :return: False, если сегмент изменяется
+        """
+        seq, compacted, length = self._header.unpack_from(self._mmap, 0)
+        if seq % 2:
+            return False
+        offset = 0 if compacted > self._version else self._offset
+        payload = self._mmap[self._header.size + offset:self._header.size + length]
+        if self._seq() != seq:
+            return False
+
+        self._data = self._apply(dict() if offset == 0 else dict(self._data), payload)
+        self._version = seq
+        self._offset = length
+        self._reloads += 1
+        return True
+
+    @staticmethod
+    def _apply(data: dict[str, Any], payload: bytes) -> dict[str, Any]:
+        for line in payload.splitlines():
+            record = json.loads(line)
+            if "replace" in record:
+                data = record["replace"]
+                continue
+            for key in record.get("deleted", ()):
+                data.pop(key, None)
+            data.update(record.get("values", dict()))
+        return data
+
+    def _recover(self) -> bool:
+        """
+        Восстанавливает сегмент после писателя, завершившегося во время записи
+
+        Блокировка берется через отдельный дескриптор, чтобы не совпасть
+        с блокировкой писателя этого же процесса.
+
+        :return: False, если писатель еще работает
+        """
+        fd = os.open(self._path, os.O_RDWR)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            self._repair()
+            return True
+        finally:
+            os.close(fd)
+
+    def _repair(self) -> None:
+        """
+        Завершает прерванную запись (под блокировкой писателей)
+
+        """
+        seq, compacted, length = self._header.unpack_from(self._mmap, 0)
+        if not seq % 2:
+            return
+
+        if compacted == seq:
+            # Прерванное сжатие испортило журнал: снимок из локальной копии
+            logging.error(f"[SharedState:{self.name}] Writer died during compaction, restoring local copy")
+            self._compact(seq - 1, self._data)
+        else:
+            # Прерванная запись не видна читателям: журнал остается прежним
+            logging.error(f"[SharedState:{self.name}] Writer died during write, discarding it")
+            self._header.pack_into(self._mmap, 0, seq + 1, compacted, length)
+        self._recoveries += 1
+
+    def _append(self, record: dict[str, Any], data: dict[str, Any]) -> None:
+        """
+        Дописывает запись в журнал (под блокировкой писателей)
+
+        :param record: запись изменения
+        :param data: содержимое после изменения (для сжатия при переполнении)
+        """
+        seq, compacted, length = self._header.unpack_from(self._mmap, 0)
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        start = self._header.size + length
+        if "replace" in record or start + len(line) > self._size:
+            self._compact(seq, data, reserve=bool(record.get("replace") or record.get("values")))
+            return
+
+        self._header.pack_into(self._mmap, 0, seq + 1, compacted, length)
+        self._mmap[start:start + len(line)] = line
+        self._header.pack_into(self._mmap, 0, seq + 2, compacted, length + len(line))
+
+        self._data = data
+        self._version = seq + 2
+        self._offset = length + len(line)
+        self._writes += 1
+
+    def _compact(self, seq: int, data: dict[str, Any], reserve: bool = False) -> None:
+        """
+        Сжимает журнал до снимка data (под блокировкой писателей)
+
+        :param reserve: оставить журналу log_reserve сегмента
+        :raise SharedStateFull: снимок не помещается
+        """
+        line = json.dumps({"replace": data}, separators=(",", ":")).encode() + b"\n"
+        limit = self._size - int(self._size * self.log_reserve) if reserve else self._size
+        if self._header.size + len(line) > limit:
+            raise SharedStateFull(f"Shared state {self.name} exceeds {limit} bytes of segment")
+
+        # compacted == seq (нечетный) отмечает незавершенное сжатие
+        self._header.pack_into(self._mmap, 0, seq + 1, seq + 1, 0)
+        self._mmap[self._header.size:self._header.size + len(line)] = line
+        self._header.pack_into(self._mmap, 0, seq + 1, seq + 2, len(line))
+        self._header.pack_into(self._mmap, 0, seq + 2, seq + 2, len(line))
+
+        self._data = data
+        self._version = seq + 2
+        self._offset = len(line)
+        self._writes += 1
+        self._compactions += 1
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[None]:
+        """
+        Блокировка писателей; внутри локальная копия соответствует сегменту
+
+        """
+        # flock действует на весь процесс, поэтому писатели процесса дополнительно сериализуются asyncio.Lock
+        async with self._lock:
+            await asyncio.to_thread(fcntl.flock, self._fd, fcntl.LOCK_EX)
+            try:
+                self._repair()
+                if self._seq() != self._version:
+                    self._read()
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _change(self, values: dict[str, Any], deleted: list[str]) -> None:
+        data = dict(self._data)
+        for key in deleted:
+            data.pop(key, None)
+        data.update(values)
+        self._append({"values": values, "deleted": deleted}, data)
+
+    async def update(self, values: dict[str, Any] = None, deleted: Iterable[str] = ()) -> None:
+        async with self._locked():
+            await asyncio.to_thread(self._change, values or dict(), list(deleted))
+
+    async def replace(self, values: dict[str, Any]) -> None:
+        async with self._locked():
+            await asyncio.to_thread(self._append, {"replace": dict(values)}, dict(values))
+
+    async def compare_and_set(self, key: str, expected: Any, value: Any) -> bool:
+        async with self._locked():
+            if self._data.get(key) != expected:
+                return False
+            await asyncio.to_thread(self._change, {key: value}, [])
+            return True
+
+    async def try_lead(self) -> bool:
+        if self._leader:
+            return True
+        fd = os.open(f"{self._path}.leader", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        self._leader = True
+        return True
+
+    async def stop(self) -> None:
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)
+            self._leader_fd = None
+            self._leader = False
+        self._mmap.close()
+        os.close(self._fd)
+
+    def stats(self) -> dict:
+        return super().stats() | {
+            "log_bytes": self._offset,
+            "compactions": self._compactions,
+            "stale_reads": self._stale_reads,
+            "recoveries": self._recoveries,
+        }
+
+
+class PostgresSharedState(SharedState):
+    """
+    Состояние в таблице Postgres (несколько хостов)
+
+    Каждая запись хранит версию пространства, в которой она изменена,
+    поэтому фоновое обновление локальной копии читает только изменения
+    после последней известной версии (по индексу namespace, version).
+    Удаленные записи хранятся как NULL и вычищаются через tombstone_ttl;
+    читатель, отставший дольше, перечитывает пространство целиком.
+
+    """
+
+    def __init__(
+            self,
+            name: str,
+            session_maker: async_sessionmaker[AsyncSession],
+            refresh_interval: float = 0.5,
+            tombstone_ttl: float = 300
+    ):
+        super().__init__(name)
+        self._session_maker = session_maker
+        self._refresh_interval = refresh_interval
+        self._tombstone_ttl = tombstone_ttl
+        self._task: asyncio.Task | None = None
+        self._leader_connection: AsyncConnection | None = None
+        self._failed_refreshes = 0
+
+    async def start(self) -> None:
+        async with self._session_maker() as session:
+            await session.execute(
+                insert(SharedStateNamespace).values(name=self.name).on_conflict_do_nothing()
+            )
+            await session.commit()
+        await self.refresh()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._drop_lead()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self._failed_refreshes += 1
+                logging.error(f"[SharedState:{self.name}] Refresh failed: {e}")
+
+    async def refresh(self) -> None:
+        """
+        Применяет к локальной копии изменения других процессов
+
+        """
+        async with self._session_maker() as session:
+            version, horizon = (await session.execute(
+                select(SharedStateNamespace.version, SharedStateNamespace.horizon)
+                .where(SharedStateNamespace.name == self.name)
+            )).one()
+            if version == self._version:
+                return
+
+            query = select(SharedStateItem.key, SharedStateItem.value).where(
+                SharedStateItem.namespace == self.name,
+                SharedStateItem.version <= version
+            )
+            if self._version < horizon:
+                rows = (await session.execute(query.where(SharedStateItem.value.is_not(None)))).all()
+                data = {key: value for key, value in rows}
+            else:
+                rows = (await session.execute(query.where(SharedStateItem.version > self._version))).all()
+                data = dict(self._data)
+                for key, value in rows:
+                    if value is None:
+                        data.pop(key, None)
+                    else:
+                        data[key] = value
+
+        self._data = data
+        self._version = version
+        self._reloads += 1
+
+    async def _bump(self, session: AsyncSession, replace: bool = False) -> int:
+        values = {"version": SharedStateNamespace.version + 1}
+        if replace:
+            values["horizon"] = SharedStateNamespace.version + 1
+        return (await session.execute(
+            update(SharedStateNamespace)
+            .where(SharedStateNamespace.name == self.name)
+            .values(**values)
+            .returning(SharedStateNamespace.version)
+        )).scalar_one()
+
+    async def update(self, values: dict[str, Any] = None, deleted: Iterable[str] = ()) -> None:
+        values = values or dict()
+        deleted = [key for key in deleted if key not in values]
+        if not values and not deleted:
+            return
+
+        async with self._session_maker() as session:
+            # Блокировка строки пространства сериализует писателей
+            version = await self._bump(session)
+            await self._upsert(session, version, values, deleted)
+            await session.commit()
+
+        self._apply_local(version, values, deleted)
+
+    async def compare_and_set(self, key: str, expected: Any, value: Any) -> bool:
+        async with self._session_maker() as session:
+            version = await self._bump(session)
+            current = (await session.execute(
+                select(SharedStateItem.value)
+                .where(SharedStateItem.namespace == self.name, SharedStateItem.key == key)
+            )).scalar()
+            if current != expected:
+                await session.rollback()
+                # Локальная копия отстала от писателя, изменившего значение
+                await self.refresh()
+                return False
+            await self._upsert(session, version, {key: value}, [])
+            await session.commit()
+
+        self._apply_local(version, {key: value}, [])
+        return True
+
+    async def _upsert(self, session: AsyncSession, version: int, values: dict[str, Any], deleted: list[str]) -> None:
+        rows = [{"namespace": self.name, "key": key, "value": value, "version": version}
+                for key, value in values.items()]
+        rows += [{"namespace": self.name, "key": key, "value": None, "version": version} for key in deleted]
+        query = insert(SharedStateItem).values(rows)
+        await session.execute(query.on_conflict_do_update(
+            index_elements=[SharedStateItem.namespace, SharedStateItem.key],
+            set_={"value": query.excluded.value, "version": query.excluded.version, "updated_at": func.now()}
+        ))
+        if version % 100 == 0:
+            await self._purge_tombstones(session)
+
+    def _apply_local(self, version: int, values: dict[str, Any], deleted: list[str]) -> None:
+        # Применение к локальной копии, если она не отстала
+        if self._version == version - 1:
+            data = dict(self._data)
+            for key in deleted:
+                data.pop(key, None)
+            data.update(values)
+            self._data = data
+            self._version = version
+        self._writes += 1
+
+    async def _purge_tombstones(self, session: AsyncSession) -> None:
+        purged = (await session.execute(
+            delete(SharedStateItem)
+            .where(
+                SharedStateItem.namespace == self.name,
+                SharedStateItem.value.is_(None),
+                SharedStateItem.updated_at < func.now() - text(f"interval '{int(self._tombstone_ttl)} seconds'")
+            )
+            .returning(SharedStateItem.version)
+        )).scalars().all()
+        if purged:
+            await session.execute(
+                update(SharedStateNamespace)
+                .where(SharedStateNamespace.name == self.name)
+                .values(horizon=func.greatest(SharedStateNamespace.horizon, max(purged)))
+            )
+
+    async def replace(self, values: dict[str, Any]) -> None:
+        async with self._session_maker() as session:
+            version = await self._bump(session, replace=True)
+            await session.execute(delete(SharedStateItem).where(SharedStateItem.namespace == self.name))
+            if values:
+                await session.execute(insert(SharedStateItem).values([
+                    {"namespace": self.name, "key": key, "value": value, "version": version}
+                    for key, value in values.items()
+                ]))
+            await session.commit()
+
+        self._data = dict(values)
+        self._version = version
+        self._writes += 1
+
+    async def try_lead(self) -> bool:
+        """
+        Лидерство удерживается advisory-блокировкой на отдельном соединении
+
+        Вызывается на каждом цикле лидера: если соединение разорвано
+        (и блокировка снята сервером), лидерство сбрасывается и захватывается заново.
+
+        """
+        if self._leader:
+            try:
+                await self._leader_connection.execute(select(1))
+                await self._leader_connection.commit()
+                return True
+            except Exception as e:
+                logging.warning(f"[SharedState:{self.name}] Leader connection lost: {e}")
+                await self._drop_lead()
+
+        connection = await self._session_maker.kw["bind"].connect()
+        locked = (await connection.execute(
+            select(func.pg_try_advisory_lock(func.hashtext(f"shared_state:{self.name}")))
+        )).scalar()
+        await connection.commit()
+        if not locked:
+            await connection.close()
+            return False
+        self._leader_connection = connection
+        self._leader = True
+        return True
+
+    async def _drop_lead(self) -> None:
+        if self._leader_connection is not None:
+            try:
+                await self._leader_connection.close()
+            except Exception as e:
+                logging.warning(f"[SharedState:{self.name}] Cannot close leader connection: {e}")
+            self._leader_connection = None
+        self._leader = False
+
+    def stats(self) -> dict:
+        return super().stats() | {"failed_refreshes": self._failed_refreshes}
+
+
+class SharedTTLCache(TTLCache):
+    """
+    Кэш процесса с инвалидацией во всех процессах
+
+    invalidate записывает в общее состояние новую отметку ключа, а запись
+    кэша хранит отметку, действовавшую при ее сохранении: get отбрасывает
+    запись, если отметка изменилась. Отметка читается из локальной копии
+    общего состояния, поэтому get не выполняет ввода-вывода. Отметки старше
+    времени жизни кэша не нужны (записи до них уже истекли) и удаляются
+    не чаще раза за ttl.
+
+    """
+
+    def __init__(self, state: SharedState, maxsize: int, ttl: float):
+        """
+        :param state: общее состояние для отметок инвалидации
+        :param maxsize: максимальное количество записей
+        :param ttl: время жизни записи (сек)
+        """
+        super().__init__(maxsize, ttl)
+        self._state = state
+        self._cleaned_at = time.time()
+
+        # Счетчики
+        self._invalidations = 0
+        self._stale = 0
+        self._failed_invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = super().get(key)
+        if item is None:
+            return default
+
+        value, stamp = item
+        if self._state.get(str(key)) != stamp:
+            super().pop(key)
+            self._stale += 1
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float = None) -> None:
+        super().set(key, (value, self._state.get(str(key))), expires_at)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = super().pop(key)
+        return default if item is None else item[0]
+
+    async def invalidate(self, key: Hashable) -> None:
+        """
+        Удаляет запись во всех процессах
+
+        Ошибка записи в общее состояние не пробрасывается: запись
+        в других процессах истечет через ttl.
+
+        """
+        self.pop(key)
+        now = time.time()
+        deleted = []
+        if now - self._cleaned_at > self.ttl:
+            self._cleaned_at = now
+            deleted = [name for name, stamp in self._state.items() if stamp["at"] + self.ttl < now]
+
+        try:
+            await self._state.update({str(key): {"id": uuid.uuid4().hex, "at": now}}, deleted=deleted)
+            self._invalidations += 1
+        except Exception as e:
+            self._failed_invalidations += 1
+            logging.error(f"[SharedTTLCache:{self._state.name}] Invalidation of {key} failed: {e}")
+
+    async def stop(self) -> None:
+        await self._state.stop()
+
+    def stats(self) -> dict:
+        return super().stats() | {
+            "invalidations": self._invalidations,
+            "stale": self._stale,
+            "failed_invalidations": self._failed_invalidations,
+            "state": self._state.stats(),
+        }
+
+
+def create_shared_state(
+        name: str,
+        backend: str,
+        session_maker: async_sessionmaker[AsyncSession] = None,
+        mmap_directory: str = "/dev/shm",
+        mmap_size: int = 16 * 1024 * 1024,
+        refresh_interval: float = 0.5
+) -> SharedState:
+    """
+    :param name: имя пространства
+    :param backend: local | mmap | postgres
+    """
+    if backend == "local":
+        return LocalSharedState(name)
+    if backend == "mmap":
+        return MmapSharedState(name, directory=mmap_directory, size=mmap_size)
+    if backend == "postgres":
+        return PostgresSharedState(name, session_maker, refresh_interval=refresh_interval)
+    raise ValueError(f"Unknown shared state backend: {backend}")
@@ -1,10 +1,22 @@
 import os
+from typing import Callable
+
+from exhibit.models.auth import BaseUser
+from exhibit.models.permission import Permission
+from exhibit.services.auth.filters import permission_filter
 
 
 class StatsApplicationService:
 
-    def __init__(self, config):
+    def __init__(self, current_user: BaseUser, config, metrics: dict[str, Callable[[], dict]]):
+        """
+        :param current_user: текущий пользователь
+        :param config: конфигурация приложения
+        :param metrics: реестр метрик (имя -> функция stats компонента)
+        """
+        self._current_user = current_user
         self._config = config
+        self._metrics = metrics
 
     async def get_stats(self, details: bool = False) -> dict:
         info = {
@@ -19,3 +31,7 @@ class StatsApplicationService:
                 }
             )
         return info
+
+    @permission_filter(Permission.GET_METRICS)
+    async def get_metrics(self) -> dict:
+        return {name: stats() for name, stats in self._metrics.items()}
@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from exhibit.services.shared_state import SharedState, SharedStateFull
+from exhibit.utils.cache import TTLCache
+
+
+class TaskStore:
+    """
+    Хранилище задач поиска по изображению
+
+    Поверх общего состояния (SharedState) добавляет время жизни записей,
+    ограничение количества (вытесняются давно не обновлявшиеся записи)
+    и таймаут выполнения: задача, находящаяся в in_process дольше
+    in_process_timeout, считается проваленной.
+
+    Запись: {status: in_process | done | failed, classif, result, error, created_at, updated_at}.
+    Подготовленный для ответа результат (hydrated) хранится в кэше процесса,
+    а не в общем состоянии, чтобы не увеличивать записи.
+    Записям без created_at/updated_at (сохраненным до их появления) время
+    проставляет очистка, до этого они считаются свежими.
+
+    Очистку выполняет только лидер общего состояния. При заполнении create
+    вытесняет сразу evict_batch записей, чтобы не выбирать старейшие на каждом вызове.
+    Если запись не помещается в общее состояние (SharedStateFull), вытесняется
+    та же доля текущих записей (удваиваясь с каждой попыткой) и запись
+    повторяется; complete при неудаче только логирует ошибку - задача
+    завершится по таймауту.
+
+    """
+
+    def __init__(
+            self,
+            state: SharedState,
+            ttl: float = 3600,
+            max_entries: int = 10000,
+            in_process_timeout: float = 300,
+            sweep_interval: float = 60,
+            recheck_interval: float = 0.5,
+            evict_batch: float = 0.1,
+            hydrated_size: int = 1024,
+            hydrated_ttl: float = 60
+    ):
+        """
+        :param state: общее состояние для хранения задач
+        :param ttl: время жизни задачи с момента последнего изменения (сек)
+        :param max_entries: максимальное количество задач
+        :param in_process_timeout: максимальное время выполнения задачи (сек)
+        :param sweep_interval: интервал очистки (сек)
+        :param recheck_interval: интервал проверки ожидаемой задачи, завершенной другим процессом (сек)
+        :param evict_batch: доля max_entries, вытесняемая при заполнении
+        :param hydrated_size: размер кэша подготовленных результатов процесса
+        :param hydrated_ttl: время жизни подготовленного результата (сек)
+        """
+        self._state = state
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._in_process_timeout = in_process_timeout
+        self._sweep_interval = sweep_interval
+        self._recheck_interval = recheck_interval
+        self._evict_share = evict_batch
+        self._evict_batch = max(1, int(max_entries * evict_batch))
+        self._task: asyncio.Task | None = None
+        self._waiters: dict[str, set[asyncio.Event]] = dict()
+        self._hydrated = TTLCache(maxsize=hydrated_size, ttl=hydrated_ttl)
+
+        # Счетчики
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._timeouts = 0
+        self._overflows = 0
+        self._lost = 0
+
+    def _is_expired(self, task: dict[str, Any], now: float) -> bool:
+        return task.get("updated_at", now) + self._ttl <= now
+
+    def _is_timed_out(self, task: dict[str, Any], now: float) -> bool:
+        return (
+            task["status"] == "in_process" and
+            task.get("created_at", task.get("updated_at", now)) + self._in_process_timeout <= now
+        )
+
+    def get(self, task_id: str) -> dict[str, Any] | None:
+        task = self._state.get(task_id)
+        now = time.time()
+        if task is None or self._is_expired(task, now):
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        if self._is_timed_out(task, now):
+            return task | {"status": "failed", "error": "timeout"}
+        return task
+
+    async def create(self, task_id: str, attempts: int = 3) -> bool:
+        """
+        Создает задачу в статусе in_process
+
+        Запись выполняется через compare_and_set, поэтому из одновременных
+        запросов одной задачи создает ее только один.
+
+        :return: False, если задача уже выполняется или выполнена
+        """
+        for _ in range(attempts):
+            current = self._state.get(task_id)
+            task = self.get(task_id)
+            if task is not None and task["status"] != "failed":
+                return False
+
+            if len(self._state) >= self._max_entries:
+                await self._evict(len(self._state) - self._max_entries + self._evict_batch)
+
+            now = time.time()
+            if await self._with_room(lambda: self._state.compare_and_set(task_id, current, dict(
+                status="in_process",
+                classif="",
+                result=[],
+                error=None,
+                created_at=now,
+                updated_at=now
+            ))):
+                self._hydrated.pop(task_id)
+                return True
+        return False
+
+    async def complete(self, task_id: str, classif: str, result: list[str]) -> None:
+        task = self._state.get(task_id)
+        now = time.time()
+        try:
+            await self._with_room(lambda: self._state.set(task_id, dict(
+                status="done",
+                classif=classif,
+                result=result,
+                error=None,
+                created_at=task.get("created_at", now) if task else now,
+                updated_at=now
+            )))
+        except SharedStateFull as e:
+            self._lost += 1
+            logging.error(f"[TaskStore] Result of task {task_id} is lost: {e}")
+            return
+        self._notify(task_id)
+
+    async def _with_room(self, write: Callable[[], Awaitable[Any]], attempts: int = 4) -> Any:
+        """
+        Выполняет запись, при переполнении общего состояния вытесняя долю evict_batch
+        текущих записей, удваивая ее с каждой попыткой
+
+        :raise SharedStateFull: не удалось освободить место за attempts попыток
+        """
+        for attempt in range(attempts):
+            try:
+                return await write()
+            except SharedStateFull:
+                self._overflows += 1
+                if attempt == attempts - 1 or not len(self._state):
+                    raise
+                await self._evict(max(1, int(len(self._state) * min(1.0, self._evict_share * 2 ** attempt))))
+
+    def get_hydrated(self, task_id: str) -> Any:
+        return self._hydrated.get(task_id)
+
+    def set_hydrated(self, task_id: str, hydrated: Any) -> None:
+        """
+        Сохраняет в кэше процесса подготовленный для ответа результат выполненной задачи
+
+        :param task_id: идентификатор задачи
+        :param hydrated: результат
+        """
+        self._hydrated.set(task_id, hydrated)
+
+    async def fail(self, task_id: str, error: str) -> None:
+        task = self._state.get(task_id)
+        if task is None:
+            return
+        await self._with_room(lambda: self._state.set(
+            task_id, task | {"status": "failed", "error": error, "updated_at": time.time()}
+        ))
+        self._notify(task_id)
+
+    async def wait(self, task_id: str, timeout: float) -> dict[str, Any] | None:
+        """
+        Ожидает завершения задачи
+
+        Завершение в текущем процессе будит ожидающих сразу, завершение
+        другим процессом (общее состояние) замечается не позже recheck_interval.
+
+        :param task_id: идентификатор задачи
+        :param timeout: максимальное время ожидания (сек)
+        :return: задача (статус in_process, если время ожидания истекло) или None
+        """
+        deadline = time.monotonic() + timeout
+        event = asyncio.Event()
+        self._waiters.setdefault(task_id, set()).add(event)
+        try:
+            while True:
+                task = self.get(task_id)
+                remaining = deadline - time.monotonic()
+                if task is None or task["status"] != "in_process" or remaining <= 0:
+                    return task
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(remaining, self._recheck_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def _notify(self, task_id: str) -> None:
+        for event in self._waiters.get(task_id, ()):
+            event.set()
+
+    async def sweep(self) -> None:
+        """
+        Удаляет истекшие задачи, помечает зависшие проваленными
+        и вытесняет лишние записи
+
+        """
+        now = time.time()
+        expired = []
+        changed = dict()
+        timed_out = []
+        for task_id, task in list(self._state.items()):
+            if self._is_expired(task, now):
+                expired.append(task_id)
+            elif self._is_timed_out(task, now):
+                changed[task_id] = task | {"status": "failed", "error": "timeout", "updated_at": now}
+                timed_out.append(task_id)
+            elif "updated_at" not in task or "created_at" not in task:
+                changed[task_id] = {"created_at": now, "updated_at": now} | task
+
+        if expired or changed:
+            await self._state.update(changed, deleted=expired)
+            self._expired += len(expired)
+            self._timeouts += len(timed_out)
+            for task_id in timed_out:
+                self._notify(task_id)
+
+        if len(self._state) > self._max_entries:
+            await self._evict(len(self._state) - self._max_entries)
+
+    async def _evict(self, count: int) -> None:
+        now = time.time()
+        oldest = heapq.nsmallest(count, self._state.items(), key=lambda item: item[1].get("updated_at", now))
+        await self._state.update(deleted=[task_id for task_id, _ in oldest])
+        self._evictions += len(oldest)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._state.stop()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            try:
+                if await self._state.try_lead():
+                    await self.sweep()
+            except Exception as e:
+                logging.error(f"[TaskStore] Sweep failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._state),
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "evictions": self._evictions,
+            "timeouts": self._timeouts,
+            "overflows": self._overflows,
+            "lost": self._lost,
+            "hydrated": self._hydrated.stats(),
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            "state": self._state.stats(),
+        }
@@ -0,0 +1,440 @@
+import asyncio
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable
+from urllib.parse import unquote_plus
+
+from aio_pika.abc import AbstractIncomingMessage
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit import exceptions
+from exhibit.services.consumer import MalformedMessage
+from exhibit.services.outbox import OutboxRelay
+from exhibit.services.repository import RepoFactory
+from exhibit.services.shared_state import SharedTTLCache
+from exhibit.utils.metrics import Histogram
+from exhibit.utils.s3 import S3Storage
+
+# Ключ advisory-блокировки очистки (выполняется одним процессом)
+SWEEP_LOCK_KEY = 0x5E_F11E5
+
+
+def parse_file_path(path: str) -> tuple[uuid.UUID, uuid.UUID] | None:
+    """
+    Путь файла экспоната "<exhibit_id>/<file_id>"
+
+    :return: (file_id, exhibit_id) или None для остальных объектов
+    """
+    parts = path.split("/")
+    if len(parts) != 2:
+        return None
+    try:
+        return uuid.UUID(parts[1]), uuid.UUID(parts[0])
+    except ValueError:
+        return None
+
+
+class UploadEvents:
+    """
+    Подтверждение загрузки файлов по уведомлениям хранилища
+
+    Уведомления о создании объектов (s3:ObjectCreated:*, формат S3 / MinIO)
+    поступают из очереди RabbitMQ или webhook'а. Файлы накапливаются
+    и подтверждаются пачкой одной транзакцией: is_uploaded, постер экспоната,
+    задание индексации в outbox. Вызов завершается после фиксации пачки,
+    поэтому сообщение очереди подтверждается только после записи в БД.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            file_storage: S3Storage,
+            outbox: OutboxRelay,
+            file_manifest_cache: SharedTTLCache,
+            exhibit_cache: SharedTTLCache,
+            batch_size: int = 100,
+            max_delay: float = 0.2
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param file_storage: хранилище файлов
+        :param outbox: доставка заданий индексации
+        :param file_manifest_cache: кэш списков файлов экспонатов
+        :param exhibit_cache: кэш экспонатов результатов поиска по изображению
+        :param batch_size: размер пачки
+        :param max_delay: максимальное ожидание заполнения пачки (сек)
+        """
+        self._session_maker = session_maker
+        self._file_storage = file_storage
+        self._outbox = outbox
+        self._file_manifest_cache = file_manifest_cache
+        self._exhibit_cache = exhibit_cache
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+
+        self._pending: dict[uuid.UUID, uuid.UUID] = dict()
+        self._waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+        # Метрики
+        self._events = 0
+        self._ignored = 0
+        self._malformed = 0
+        self._confirmed = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._batch_ms = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
+
+    async def handle_message(self, message: AbstractIncomingMessage) -> None:
+        """
+        Обработчик сообщения очереди уведомлений
+
+        :raise MalformedMessage: некорректное сообщение
+        """
+        try:
+            payload = json.loads(message.body)
+        except ValueError as e:
+            raise MalformedMessage(f"Invalid JSON: {e}")
+        await self.ingest(payload)
+
+    async def ingest(self, payload: Any) -> int:
+        """
+        Подтверждает файлы из уведомления
+
+        Некорректные записи пропускаются (учитываются в метриках),
+        остальные записи уведомления обрабатываются.
+
+        :param payload: уведомление ({"Records": [...]})
+        :return: количество файлов уведомления, переданных на подтверждение
+        """
+        if not isinstance(payload, dict) or not isinstance(payload.get("Records"), list):
+            raise MalformedMessage("Records not found in event")
+
+        files = []
+        for record in payload["Records"]:
+            self._events += 1
+            try:
+                event_name = record["eventName"]
+                bucket = record["s3"]["bucket"]["name"]
+                key = unquote_plus(record["s3"]["object"]["key"])
+                if not isinstance(event_name, str) or not isinstance(bucket, str):
+                    raise TypeError("eventName and bucket must be strings")
+            except (KeyError, TypeError) as e:
+                self._malformed += 1
+                logging.warning(f"[UploadEvents] Skipping invalid record: {e}")
+                continue
+
+            path = self._file_storage.path_from_key(bucket, key)
+            file = parse_file_path(path) if path is not None else None
+            if not event_name.startswith(("ObjectCreated:", "s3:ObjectCreated:")) or file is None:
+                self._ignored += 1
+                continue
+            files.append(file)
+
+        if files:
+            await self.submit(files)
+        return len(files)
+
+    async def submit(self, files: list[tuple[uuid.UUID, uuid.UUID]]) -> None:
+        """
+        Добавляет файлы в пачку и ожидает ее фиксации
+
+        :param files: [(file_id, exhibit_id)]
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.update(files)
+        self._waiters.append(future)
+
+        if len(self._pending) >= self._batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_delay, self._schedule_flush)
+        await future
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+
+        files, self._pending = list(self._pending.items()), dict()
+        waiters, self._waiters = self._waiters, []
+        task = asyncio.get_running_loop().create_task(self._flush(files, waiters))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, files: list[tuple[uuid.UUID, uuid.UUID]], waiters: list[asyncio.Future]) -> None:
+        try:
+            await self.confirm(files)
+        except Exception as e:
+            self._failed_batches += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def confirm(self, files: list[tuple[uuid.UUID, uuid.UUID]]) -> list[tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Подтверждает загрузку файлов одной транзакцией
+
+        :param files: [(file_id, exhibit_id)]
+        :return: [(file_id, exhibit_id)] подтвержденных файлов
+        """
+        start = time.monotonic()
+        async with self._session_maker() as session:
+            repos = RepoFactory(session)
+            confirmed = await repos.file.confirm_uploaded(files)
+
+            # Как и при подтверждении клиентом, последний загруженный файл становится постером
+            posters = {exhibit_id: file_id for file_id, exhibit_id in confirmed}
+            for exhibit_id, file_id in posters.items():
+                await repos.exhibit.update(exhibit_id, poster=file_id)
+            for file_id, exhibit_id in confirmed:
+                await repos.outbox.add("img_search", {
+                    "file_id": str(file_id),
+                    "exhibit_id": str(exhibit_id),
+                    "command": "add"
+                })
+                await repos.outbox.add("img_variants", {"file_id": str(file_id), "exhibit_id": str(exhibit_id)})
+            await repos.uow.commit()
+
+        for exhibit_id in posters:
+            await self._file_manifest_cache.invalidate(exhibit_id)
+            await self._exhibit_cache.invalidate(exhibit_id)
+        if confirmed:
+            self._outbox.notify()
+
+        self._confirmed += len(confirmed)
+        self._batches += 1
+        self._batch_ms.observe((time.monotonic() - start) * 1000)
+        return list(confirmed)
+
+    async def stop(self) -> None:
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "events": self._events,
+            "ignored": self._ignored,
+            "malformed": self._malformed,
+            "confirmed": self._confirmed,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "pending": len(self._pending),
+            "batch_ms": self._batch_ms.snapshot(),
+        }
+
+
+class UploadSweeper:
+    """
+    Очистка незавершенных загрузок
+
+    Неподтвержденные файлы старше stale_after: если объект есть в хранилище
+    (уведомление потеряно), файл подтверждается, иначе запись удаляется.
+    Multipart-загрузки без активности дольше multipart_stale_after
+    отменяются в хранилище (загруженные части удаляются).
+    Объекты файлов экспонатов без записи в БД старше stale_after удаляются.
+    Выполняется одним процессом (сессионная advisory-блокировка на отдельном
+    соединении, транзакция которого закрывается сразу после захвата).
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            file_storage: S3Storage,
+            upload_events: UploadEvents,
+            stale_after: float = 2 * 3600,
+            multipart_stale_after: float = 24 * 3600,
+            interval: float = 3600,
+            batch_size: int = 1000,
+            concurrency: int = 16
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param file_storage: хранилище файлов
+        :param upload_events: подтверждение загрузок
+        :param stale_after: возраст незавершенной загрузки (сек), должен превышать срок ссылки на загрузку
+        :param multipart_stale_after: время без активности, после которого multipart-загрузка отменяется (сек)
+        :param interval: интервал очистки (сек)
+        :param batch_size: размер пачки
+        :param concurrency: количество одновременных запросов к хранилищу
+        """
+        self._session_maker = session_maker
+        self._file_storage = file_storage
+        self._upload_events = upload_events
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stale_after = stale_after
+        self._multipart_stale_after = multipart_stale_after
+        self._interval = interval
+        self._batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+        # Метрики
+        self._sweeps = 0
+        self._deleted_rows = 0
+        self._aborted_uploads = 0
+        self._late_confirmed = 0
+        self._deleted_objects = 0
+        self._errors = 0
+        self._last_sweep_at: float | None = None
+
+    async def sweep(self) -> bool:
+        """
+        :return: False, если очистку выполняет другой процесс
+        """
+        # Блокировка сессии соединения не держит открытой транзакции во время очистки
+        async with self._session_maker.kw["bind"].connect() as lock_connection:
+            locked = (await lock_connection.execute(select(func.pg_try_advisory_lock(SWEEP_LOCK_KEY)))).scalar()
+            await lock_connection.commit()
+            if not locked:
+                return False
+
+            try:
+                now = datetime.now(timezone.utc)
+                stale_before = now - timedelta(seconds=self._stale_after)
+                multipart_stale_before = now - timedelta(seconds=self._multipart_stale_after)
+                async with self._session_maker() as session:
+                    await self._sweep_rows(RepoFactory(session), stale_before, multipart_stale_before)
+                    await self._sweep_objects(RepoFactory(session), stale_before)
+            finally:
+                try:
+                    await lock_connection.execute(select(func.pg_advisory_unlock(SWEEP_LOCK_KEY)))
+                    await lock_connection.commit()
+                except Exception as e:
+                    # Соединение не возвращается в пул с блокировкой
+                    logging.warning(f"[UploadSweeper] Unlock failed, dropping connection: {e}")
+                    await lock_connection.invalidate()
+
+        self._sweeps += 1
+        self._last_sweep_at = time.time()
+        return True
+
+    async def _sweep_rows(self, repos: RepoFactory, stale_before: datetime, multipart_stale_before: datetime) -> None:
+        while True:
+            stale = await repos.file.get_unconfirmed_before(stale_before, multipart_stale_before, self._batch_size)
+            await repos.uow.commit()
+            if not stale:
+                return
+
+            exists = await asyncio.gather(*(
+                self._limited(self._file_storage.info(file_path=f"{exhibit_id}/{file_id}"))
+                for file_id, exhibit_id, _ in stale
+            ))
+            uploaded = [(file_id, exhibit_id) for (file_id, exhibit_id, _), info in zip(stale, exists) if info]
+
+            confirmed = set(await self._upload_events.confirm(uploaded)) if uploaded else set()
+            self._late_confirmed += len(confirmed)
+            # Остальные (в том числе загруженные для удаленных экспонатов) удаляются,
+            # их объекты будут удалены как объекты без записи
+            abandoned = [(file_id, exhibit_id, upload_id) for file_id, exhibit_id, upload_id in stale
+                         if (file_id, exhibit_id) not in confirmed]
+            aborted = [(f"{exhibit_id}/{file_id}", upload_id) for file_id, exhibit_id, upload_id in abandoned if upload_id]
+            await asyncio.gather(*(
+                self._limited(self._file_storage.abort_multipart_upload(file_path, upload_id))
+                for file_path, upload_id in aborted
+            ))
+            self._aborted_uploads += len(aborted)
+            self._deleted_rows += await repos.file.delete_unconfirmed([file_id for file_id, _, _ in abandoned])
+            await repos.uow.commit()
+
+            if len(stale) < self._batch_size:
+                return
+
+    async def _limited(self, coroutine: Awaitable[Any]) -> Any:
+        async with self._semaphore:
+            return await coroutine
+
+    async def _sweep_objects(self, repos: RepoFactory, stale_before: datetime) -> None:
+        candidates: dict[uuid.UUID, str] = dict()
+        async for path, last_modified in self._file_storage.list_objects():
+            file = parse_file_path(path)
+            if file is None or last_modified >= stale_before:
+                continue
+            candidates[file[0]] = path
+            if len(candidates) >= self._batch_size:
+                await self._delete_orphans(repos, candidates)
+                candidates = dict()
+        await self._delete_orphans(repos, candidates)
+
+    async def _delete_orphans(self, repos: RepoFactory, candidates: dict[uuid.UUID, str]) -> None:
+        existing = await repos.file.get_existing_ids(list(candidates))
+        await repos.uow.commit()
+        orphans = [path for file_id, path in candidates.items() if file_id not in existing]
+        failed = await self._file_storage.delete_many(orphans)
+        if failed:
+            logging.warning(f"[UploadSweeper] Failed to delete {len(failed)} orphaned objects")
+        self._deleted_objects += len(orphans) - len(failed)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                self._errors += 1
+                logging.error(f"[UploadSweeper] Sweep failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "sweeps": self._sweeps,
+            "deleted_rows": self._deleted_rows,
+            "aborted_uploads": self._aborted_uploads,
+            "late_confirmed": self._late_confirmed,
+            "deleted_objects": self._deleted_objects,
+            "errors": self._errors,
+            "seconds_since_last_sweep": (
+                round(time.time() - self._last_sweep_at, 3) if self._last_sweep_at is not None else None
+            ),
+        }
+
+
+class UploadEventsApplicationService:
+
+    def __init__(self, upload_events: UploadEvents, webhook_token: str | None):
+        self._upload_events = upload_events
+        self._webhook_token = webhook_token
+
+    async def ingest_webhook(self, authorization: str | None, payload: Any) -> None:
+        """
+        Уведомления хранилища через webhook
+
+        :param authorization: заголовок Authorization ("Bearer <token>")
+        :param payload: уведомление
+        """
+        if not self._webhook_token:
+            raise exceptions.NotFound("Прием уведомлений хранилища не настроен")
+
+        expected = f"Bearer {self._webhook_token}"
+        if not authorization or not hmac.compare_digest(authorization.encode(), expected.encode()):
+            raise exceptions.AccessDenied("Неверный токен уведомлений")
+
+        try:
+            await self._upload_events.ingest(payload)
+        except MalformedMessage as e:
+            raise exceptions.BadRequest(str(e))
@@ -0,0 +1,284 @@
+import asyncio
+import io
+import logging
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit.models import schemas
+from exhibit.models.file_type import FileType
+from exhibit.services.outbox import OutboxRelay
+from exhibit.services.repository import FileRepo, RepoFactory
+from exhibit.services.shared_state import SharedTTLCache
+from exhibit.utils.metrics import Histogram
+from exhibit.utils.s3 import S3Storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pillow - необязательная зависимость (extras: images)
+    Image = ImageOps = None
+
+# Растровые изображения, для которых создаются уменьшенные копии
+RASTER_TYPES = frozenset({
+    FileType.PHOTO_JPEG.value,
+    FileType.PHOTO_PNG.value,
+    FileType.PHOTO_GIF.value,
+    FileType.PHOTO_WEBP.value,
+})
+
+
+def variant_path(exhibit_id: uuid.UUID, file_id: uuid.UUID, name: str, format: str) -> str:
+    return f"{exhibit_id}/{file_id}/variants/{name}.{format}"
+
+
+def variant_items(
+        file_storage: S3Storage,
+        exhibit_id: uuid.UUID,
+        file_id: uuid.UUID,
+        variants: list[dict]
+) -> list[schemas.FileVariant]:
+    """
+    Функция для проекции списка копий файла (files.variants) в FileVariant со ссылками
+
+    """
+    return [
+        schemas.FileVariant.model_construct(
+            name=variant["name"],
+            width=variant["width"],
+            height=variant["height"],
+            content_type=f"image/{variant['format']}",
+            url=file_storage.generate_download_public_url(
+                file_path=variant_path(exhibit_id, file_id, variant["name"], variant["format"]),
+                content_type=f"image/{variant['format']}",
+                rcd="inline"
+            )
+        )
+        for variant in variants
+    ]
+
+
+async def set_poster_variants(
+        file_repo: FileRepo,
+        file_storage: S3Storage,
+        exhibits: list[schemas.ExhibitSmall | schemas.Exhibit]
+) -> None:
+    """
+    Функция для заполнения ссылок на уменьшенные копии постеров (одним запросом для всех экспонатов)
+
+    """
+    variants = await file_repo.get_variants([exhibit.poster for exhibit in exhibits if exhibit.poster])
+    for exhibit in exhibits:
+        if exhibit.poster in variants:
+            exhibit.poster_variants = variant_items(file_storage, exhibit.id, exhibit.poster, variants[exhibit.poster])
+
+
+class ImageVariants:
+    """
+    Создание уменьшенных копий загруженных изображений
+
+    Задания записываются в outbox (тема "img_variants") в транзакции
+    подтверждения загрузки и выполняются отдельным relay, чтобы обработка
+    изображений не задерживала остальные темы. Для каждого файла создаются
+    квадратная миниатюра и копии заданной ширины (без увеличения) в WebP и,
+    если pillow собран с поддержкой, AVIF. Копии сохраняются рядом с файлом
+    ("<exhibit_id>/<file_id>/variants/<name>.<format>"), их список - в files.variants.
+
+    Без pillow обработка не запускается, задания остаются в outbox до его установки.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            file_storage: S3Storage,
+            file_manifest_cache: SharedTTLCache,
+            exhibit_cache: SharedTTLCache,
+            widths: tuple[int, ...] = (320, 640, 1280),
+            thumbnail_size: int = 256,
+            quality: int = 80,
+            max_source_size: int = 64 * 1024 * 1024,
+            max_pixels: int = 40_000_000,
+            concurrency: int = 4,
+            batch_size: int = 8,
+            poll_interval: float = 2.0
+    ):
+        """
+        :param session_maker: фабрика сессий БД
+        :param file_storage: хранилище файлов
+        :param file_manifest_cache: кэш списков файлов экспонатов
+        :param exhibit_cache: кэш экспонатов результатов поиска по изображению (ссылки на копии постера)
+        :param widths: ширины копий (пикселей)
+        :param thumbnail_size: сторона квадратной миниатюры (пикселей)
+        :param quality: качество сжатия
+        :param max_source_size: максимальный размер исходного файла (байт), большие файлы пропускаются
+        :param max_pixels: максимальное количество пикселей декодируемого изображения, большие пропускаются
+        :param concurrency: количество одновременно обрабатываемых файлов
+        :param batch_size: размер пачки заданий
+        :param poll_interval: интервал проверки заданий (сек)
+        """
+        self._session_maker = session_maker
+        self._file_storage = file_storage
+        self._file_manifest_cache = file_manifest_cache
+        self._exhibit_cache = exhibit_cache
+        self._widths = tuple(sorted(widths))
+        self._thumbnail_size = thumbnail_size
+        self._quality = quality
+        self._max_source_size = max_source_size
+        self._max_pixels = max_pixels
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._relay = OutboxRelay(
+            session_maker,
+            handlers={"img_variants": self.handle},
+            batch_size=batch_size,
+            poll_interval=poll_interval
+        )
+
+        self._formats = []
+        if Image is not None:
+            Image.init()
+            self._formats = [format for format in ("webp", "avif") if format.upper() in Image.SAVE]
+
+        # Метрики
+        self._processed = 0
+        self._skipped = 0
+        self._failed = 0
+        self._variants = 0
+        self._render_ms = Histogram((10, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._formats)
+
+    def start(self) -> None:
+        if not self.enabled:
+            logging.warning("[ImageVariants] Pillow with WebP support is not installed, image variants are disabled")
+            return
+        self._relay.start()
+
+    async def stop(self) -> None:
+        await self._relay.stop()
+
+    async def handle(self, payloads: list[dict[str, Any]]) -> None:
+        """
+        Обработчик outbox: ошибка любого файла повторяет пачку (готовые файлы пропускаются)
+
+        """
+        files = {
+            uuid.UUID(payload["file_id"]): uuid.UUID(payload["exhibit_id"])
+            for payload in payloads
+        }
+        results = await asyncio.gather(
+            *(self.process(exhibit_id, file_id) for file_id, exhibit_id in files.items()),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        self._failed += len(errors)
+        if errors:
+            raise errors[0]
+
+    async def process(self, exhibit_id: uuid.UUID, file_id: uuid.UUID) -> list[dict] | None:
+        """
+        Создает копии изображения (повторный вызов для обработанного файла ничего не делает)
+
+        :return: список копий или None, если файл пропущен
+        """
+        async with self._semaphore:
+            async with self._session_maker() as session:
+                file = await RepoFactory(session).file.get(id=file_id)
+                await session.rollback()
+
+            if (
+                    not file or
+                    not file.is_uploaded or
+                    file.variants is not None or
+                    file.content_type not in RASTER_TYPES
+            ):
+                self._skipped += 1
+                return None
+
+            file_path = f"{exhibit_id}/{file_id}"
+            info = await self._file_storage.info(file_path=file_path)
+            if not info:
+                self._skipped += 1
+                return None
+
+            variants = []
+            if info.size is None or info.size <= self._max_source_size:
+                data = await self._file_storage.get(file_path)
+                start = time.monotonic()
+                try:
+                    rendered = await asyncio.to_thread(self._render, data)
+                except (OSError, ValueError, Image.DecompressionBombError) as e:
+                    # Поврежденное или неподдерживаемое изображение: повтор не поможет
+                    logging.warning(f"[ImageVariants] Cannot render {file_path}: {e}")
+                    rendered = []
+                self._render_ms.observe((time.monotonic() - start) * 1000)
+
+                await asyncio.gather(*(
+                    self._file_storage.put(
+                        variant_path(exhibit_id, file_id, variant["name"], variant["format"]),
+                        body,
+                        content_type=f"image/{variant['format']}",
+                        cache_control="public, max-age=31536000, immutable"
+                    )
+                    for variant, body in rendered
+                ))
+                variants = [variant for variant, _ in rendered]
+
+            async with self._session_maker() as session:
+                repos = RepoFactory(session)
+                await repos.file.set_variants(file_id, variants)
+                await repos.uow.commit()
+            await self._file_manifest_cache.invalidate(exhibit_id)
+            await self._exhibit_cache.invalidate(exhibit_id)
+
+            self._processed += 1
+            self._variants += len(variants)
+            return variants
+
+    def _render(self, data: bytes) -> list[tuple[dict, bytes]]:
+        """
+        Кодирует копии изображения (выполняется в потоке)
+
+        :return: [(описание копии, содержимое)]
+        """
+        with Image.open(io.BytesIO(data)) as source:
+            # JPEG декодируется сразу в уменьшенном масштабе
+            source.draft("RGB", (self._widths[-1], self._widths[-1]))
+            # Размер известен из заголовка: память под пиксели выделяется только при декодировании
+            if source.width * source.height > self._max_pixels:
+                raise ValueError(f"Image is too large: {source.width}x{source.height}")
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        sizes = [("thumb", ImageOps.fit(image, (self._thumbnail_size, self._thumbnail_size), Image.LANCZOS))]
+        for width in self._widths:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            sizes.append((f"w{width}", image.resize((width, height), Image.LANCZOS)))
+
+        rendered = []
+        for name, resized in sizes:
+            for format in self._formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, format=format.upper(), quality=self._quality)
+                rendered.append((
+                    {"name": name, "format": format, "width": resized.width, "height": resized.height},
+                    buffer.getvalue()
+                ))
+        return rendered
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "formats": list(self._formats),
+            "processed": self._processed,
+            "skipped": self._skipped,
+            "failed": self._failed,
+            "variants": self._variants,
+            "render_ms": self._render_ms.snapshot(),
+            "relay": self._relay.stats(),
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from exhibit.services.repository import ExhibitRepo
+
+
+class ViewCounter:
+    """
+    Буфер просмотров экспонатов
+
+    Просмотры накапливаются в памяти процесса (с объединением по экспонату)
+    и записываются в БД одним запросом по интервалу, при превышении порога
+    или при остановке приложения, поэтому чтение экспоната не требует
+    записи в БД и не блокирует строку популярного экспоната.
+
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            flush_interval: float = 5.0,
+            flush_threshold: int = 1000
+    ):
+        self._session_maker = session_maker
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+
+        self._pending: dict[uuid.UUID, int] = dict()
+        self._pending_total = 0
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        # Счетчики
+        self._flushed_total = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+
+    def add(self, exhibit_id: uuid.UUID, count: int = 1) -> None:
+        self._pending[exhibit_id] = self._pending.get(exhibit_id, 0) + count
+        self._pending_total += count
+        if self._pending_total >= self._flush_threshold:
+            self._wakeup.set()
+
+    def pending(self, exhibit_id: uuid.UUID) -> int:
+        """
+        Количество еще не записанных просмотров экспоната
+
+        """
+        return self._pending.get(exhibit_id, 0)
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные просмотры в БД
+
+        При ошибке просмотры возвращаются в буфер и будут записаны при следующей попытке.
+
+        :return: количество записанных просмотров
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, dict()
+            batch_total, self._pending_total = self._pending_total, 0
+            try:
+                async with self._session_maker() as session:
+                    await ExhibitRepo(session).add_views(batch)
+                    await session.commit()
+            except Exception:
+                self._failed_flushes += 1
+                for exhibit_id, count in batch.items():
+                    self._pending[exhibit_id] = self._pending.get(exhibit_id, 0) + count
+                self._pending_total += batch_total
+                raise
+
+            self._flushes += 1
+            self._flushed_total += batch_total
+            return batch_total
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"[ViewCounter] Flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending_total,
+            "pending_exhibits": len(self._pending),
+            "flushed": self._flushed_total,
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+        }
@@ -1,3 +1,4 @@
 from .openapi import custom_openapi
+from . import cursor
 from . import formators
 from . import validators
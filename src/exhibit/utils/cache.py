@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с временем жизни записей
+
+    Время жизни задается абсолютной отметкой (unix time) для каждой записи
+    или по умолчанию через ttl. При переполнении вытесняется
+    давно не использованная запись.
+
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        """
+        :param maxsize: максимальное количество записей
+        :param ttl: время жизни записи по умолчанию (сек), None - без ограничения
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+        # Счетчики
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self._misses += 1
+            return default
+
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            self._expirations += 1
+            self._misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float = None) -> None:
+        """
+        :param key: ключ
+        :param value: значение
+        :param expires_at: время истечения записи (unix time), по умолчанию now + ttl
+        """
+        if expires_at is None and self._ttl is not None:
+            expires_at = time.time() + self._ttl
+
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def ttl(self) -> float | None:
+        return self._ttl
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and (item[1] is None or item[1] > time.time())
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self._maxsize,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
@@ -0,0 +1,32 @@
+import base64
+import json
+
+
+def encode_cursor(payload: dict) -> str:
+    """
+    Функция для упаковки позиции выборки в непрозрачный курсор
+
+    :param payload: данные позиции (должны сериализоваться в JSON)
+    :return:
+    """
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Функция для распаковки курсора
+
+    :param cursor:
+    :return: данные позиции
+    :raises ValueError: если курсор поврежден
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except ValueError:
+        raise ValueError("Неверный курсор")
+
+    if not isinstance(payload, dict):
+        raise ValueError("Неверный курсор")
+    return payload
@@ -0,0 +1,39 @@
+import bisect
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными верхними границами корзин
+
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._sum += value
+        self._count += 1
+        self._max = max(self._max, value)
+
+    def snapshot(self) -> dict:
+        """
+        :return: количество наблюдений в корзинах (le - верхняя граница, включительно, накопительно)
+        """
+        buckets = dict()
+        total = 0
+        for bound, count in zip(self._buckets, self._counts):
+            total += count
+            buckets[f"le_{bound:g}"] = total
+        buckets["le_inf"] = self._count
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 3),
+            "avg": round(self._sum / self._count, 3) if self._count else 0.0,
+            "max": round(self._max, 3),
+            "buckets": buckets,
+        }
@@ -1,6 +1,7 @@
 import typing
 import uuid
 from dataclasses import dataclass
+from datetime import datetime
 from urllib.parse import urljoin, urlencode
 
 from aiobotocore.session import AioSession
@@ -11,6 +12,7 @@ from botocore.exceptions import ClientError
 class MetaData:
     filename: str
     content_type: str
+    size: int = None
 
 
 class S3Storage:
@@ -20,6 +22,7 @@ class S3Storage:
         self._external_host = external_host
         self._storage_path = storage_path
         self._client = None
+        self._presign_client = None
 
     async def create_session(
             self,
@@ -38,21 +41,57 @@ class S3Storage:
             endpoint_url=endpoint_url,
             use_ssl=use_ssl
         ).__aenter__()
+        # Подпись ссылок PUT включает хост, поэтому ссылки на части multipart-загрузки
+        # подписываются клиентом с внешним адресом хранилища (запросов он не выполняет)
+        self._presign_client = await session.create_client(
+            aws_secret_access_key=secret_access_key,
+            aws_access_key_id=access_key_id,
+            region_name=region_name,
+            service_name="s3",
+            endpoint_url=self._external_host or endpoint_url,
+            use_ssl=use_ssl
+        ).__aenter__()
         return self
 
     async def close(self):
-        await self._client.__aexit__()
+        await self._presign_client.__aexit__(None, None, None)
+        await self._client.__aexit__(None, None, None)
 
     async def info(self, file_path: str) -> MetaData | None:
         try:
             response = await self._client.head_object(Bucket=self._bucket, Key=self._storage_path + file_path)
             return MetaData(
                 filename=response['ResponseMetadata']['HTTPHeaders'].get('x-amz-meta-filename'),
-                content_type=response['ResponseMetadata']['HTTPHeaders'].get('content-type')
+                content_type=response['ResponseMetadata']['HTTPHeaders'].get('content-type'),
+                size=response.get('ContentLength')
             )
         except ClientError:
             return None
 
+    async def get(self, file_path: str) -> bytes:
+        """
+        Читает объект целиком (только для файлов ограниченного размера)
+
+        """
+        response = await self._client.get_object(Bucket=self._bucket, Key=self._storage_path + file_path)
+        async with response["Body"] as stream:
+            return await stream.read()
+
+    async def put(
+            self,
+            file_path: str,
+            body: bytes,
+            content_type: str,
+            cache_control: str = None
+    ) -> None:
+        await self._client.put_object(
+            Bucket=self._bucket,
+            Key=self._storage_path + file_path,
+            Body=body,
+            ContentType=content_type,
+            **{"CacheControl": cache_control} if cache_control else {}
+        )
+
     async def generate_upload_url(
             self,
             file_path: str,
@@ -78,6 +117,97 @@ class S3Storage:
         response['url'] = urljoin(self._external_host, self._bucket)
         return response
 
+    async def create_multipart_upload(self, file_path: str, content_type: str) -> str:
+        """
+        Начинает multipart-загрузку
+
+        :return: идентификатор загрузки (UploadId)
+        """
+        response = await self._client.create_multipart_upload(
+            Bucket=self._bucket,
+            Key=self._storage_path + file_path,
+            ContentType=content_type
+        )
+        return response["UploadId"]
+
+    async def generate_upload_part_urls(
+            self,
+            file_path: str,
+            upload_id: str,
+            part_numbers: typing.Iterable[int],
+            expires_in: int = 3600
+    ) -> dict[int, str]:
+        """
+        Ссылки на загрузку частей (PUT тела части, ETag из ответа нужен для завершения)
+
+        :param part_numbers: номера частей (1..10000)
+        :return: {номер части: ссылка}
+        """
+        return {
+            part_number: await self._presign_client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": self._bucket,
+                    "Key": self._storage_path + file_path,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number
+                },
+                ExpiresIn=expires_in
+            )
+            for part_number in part_numbers
+        }
+
+    async def list_parts(self, file_path: str, upload_id: str) -> list[dict] | None:
+        """
+        Загруженные части multipart-загрузки
+
+        :return: [{"PartNumber", "ETag", "Size", ...}] по возрастанию номера или None, если загрузки нет
+        """
+        parts = []
+        paginator = self._client.get_paginator("list_parts")
+        try:
+            async for page in paginator.paginate(
+                    Bucket=self._bucket,
+                    Key=self._storage_path + file_path,
+                    UploadId=upload_id
+            ):
+                parts.extend(page.get("Parts", []))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                return None
+            raise
+        return sorted(parts, key=lambda part: part["PartNumber"])
+
+    async def complete_multipart_upload(self, file_path: str, upload_id: str, parts: list[dict]) -> None:
+        """
+        Завершает multipart-загрузку (объект появляется в хранилище)
+
+        :param parts: [{"PartNumber", "ETag"}] по возрастанию номера
+        """
+        await self._client.complete_multipart_upload(
+            Bucket=self._bucket,
+            Key=self._storage_path + file_path,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": part["PartNumber"], "ETag": part["ETag"]} for part in parts]
+            }
+        )
+
+    async def abort_multipart_upload(self, file_path: str, upload_id: str) -> None:
+        """
+        Отменяет multipart-загрузку и удаляет загруженные части (повторная отмена не ошибка)
+
+        """
+        try:
+            await self._client.abort_multipart_upload(
+                Bucket=self._bucket,
+                Key=self._storage_path + file_path,
+                UploadId=upload_id
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                raise
+
     def generate_download_public_url(
             self,
             file_path: str,
@@ -117,3 +247,40 @@ class S3Storage:
 
     def delete(self, file_path):
         return self._client.delete_object(Bucket=self._bucket, Key=self._storage_path + file_path)
+
+    async def list_objects(self, prefix: str = "") -> typing.AsyncIterator[tuple[str, datetime]]:
+        """
+        Перечисляет объекты хранилища постранично
+
+        :param prefix: префикс пути
+        :return: (путь файла, время изменения)
+        """
+        paginator = self._client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self._bucket, Prefix=self._storage_path + prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self._storage_path):], item["LastModified"]
+
+    async def delete_many(self, file_paths: list[str]) -> list[str]:
+        """
+        Удаляет объекты одним запросом (не более 1000)
+
+        :param file_paths: пути файлов
+        :return: пути, которые не удалось удалить
+        """
+        if not file_paths:
+            return []
+        response = await self._client.delete_objects(
+            Bucket=self._bucket,
+            Delete={"Objects": [{"Key": self._storage_path + path} for path in file_paths], "Quiet": True}
+        )
+        return [error["Key"][len(self._storage_path):] for error in response.get("Errors", [])]
+
+    def path_from_key(self, bucket: str, key: str) -> str | None:
+        """
+        Путь файла по ключу объекта из уведомления хранилища
+
+        :return: None, если объект не относится к хранилищу
+        """
+        if bucket != self._bucket or not key.startswith(self._storage_path):
+            return None
+        return key[len(self._storage_path):]
@@ -0,0 +1,24 @@
+from typing import AsyncIterator, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+async def release_session(stream: AsyncIterator[T], session: AsyncSession) -> AsyncIterator[T]:
+    """
+    Функция для потоковой отдачи ответа, читающего из сессии запроса
+
+    Тело потокового ответа отправляется после закрытия сессии запроса,
+    поэтому соединение, занятое потоком, освобождается по его завершении
+    (в том числе при обрыве соединения клиентом).
+
+    :param stream: поток частей ответа
+    :param session: сессия, используемая потоком
+    :return:
+    """
+    try:
+        async for item in stream:
+            yield item
+    finally:
+        await session.close()
@@ -8,3 +8,7 @@ class CommentResponse(BaseView):
 
 class CommentsResponse(BaseView):
     content: list[schemas.CommentNode]
+
+
+class CommentThreadsResponse(BaseView):
+    content: list[schemas.CommentThread]
@@ -20,3 +20,11 @@ class ExhibitFileResponse(BaseView):
 
 class FileUploadResponse(BaseView):
     content: schemas.FileUpload
+
+
+class MultipartUploadResponse(BaseView):
+    content: schemas.MultipartUpload
+
+
+class UploadPartUrlsResponse(BaseView):
+    content: list[schemas.UploadPartUrl]
@@ -4,3 +4,7 @@ from exhibit.views import BaseView
 
 class ImgSearchResultResponse(BaseView):
     content: schemas.ImgResult
+
+
+class ReindexJobResponse(BaseView):
+    content: schemas.ReindexJob
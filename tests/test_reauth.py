@@ -0,0 +1,185 @@
+import asyncio
+
+import grpc
+import pytest
+
+from exhibit.commands.fake_ums import FakeUserManagement
+from exhibit.protos.ums_control import ums_control_pb2_grpc
+from exhibit.services.auth.reauth import ReauthSessionList
+from exhibit.services.shared_state import LocalSharedState
+from tests.utils import wait_until
+
+
+class WatchlessUserManagement(FakeUserManagement):
+    """UMS без потока изменений (только опрос и снимок)"""
+
+    async def WatchReauthChanges(self, request, context):
+        await context.abort(grpc.StatusCode.UNIMPLEMENTED, "Method not implemented")
+
+
+class SnapshotOnlyUserManagement(WatchlessUserManagement):
+    """UMS старой версии (только полный снимок)"""
+
+    async def GetReauthChanges(self, request, context):
+        await context.abort(grpc.StatusCode.UNIMPLEMENTED, "Method not implemented")
+
+
+class FlakyState(LocalSharedState):
+    """Хранилище, первые failures записей которого завершаются ошибкой"""
+
+    def __init__(self, name: str, failures: int):
+        super().__init__(name)
+        self.failures = failures
+
+    async def update(self, values=None, deleted=()):
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("Shared state is unavailable")
+        await super().update(values, deleted)
+
+    async def replace(self, values):
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("Shared state is unavailable")
+        await super().replace(values)
+
+
+async def serve(servicer: FakeUserManagement, port: int = 0) -> tuple[grpc.aio.Server, int]:
+    server = grpc.aio.server()
+    ums_control_pb2_grpc.add_UserManagementServicer_to_server(servicer, server)
+    port = server.add_insecure_port(f"127.0.0.1:{port}")
+    await server.start()
+    return server, port
+
+
+def make_list(port: int, store: LocalSharedState) -> ReauthSessionList:
+    return ReauthSessionList(f"127.0.0.1:{port}", store=store, poll_interval=0.05, max_backoff=0.1)
+
+
+def test_watch_applies_snapshot_then_changes():
+    async def main():
+        ums = FakeUserManagement(heartbeat_interval=0.1)
+        await ums.set("s1", "t1")
+        await ums.set("s2", "t2")
+        server, port = await serve(ums)
+        store = LocalSharedState("reauth")
+        reauth = make_list(port, store)
+        reauth.start()
+        try:
+            await wait_until(lambda: store.get("s2") == "t2")
+
+            await ums.set("s3", "t3")
+            await ums.delete("s1")
+            await wait_until(lambda: reauth.stats()["version"] == ums.version)
+
+            assert dict(store.items()) == {"s2": "t2", "s3": "t3"}
+            stats = reauth.stats()
+            assert stats["mode"] == "watch"
+            assert stats["full_syncs"] == 1
+            assert stats["deltas"] >= 1
+        finally:
+            await reauth.stop()
+            await server.stop(grace=None)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("servicer, mode", [
+    (WatchlessUserManagement, "poll"),
+    (SnapshotOnlyUserManagement, "snapshot"),
+])
+def test_falls_back_when_method_is_not_implemented(servicer, mode):
+    async def main():
+        ums = servicer()
+        await ums.set("s1", "t1")
+        server, port = await serve(ums)
+        store = LocalSharedState("reauth")
+        reauth = make_list(port, store)
+        reauth.start()
+        try:
+            await wait_until(lambda: store.get("s1") == "t1")
+            await ums.delete("s1")
+            await ums.set("s2", "t2")
+            await wait_until(lambda: dict(store.items()) == {"s2": "t2"})
+            stats = reauth.stats()
+            assert stats["mode"] == mode
+            assert stats["errors"] == 0
+        finally:
+            await reauth.stop()
+            await server.stop(grace=None)
+
+    asyncio.run(main())
+
+
+def test_resumes_from_version_after_restart():
+    async def main():
+        ums = FakeUserManagement(heartbeat_interval=0.1)
+        await ums.set("s1", "t1")
+        server, port = await serve(ums)
+        store = LocalSharedState("reauth")
+        reauth = make_list(port, store)
+        reauth.start()
+        try:
+            await wait_until(lambda: store.get("s1") == "t1")
+            await reauth.stop()
+
+            # Изменения, пропущенные во время остановки, приходят изменениями, а не снимком
+            await ums.set("s2", "t2")
+            reauth.start()
+            await wait_until(lambda: store.get("s2") == "t2")
+
+            stats = reauth.stats()
+            assert stats["full_syncs"] == 1
+            assert stats["deltas"] == 1
+            assert stats["version"] == ums.version
+        finally:
+            await reauth.stop()
+            await server.stop(grace=None)
+
+    asyncio.run(main())
+
+
+def test_reconnects_with_backoff_after_ums_restart():
+    async def main():
+        ums = FakeUserManagement(heartbeat_interval=0.1)
+        await ums.set("s1", "t1")
+        server, port = await serve(ums)
+        store = LocalSharedState("reauth")
+        reauth = make_list(port, store)
+        reauth.start()
+        try:
+            await wait_until(lambda: store.get("s1") == "t1")
+            await server.stop(grace=None)
+
+            await wait_until(lambda: reauth.stats()["errors"] >= 2)
+            # Последний известный список сохраняется, пока UMS недоступен
+            assert store.get("s1") == "t1"
+
+            await ums.set("s2", "t2")
+            server, _ = await serve(ums, port)
+            await wait_until(lambda: store.get("s2") == "t2")
+            assert reauth.running
+        finally:
+            await reauth.stop()
+            await server.stop(grace=None)
+
+    asyncio.run(main())
+
+
+def test_store_errors_do_not_stop_the_sync():
+    async def main():
+        ums = FakeUserManagement(heartbeat_interval=0.1)
+        await ums.set("s1", "t1")
+        server, port = await serve(ums)
+        store = FlakyState("reauth", failures=2)
+        reauth = make_list(port, store)
+        reauth.start()
+        try:
+            await wait_until(lambda: store.get("s1") == "t1")
+            assert reauth.running
+            assert reauth.stats()["errors"] == 2
+        finally:
+            await reauth.stop()
+            await server.stop(grace=None)
+
+    asyncio.run(main())
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from exhibit.models.state import ReindexScope, ReindexState
+from exhibit.services import reindex
+from exhibit.services.reindex import ImgSearchReindexer
+
+
+class FakeReindexJobRepo:
+    """reindex_jobs в памяти с той же семантикой захвата и контрольных точек"""
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def get(self, id: uuid.UUID):
+        return self._db.jobs.get(id)
+
+    async def get_unfinished(self, scope: ReindexScope):
+        jobs = [job for job in self._db.jobs.values() if job.scope == scope and job.state != ReindexState.DONE]
+        return max(jobs, key=lambda job: job.created_at, default=None)
+
+    async def create(self, **kwargs):
+        job = SimpleNamespace(
+            id=uuid.uuid4(), cursor=None, processed=0, rate=None, error=None, owner=None,
+            heartbeat_at=None, created_at=time.monotonic(), **kwargs
+        )
+        self._db.jobs[job.id] = job
+        return job
+
+    async def acquire(self, job_id: uuid.UUID, owner: uuid.UUID, lease: float, **kwargs) -> bool:
+        job = self._db.jobs[job_id]
+        if job.state == ReindexState.DONE:
+            return False
+        if (
+                job.state == ReindexState.RUNNING and
+                job.heartbeat_at is not None and
+                job.heartbeat_at >= time.monotonic() - lease
+        ):
+            return False
+        vars(job).update(state=ReindexState.RUNNING, owner=owner, error=None, heartbeat_at=time.monotonic(), **kwargs)
+        return True
+
+    async def checkpoint(self, job_id: uuid.UUID, owner: uuid.UUID, **kwargs) -> bool:
+        job = self._db.jobs[job_id]
+        if job.owner != owner or job.state != ReindexState.RUNNING:
+            return False
+        vars(job).update(heartbeat_at=time.monotonic(), **kwargs)
+        return True
+
+    async def pause(self, job_id: uuid.UUID) -> bool:
+        job = self._db.jobs[job_id]
+        if job.state != ReindexState.RUNNING:
+            return False
+        job.state, job.rate = ReindexState.PAUSED, None
+        return True
+
+
+class FakeFileRepo:
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def count_uploaded(self) -> int:
+        return len(self._db.files)
+
+    async def get_uploaded_after(self, cursor: uuid.UUID | None, limit: int):
+        return [row for row in self._db.files if cursor is None or row[0] > cursor][:limit]
+
+
+class FakeUnitOfWork:
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+
+class FakeDb:
+
+    def __init__(self, count: int):
+        exhibit_id = uuid.uuid4()
+        self.files = sorted((uuid.uuid4(), uuid.uuid4(), exhibit_id) for _ in range(count))
+        self.jobs: dict[uuid.UUID, SimpleNamespace] = dict()
+        self.sessions = 0
+
+    def repos(self, session) -> SimpleNamespace:
+        return SimpleNamespace(
+            reindex_job=FakeReindexJobRepo(self),
+            file=FakeFileRepo(self),
+            uow=FakeUnitOfWork()
+        )
+
+    @asynccontextmanager
+    async def session(self):
+        self.sessions += 1
+        yield None
+
+
+class FakeAdapter:
+    """ImgSearchAdapter: запоминает отправленные file_id, on_batch вызывается после каждой пачки"""
+
+    def __init__(self, on_batch=None):
+        self.sent: list[str] = []
+        self.batches = 0
+        self._on_batch = on_batch
+
+    async def send_batch(self, messages) -> None:
+        self.sent.extend(json.loads(message)["file_id"] for message in messages)
+        self.batches += 1
+        if self._on_batch:
+            await self._on_batch(self.batches)
+
+
+@pytest.fixture
+def db(monkeypatch) -> FakeDb:
+    db = FakeDb(count=7)
+    monkeypatch.setattr(reindex, "RepoFactory", db.repos)
+    return db
+
+
+def file_ids(db: FakeDb) -> list[str]:
+    return [str(file_id) for _, file_id, _ in db.files]
+
+
+def test_paused_job_resumes_from_checkpoint(db):
+    async def main():
+        async def pause_on_second_batch(batch: int) -> None:
+            if batch == 2:
+                await FakeReindexJobRepo(db).pause(job_id)
+
+        isa = FakeAdapter(on_batch=pause_on_second_batch)
+        reindexer = ImgSearchReindexer(db.session, isa, batch_size=2)
+        job_id = await reindexer.start(ReindexScope.FILES, rate_limit=10000)
+        await reindexer._tasks[job_id]
+
+        # Вторая пачка отправлена, но контрольная точка не сохранена: задание на паузе после первой
+        job = db.jobs[job_id]
+        assert job.state == ReindexState.PAUSED
+        assert job.processed == 2
+        assert job.cursor == db.files[1][0]
+
+        assert await reindexer.start(ReindexScope.FILES, rate_limit=10000) == job_id
+        await reindexer._tasks[job_id]
+
+        assert job.state == ReindexState.DONE
+        assert job.processed == job.total == 7
+        # Повторно отправляется только неподтвержденная пачка
+        ids = file_ids(db)
+        assert isa.sent == ids[:4] + ids[2:]
+
+    asyncio.run(main())
+
+
+def test_failed_job_resumes_from_checkpoint(db):
+    async def main():
+        async def fail_on_second_batch(batch: int) -> None:
+            if batch == 2:
+                raise ConnectionError("broker is unavailable")
+
+        isa = FakeAdapter(on_batch=fail_on_second_batch)
+        reindexer = ImgSearchReindexer(db.session, isa, batch_size=2)
+        job_id = await reindexer.start(ReindexScope.FILES, rate_limit=10000)
+        await reindexer._tasks[job_id]
+
+        job = db.jobs[job_id]
+        assert job.state == ReindexState.FAILED
+        assert job.error == "ConnectionError: broker is unavailable"
+        assert job.processed == 2
+
+        isa._on_batch = None
+        assert await reindexer.start(ReindexScope.FILES, rate_limit=10000) == job_id
+        await reindexer._tasks[job_id]
+
+        assert job.state == ReindexState.DONE
+        assert job.error is None
+        assert set(isa.sent) == set(file_ids(db))
+        assert reindexer.stats()["failed_jobs"] == 1
+
+    asyncio.run(main())
+
+
+def test_stalled_job_is_taken_over_after_lease(db):
+    async def main():
+        stalled = asyncio.Event()
+        release = asyncio.Event()
+
+        async def stall_on_second_batch(batch: int) -> None:
+            if batch == 2:
+                stalled.set()
+                await release.wait()
+
+        first = ImgSearchReindexer(db.session, FakeAdapter(on_batch=stall_on_second_batch), batch_size=2, lease=60)
+        job_id = await first.start(ReindexScope.FILES, rate_limit=10000)
+        await stalled.wait()
+
+        # Пока аренда действует, задание не перехватывается
+        assert await ImgSearchReindexer(db.session, FakeAdapter(), batch_size=2, lease=60).start(
+            ReindexScope.FILES, rate_limit=10000
+        ) is None
+
+        isa = FakeAdapter()
+        second = ImgSearchReindexer(db.session, isa, batch_size=2, lease=0)
+        assert await second.start(ReindexScope.FILES, rate_limit=10000) == job_id
+        await second._tasks[job_id]
+
+        # Прежний запуск не может сохранить контрольную точку и завершается
+        release.set()
+        await first._tasks[job_id]
+
+        job = db.jobs[job_id]
+        assert job.state == ReindexState.DONE
+        assert job.processed == 7
+        assert isa.sent == file_ids(db)[2:]
+
+    asyncio.run(main())
+
+
+def test_connection_is_not_held_between_batches(db):
+    async def main():
+        reindexer = ImgSearchReindexer(db.session, FakeAdapter(), batch_size=2)
+        job_id = await reindexer.start(ReindexScope.FILES, rate_limit=10000)
+        await reindexer._tasks[job_id]
+
+        # start, чтение задания, затем выборка и контрольная точка каждой из 4 пачек и последняя выборка
+        assert db.sessions == 1 + 1 + 4 * 2 + 1
+
+    asyncio.run(main())
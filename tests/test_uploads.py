@@ -0,0 +1,357 @@
+import asyncio
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from exhibit.services import uploads
+from exhibit.services.consumer import MalformedMessage
+from exhibit.services.shared_state import LocalSharedState, SharedTTLCache
+from exhibit.services.uploads import UploadEvents, UploadSweeper
+from exhibit.utils.s3 import S3Storage
+
+moto_server = pytest.importorskip("moto.server")
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+class FakeFileRepo:
+    """Файлы экспонатов в памяти с семантикой запросов FileRepo"""
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def confirm_uploaded(self, files):
+        self._db.confirm_calls.append(list(files))
+        confirmed = []
+        for file_id, exhibit_id in files:
+            row = self._db.files.get(file_id)
+            if row and row.exhibit_id == exhibit_id and not row.is_uploaded:
+                row.is_uploaded, row.upload_id = True, None
+                confirmed.append((file_id, exhibit_id))
+        return confirmed
+
+    async def get_unconfirmed_before(self, created_before, multipart_active_before, limit):
+        return [
+            (file_id, row.exhibit_id, row.upload_id)
+            for file_id, row in self._db.files.items()
+            if not row.is_uploaded and (
+                row.created_at < created_before if row.upload_id is None
+                else row.created_at < multipart_active_before
+            )
+        ][:limit]
+
+    async def delete_unconfirmed(self, ids):
+        deleted = [file_id for file_id in ids if not self._db.files[file_id].is_uploaded]
+        for file_id in deleted:
+            del self._db.files[file_id]
+        return len(deleted)
+
+    async def get_existing_ids(self, ids):
+        return {file_id for file_id in ids if file_id in self._db.files}
+
+
+class FakeExhibitRepo:
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def update(self, exhibit_id, **kwargs):
+        self._db.posters[exhibit_id] = kwargs["poster"]
+
+
+class FakeOutboxRepo:
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def add(self, topic, payload):
+        self._db.outbox.append((topic, payload["file_id"]))
+
+
+class FakeUnitOfWork:
+
+    async def commit(self):
+        pass
+
+
+class FakeLockConnection:
+
+    def __init__(self, db: "FakeDb"):
+        self._db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, statement):
+        locked = "pg_try_advisory_lock" in str(statement)
+        if locked and self._db.locked:
+            return SimpleNamespace(scalar=lambda: False)
+        self._db.locked = locked
+        return SimpleNamespace(scalar=lambda: True)
+
+    async def commit(self):
+        pass
+
+
+class FakeDb:
+
+    def __init__(self):
+        self.files: dict[uuid.UUID, SimpleNamespace] = dict()
+        self.posters: dict[uuid.UUID, uuid.UUID] = dict()
+        self.outbox: list[tuple[str, str]] = []
+        self.confirm_calls: list[list] = []
+        self.locked = False
+        self.kw = {"bind": SimpleNamespace(connect=lambda: FakeLockConnection(self))}
+
+    def add_file(self, exhibit_id, age: timedelta = timedelta(0), upload_id: str = None) -> uuid.UUID:
+        file_id = uuid.uuid4()
+        self.files[file_id] = SimpleNamespace(
+            exhibit_id=exhibit_id,
+            is_uploaded=False,
+            upload_id=upload_id,
+            created_at=datetime.now(timezone.utc) - age
+        )
+        return file_id
+
+    def repos(self, session) -> SimpleNamespace:
+        return SimpleNamespace(
+            file=FakeFileRepo(self),
+            exhibit=FakeExhibitRepo(self),
+            outbox=FakeOutboxRepo(self),
+            uow=FakeUnitOfWork()
+        )
+
+    @asynccontextmanager
+    async def session(self):
+        yield None
+
+    def __call__(self):
+        return self.session()
+
+
+class FakeOutbox:
+
+    def __init__(self):
+        self.notified = 0
+
+    def notify(self):
+        self.notified += 1
+
+
+@pytest.fixture
+def db(monkeypatch) -> FakeDb:
+    db = FakeDb()
+    monkeypatch.setattr(uploads, "RepoFactory", db.repos)
+    return db
+
+
+@asynccontextmanager
+async def s3_storage(endpoint: str):
+    bucket = f"exhibits-{uuid.uuid4().hex[:12]}"
+    storage = S3Storage(bucket, endpoint)
+    await storage.create_session("secret", "key", "us-east-1", endpoint)
+    await storage._client.create_bucket(Bucket=bucket)
+    try:
+        yield storage
+    finally:
+        await storage.close()
+
+
+def make_events(db: FakeDb, storage: S3Storage, outbox: FakeOutbox = None) -> UploadEvents:
+    return UploadEvents(
+        db,
+        storage,
+        outbox or FakeOutbox(),
+        SharedTTLCache(LocalSharedState("file_manifest_cache"), maxsize=100, ttl=60),
+        SharedTTLCache(LocalSharedState("exhibit_cache"), maxsize=100, ttl=60),
+        max_delay=0.05
+    )
+
+
+def record(bucket: str, key: str, event: str = "s3:ObjectCreated:Put") -> dict:
+    return {"eventName": event, "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+async def object_paths(storage: S3Storage) -> set[str]:
+    return {path async for path, _ in storage.list_objects()}
+
+
+def test_ingest_ignores_foreign_keys_and_skips_malformed_records(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            events = make_events(db, storage)
+            exhibit_id = uuid.uuid4()
+            file_id = db.add_file(exhibit_id)
+            bucket = storage._bucket
+
+            count = await events.ingest({"Records": [
+                # Ключ в уведомлении URL-кодирован
+                record(bucket, f"{exhibit_id}%2F{file_id}"),
+                record(bucket, f"{exhibit_id}/{file_id}/variants/w320.webp"),
+                record(bucket, f"searcher/{uuid.uuid4()}"),
+                record(bucket, f"{exhibit_id}/not-a-uuid"),
+                record("other-bucket", f"{exhibit_id}/{file_id}"),
+                record(bucket, f"{exhibit_id}/{file_id}", event="s3:ObjectRemoved:Delete"),
+                {"eventName": "s3:ObjectCreated:Put"},
+                "junk",
+            ]})
+
+            assert count == 1
+            assert db.files[file_id].is_uploaded
+            stats = events.stats()
+            assert stats["events"] == 8
+            assert stats["ignored"] == 5
+            assert stats["malformed"] == 2
+            assert stats["confirmed"] == 1
+
+            with pytest.raises(MalformedMessage):
+                await events.ingest({"records": []})
+
+    asyncio.run(main())
+
+
+def test_concurrent_notifications_are_confirmed_in_one_batch(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            outbox = FakeOutbox()
+            events = make_events(db, storage, outbox)
+            exhibit_id = uuid.uuid4()
+            files = [db.add_file(exhibit_id) for _ in range(5)]
+
+            await asyncio.gather(*(
+                events.ingest({"Records": [record(storage._bucket, f"{exhibit_id}/{file_id}")]})
+                for file_id in files
+            ))
+            # Повторное уведомление о подтвержденном файле ничего не меняет
+            await events.ingest({"Records": [record(storage._bucket, f"{exhibit_id}/{files[0]}")]})
+
+            assert [len(call) for call in db.confirm_calls] == [5, 1]
+            assert all(db.files[file_id].is_uploaded for file_id in files)
+            assert db.posters[exhibit_id] in files
+            assert sorted(db.outbox) == sorted(
+                [("img_search", str(file_id)) for file_id in files] +
+                [("img_variants", str(file_id)) for file_id in files]
+            )
+            assert outbox.notified == 1
+            assert events.stats()["batches"] == 2
+            assert events.stats()["confirmed"] == 5
+
+    asyncio.run(main())
+
+
+def test_sweeper_confirms_late_uploads_and_deletes_abandoned_rows(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            events = make_events(db, storage)
+            exhibit_id = uuid.uuid4()
+            # Уведомление о загрузке потеряно
+            late = db.add_file(exhibit_id, age=timedelta(hours=3))
+            await storage._client.put_object(Bucket=storage._bucket, Key=f"{exhibit_id}/{late}", Body=b"x")
+            abandoned = db.add_file(exhibit_id, age=timedelta(hours=3))
+            # Ссылка на загрузку еще действует
+            fresh = db.add_file(exhibit_id, age=timedelta(minutes=5))
+
+            sweeper = UploadSweeper(db, storage, events, stale_after=2 * 3600)
+            assert await sweeper.sweep()
+
+            assert db.files[late].is_uploaded
+            assert abandoned not in db.files
+            assert not db.files[fresh].is_uploaded
+            stats = sweeper.stats()
+            assert stats["late_confirmed"] == 1
+            assert stats["deleted_rows"] == 1
+            assert not db.locked
+
+    asyncio.run(main())
+
+
+def test_sweeper_aborts_stale_multipart_uploads(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            events = make_events(db, storage)
+            exhibit_id = uuid.uuid4()
+            stale_id = uuid.uuid4()
+            active_id = uuid.uuid4()
+            stale_upload = await storage.create_multipart_upload(f"{exhibit_id}/{stale_id}", "image/png")
+            active_upload = await storage.create_multipart_upload(f"{exhibit_id}/{active_id}", "image/png")
+            await storage._client.upload_part(
+                Bucket=storage._bucket, Key=f"{exhibit_id}/{stale_id}",
+                UploadId=stale_upload, PartNumber=1, Body=b"x" * 1024
+            )
+            db.files[stale_id] = SimpleNamespace(
+                exhibit_id=exhibit_id, is_uploaded=False, upload_id=stale_upload,
+                created_at=datetime.now(timezone.utc) - timedelta(days=2)
+            )
+            db.files[active_id] = SimpleNamespace(
+                exhibit_id=exhibit_id, is_uploaded=False, upload_id=active_upload,
+                created_at=datetime.now(timezone.utc) - timedelta(hours=3)
+            )
+
+            sweeper = UploadSweeper(db, storage, events, stale_after=2 * 3600, multipart_stale_after=24 * 3600)
+            assert await sweeper.sweep()
+
+            response = await storage._client.list_multipart_uploads(Bucket=storage._bucket)
+            assert [upload["UploadId"] for upload in response.get("Uploads", [])] == [active_upload]
+            assert stale_id not in db.files
+            assert active_id in db.files
+            assert sweeper.stats()["aborted_uploads"] == 1
+
+    asyncio.run(main())
+
+
+def test_sweeper_deletes_only_stale_orphaned_objects(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            events = make_events(db, storage)
+            exhibit_id = uuid.uuid4()
+            kept = db.add_file(exhibit_id)
+            db.files[kept].is_uploaded = True
+            orphan = uuid.uuid4()
+            paths = [
+                f"{exhibit_id}/{kept}",
+                f"{exhibit_id}/{orphan}",
+                f"{exhibit_id}/{kept}/variants/w320.webp",
+                f"searcher/{uuid.uuid4()}",
+            ]
+            for path in paths:
+                await storage._client.put_object(Bucket=storage._bucket, Key=path, Body=b"x")
+
+            # Объект без записи моложе stale_after может принадлежать загрузке, запись которой еще не создана
+            sweeper = UploadSweeper(db, storage, events, stale_after=3600)
+            assert await sweeper.sweep()
+            assert await object_paths(storage) == set(paths)
+
+            # stale_before в будущем: все объекты старше него
+            sweeper = UploadSweeper(db, storage, events, stale_after=-60)
+            assert await sweeper.sweep()
+            assert await object_paths(storage) == set(paths) - {f"{exhibit_id}/{orphan}"}
+            assert sweeper.stats()["deleted_objects"] == 1
+
+    asyncio.run(main())
+
+
+def test_sweep_is_skipped_while_another_process_holds_the_lock(db, s3_endpoint):
+    async def main():
+        async with s3_storage(s3_endpoint) as storage:
+            db.locked = True
+            sweeper = UploadSweeper(db, storage, make_events(db, storage))
+            assert not await sweeper.sweep()
+            assert sweeper.stats()["sweeps"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,16 @@
+import asyncio
+import time
+from typing import Callable
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 5.0, interval: float = 0.01) -> None:
+    """
+    Ожидает выполнения условия
+
+    :raise AssertionError: условие не выполнено за timeout секунд
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(interval)